@@ -0,0 +1,131 @@
+"""
+Training data-loader throughput: one screenshot file per example (the notebook's
+Mind2WebQwenVLDataset) vs the memory-mapped pack from core/packed.py.
+
+    python -m benchmarks.loaderbench                      # synthetic data, 2 workers
+    python -m benchmarks.loaderbench --workers 0 4 8      # compare worker counts
+    python -m benchmarks.loaderbench --data d.jsonl --images dir/   # real processed data
+
+Uses torch's DataLoader when torch is installed, otherwise reads in-process (workers ignored).
+Disk cache state matters: for cold-cache numbers, drop the page cache between runs.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from PIL import Image
+from core.evaluation import load_records, find_image
+from core.packed import pack_records, PackedDataset
+
+
+class PerFileDataset:
+    """What the training notebook does today: open and decode one image file per __getitem__."""
+    def __init__(self, records, image_dir):
+        self.records = records
+        self.image_dir = image_dir
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        record = dict(self.records[i])
+        with Image.open(find_image(record, self.image_dir)) as image:
+            record["image"] = image.convert("RGB")
+        return record
+
+
+def make_synthetic(out_dir, tasks, actions_per_task, image_format):
+    """Mind2Web-shaped records; screenshots repeat within a task, like consecutive actions on one page."""
+    rng = random.Random(0)
+    records = []
+    for t in range(tasks):
+        # Noise so the codec does real work, like on a screenshot
+        image = Image.effect_noise((1024, 1280), 64).convert("RGB")
+        name = f"task{t}.{image_format}"
+        image.save(os.path.join(out_dir, name))
+        for a in range(actions_per_task):
+            records.append({
+                "annotation_id": f"task{t}",
+                "action_uid": f"task{t}-{a}",
+                "prompt": "ELEMENTS:\n" + "\n".join(f"[{rng.randint(1, 9999)}] <button> Item {i}" for i in range(150)),
+                "label": json.dumps({"action": "click", "element_id": "1", "value": "", "is_finished": False}),
+                "image": name,
+            })
+    return records
+
+
+def _keep_batch(batch):
+    return batch
+
+
+def throughput(dataset, workers, limit):
+    """Examples per second reading the first `limit` items (shuffled) through a DataLoader."""
+    indices = list(range(len(dataset)))
+    random.Random(1).shuffle(indices)
+    indices = indices[:limit]
+
+    try:
+        from torch.utils.data import DataLoader
+    except ImportError:
+        start = time.perf_counter()
+        for i in indices:
+            dataset[i]
+        return len(indices) / (time.perf_counter() - start)
+
+    kwargs = {"num_workers": workers, "collate_fn": _keep_batch, "batch_size": 4}
+    if workers:
+        kwargs["prefetch_factor"] = 4
+    loader = DataLoader(dataset, sampler=indices, **kwargs)
+    start = time.perf_counter()
+    for _ in loader:
+        pass
+    return len(indices) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Groundhog data-loader benchmark")
+    parser.add_argument("--data", type=str, help="Processed JSONL (default: synthetic data)")
+    parser.add_argument("--images", type=str, help="Screenshot directory for --data")
+    parser.add_argument("--tasks", type=int, default=60, help="Synthetic tasks")
+    parser.add_argument("--actions", type=int, default=5, help="Synthetic actions per task (share a screenshot)")
+    parser.add_argument("--format", type=str, default="png", choices=["png", "jpeg"], help="Synthetic screenshot format")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2], help="DataLoader worker counts to try")
+    parser.add_argument("--limit", type=int, default=300, help="Examples read per measurement")
+    parser.add_argument("--jpeg-quality", type=int, default=None, help="Transcode non-JPEG screenshots when packing")
+    parser.add_argument("--json", type=str, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.data:
+            records, image_dir = load_records(args.data), args.images
+        else:
+            image_dir = tmp
+            records = make_synthetic(tmp, args.tasks, args.actions, args.format)
+
+        pack_dir = os.path.join(tmp, "pack")
+        start = time.perf_counter()
+        meta = pack_records(records, image_dir, pack_dir, jpeg_quality=args.jpeg_quality)
+        print(f"Packed {meta['records']} examples in {time.perf_counter() - start:.1f}s "
+              f"({meta['unique_images']} unique images, {meta['duplicate_images']} deduplicated)")
+
+        results = {}
+        for workers in args.workers:
+            per_file = throughput(PerFileDataset(records, image_dir), workers, args.limit)
+            packed = throughput(PackedDataset(pack_dir), workers, args.limit)
+            results[f"workers={workers}"] = {"per_file_ex_s": round(per_file, 1), "packed_ex_s": round(packed, 1), "speedup": round(packed / per_file, 2)}
+            print(f"   workers={workers:<3} per-file {per_file:8.1f} ex/s   packed {packed:8.1f} ex/s   x{packed / per_file:.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
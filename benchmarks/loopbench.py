@@ -0,0 +1,212 @@
+"""
+End-to-end agent loop benchmark: the real Browser and AgentController in headless Chrome,
+driving the local mock sites (benchmarks/mock_sites.py) with a scripted stand-in for the model
+that always returns the right action. What is left is the agent's own overhead: page loads,
+fixed sleeps, stamping, screenshots, DOM distillation and prompt/output handling.
+
+    python -m benchmarks.loopbench                          # every task once, viewport observation
+    python -m benchmarks.loopbench --repeat 3 --json out.json
+    python -m benchmarks.loopbench --observation layout --tasks search form
+
+Reports seconds per step split by stage (self time, children excluded) and tasks per minute.
+Compare runs of the same machine release over release; absolute numbers are machine-specific.
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from core.processor import Processor
+from core.controller import AgentController
+from core.telemetry import tracer
+from benchmarks import mock_sites
+
+# How each traced stage is reported; anything else counts as "act"
+STAGE_GROUPS = {
+    "browser.sleep": "sleep", "agent.sleep": "sleep", "browser.wait": "sleep",
+    "browser.stamp": "capture", "browser.html": "capture", "browser.screenshot": "capture",
+    "browser.tile": "capture", "browser.layout_check": "capture",
+    "processor.distill": "parse", "processor.image": "parse",
+    "model.stub": "model",
+}
+GROUPS = ["sleep", "capture", "parse", "act", "model", "other"]
+
+
+class ScriptedModel:
+    """
+    Stand-in for ModelEngine that follows a task script. Each call looks for the current step's
+    element in the prompt and returns the action on its ID; if it is not on screen yet, it scrolls (ID 0).
+    Once the final step's element is visible it reports the task finished.
+    """
+    def __init__(self, script):
+        self.script = script
+        self.position = 0
+        self.calls = 0
+
+    def find(self, prompt, pattern):
+        """ID of the first prompt element line matching pattern, or None."""
+        for line in prompt.split("\n"):
+            match = re.match(r"\[(\d+)\] ", line)
+            if match and match.group(1) != "0" and re.search(pattern, line):
+                return match.group(1)
+        return None
+
+    def predict(self, image, prompt_text, adapter=None):
+        with tracer.span("model.stub", step=self.position):
+            self.calls += 1
+            step = self.script[self.position]
+            element_id = self.find(prompt_text, step["match"])
+
+            if element_id is None:
+                return json.dumps({"action": "scroll", "element_id": "0", "value": "", "is_finished": False})
+            if step.get("finish"):
+                return json.dumps({"action": "click", "element_id": element_id, "value": "", "is_finished": True})
+
+            self.position += 1
+            return json.dumps({"action": step["action"], "element_id": element_id, "value": step.get("value", ""), "is_finished": False})
+
+
+class SpanCollector:
+    """Tracer exporter keeping finished spans in memory so each task's time can be split by stage."""
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append((span.span_id, span.parent_id, span.name, span.duration_s))
+
+    def take(self):
+        spans, self.spans = self.spans, []
+        return spans
+
+    def close(self):
+        pass
+
+
+def self_times(spans):
+    """Seconds spent in each span name excluding its child spans, so nested stages are not counted twice."""
+    children = {}
+    for _, parent_id, _, duration in spans:
+        if parent_id is not None:
+            children[parent_id] = children.get(parent_id, 0.0) + duration
+
+    totals = {}
+    for span_id, _, name, duration in spans:
+        totals[name] = totals.get(name, 0.0) + duration - children.get(span_id, 0.0)
+    return totals
+
+
+def run_task(browser, processor, base_url, task, max_steps, collector):
+    model = ScriptedModel(task["script"])
+    controller = AgentController(browser, processor, model)
+
+    collector.take()
+    start = time.perf_counter()
+    result = {"status": "error", "steps": 0}
+    for event in controller.run_task_events(task["goal"], base_url + task["path"], max_steps):
+        if event["done"]:
+            result = {"status": event["status"], "steps": event["steps"]}
+    wall_s = time.perf_counter() - start
+
+    stages = self_times(collector.take())
+    # Time outside every span: controller bookkeeping, prompt building, JSON parsing, logging
+    stages["other"] = wall_s - sum(stages.values())
+    result.update(name=task["name"], wall_s=wall_s, stages=stages, model_calls=model.calls)
+    return result
+
+
+def summarize(results):
+    wall_s = sum(r["wall_s"] for r in results)
+    steps = sum(r["steps"] for r in results)
+
+    stages = {}
+    for r in results:
+        for name, seconds in r["stages"].items():
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    groups = {g: 0.0 for g in GROUPS}
+    for name, seconds in stages.items():
+        groups["other" if name == "other" else STAGE_GROUPS.get(name, "act")] += seconds
+
+    per_step = lambda s: round(s / steps, 4) if steps else 0.0
+    return {
+        "tasks": len(results),
+        "succeeded": sum(1 for r in results if r["status"] == "success"),
+        "steps": steps,
+        "wall_s": round(wall_s, 3),
+        "tasks_per_min": round(len(results) / wall_s * 60, 2) if wall_s > 0 else 0.0,
+        "s_per_step": per_step(wall_s),
+        # Everything but the (stub) model, and the part of it that is not a fixed sleep
+        "overhead_s_per_step": per_step(wall_s - groups["model"]),
+        "active_s_per_step": per_step(wall_s - groups["model"] - groups["sleep"]),
+        "groups_s_per_step": {g: per_step(s) for g, s in groups.items()},
+        "stages_s_per_step": {n: per_step(s) for n, s in sorted(stages.items(), key=lambda kv: -kv[1])},
+        "per_task": [{k: (round(v, 3) if isinstance(v, float) else v) for k, v in r.items() if k != "stages"} for r in results],
+    }
+
+
+def print_summary(summary):
+    print("\n" + "=" * 40)
+    print(f"🔁 Loop benchmark: {summary['succeeded']}/{summary['tasks']} tasks succeeded, {summary['steps']} steps in {summary['wall_s']}s")
+    print(f"   {'tasks/min':<24} {summary['tasks_per_min']}")
+    print(f"   {'s/step':<24} {summary['s_per_step']}")
+    print(f"   {'overhead s/step':<24} {summary['overhead_s_per_step']}")
+    print(f"   {'  excluding sleeps':<24} {summary['active_s_per_step']}")
+    print("   By group (s/step):")
+    for group, seconds in summary["groups_s_per_step"].items():
+        print(f"     {group:<22} {seconds}")
+    print("   By stage (s/step):")
+    for name, seconds in summary["stages_s_per_step"].items():
+        print(f"     {name:<22} {seconds}")
+    failed = [t for t in summary["per_task"] if t["status"] != "success"]
+    for task in failed:
+        print(f"   ⚠️ {task['name']}: {task['status']} after {task['steps']} steps")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end agent loop benchmark on local mock sites")
+    parser.add_argument("--tasks", nargs="+", choices=[t["name"] for t in mock_sites.TASKS], help="Only run these tasks")
+    parser.add_argument("--repeat", type=int, default=1, help="Run every task this many times")
+    parser.add_argument("--max-steps", type=int, default=10, help="Per-task step limit")
+    parser.add_argument("--observation", choices=["viewport", "layout"], default="viewport", help="Browser observation mode")
+    parser.add_argument("--verbose", action="store_true", help="Keep the agent's own logging")
+    parser.add_argument("--json", type=str, help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    from core.browser import Browser
+
+    tasks = [t for t in mock_sites.TASKS if not args.tasks or t["name"] in args.tasks]
+    collector = SpanCollector()
+    tracer.add_exporter(collector)
+    server, base_url = mock_sites.serve()
+    processor = Processor()
+
+    print(f"⏱️  Running {len(tasks)} task(s) x {args.repeat} against {base_url}...")
+    browser = Browser(headless=True, observation=args.observation)
+    results = []
+    try:
+        for _ in range(args.repeat):
+            for task in tasks:
+                with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+                    result = run_task(browser, processor, base_url, task, args.max_steps, collector)
+                results.append(result)
+                print(f"  {task['name']:<18} {result['status']:<10} {result['steps']} steps  {result['wall_s']:.2f}s")
+    finally:
+        browser.quit()
+        server.shutdown()
+
+    summary = summarize(results)
+    print_summary(summary)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 0 if summary["succeeded"] == summary["tasks"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""
+Microbenchmarks for the per-step hot paths: DOM distillation, image processing,
+controller output parsing and the stamp_page.js injection.
+
+    python -m benchmarks.microbench                   # run and check against baseline.json
+    python -m benchmarks.microbench --update-baseline # record new baselines on this machine
+    python -m benchmarks.microbench --skip-browser    # Python-only (no Chrome available)
+
+Timings are machine-specific: regenerate the baseline when moving to new hardware.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+import functools
+import threading
+import tracemalloc
+import statistics
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+
+from PIL import Image
+from core.processor import Processor
+from core.controller import AgentController
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "corpus")
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+PAGES = ["small", "medium", "pathological"]
+
+# Changes smaller than this are treated as timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.05
+
+
+def load_page(name):
+    with open(os.path.join(CORPUS_DIR, f"{name}.html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def measure(fn, repeat, warmup=2, track_memory=True):
+    """
+    Times fn() `repeat` times after `warmup` calls.
+    Returns p50/p95/mean in milliseconds and, for Python code, the peak traced allocation in KB.
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+
+    peak_kb = None
+    if track_memory:
+        # Separate pass: tracemalloc slows allocation-heavy code, so it must not skew the timings
+        tracemalloc.start()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_kb = round(peak / 1024, 1)
+
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))], 4),
+        "mean_ms": round(statistics.fmean(samples), 4),
+        "peak_kb": peak_kb,
+        "runs": repeat,
+    }
+
+
+def python_cases(quick=False):
+    """Yields (name, fn, repeat) for every pure-Python benchmark."""
+    processor = Processor()
+    controller = AgentController(None, processor, None)
+    scale = 0.2 if quick else 1.0
+
+    def reps(n):
+        return max(3, int(n * scale))
+
+    distilled = {}
+    for page in PAGES:
+        html = load_page(page)
+        distilled[page] = processor.distill_dom(html)
+        yield f"distill_dom[{page}]", functools.partial(processor.distill_dom, html), reps({"small": 200, "medium": 30, "pathological": 10}[page])
+
+    for size in [(1920, 1080), (2560, 5000)]:
+        img = Image.new("RGB", size, "white")
+        yield f"process_image[{size[0]}x{size[1]}]", functools.partial(processor.process_image, img), reps(30)
+
+    outputs = {
+        "clean": '{"action": "click", "element_id": "1250", "value": "", "is_finished": false}',
+        "markdown": 'Sure!\n```json\n{"action": "type", "element_id": "42", "value": "laptop", "is_finished": false}\n```',
+        # Long rambling output with braces scattered through it: worst case for the regex fallbacks
+        "noisy": ("The {element} list shows {many} items. " * 200) + '{"action": "click", "element_id": "7"}' + " trailing }" * 50,
+    }
+    for name, text in outputs.items():
+        yield f"extract_json[{name}]", functools.partial(controller._extract_json, text), reps(2000)
+
+    for page in ["medium", "pathological"]:
+        yield f"valid_ids[{page}]", functools.partial(controller._get_valid_ids_from_dom, distilled[page]), reps(2000)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_corpus():
+    """Serves the corpus directory on a free localhost port. Returns (server, base_url)."""
+    handler = functools.partial(_QuietHandler, directory=CORPUS_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def browser_cases(quick=False):
+    """Times stamp_page.js in headless Chrome against each corpus page."""
+    from core.browser import Browser
+
+    server, base_url = serve_corpus()
+    browser = Browser(headless=True)
+    results = {}
+    try:
+        for page in PAGES:
+            browser.navigate(f"{base_url}/{page}.html")
+            repeat = 5 if quick else 20
+            stamp = functools.partial(browser.driver.execute_script, browser.stamper_js)
+            result = measure(stamp, repeat, track_memory=False)
+            heap = browser.driver.execute_script("return performance.memory ? performance.memory.usedJSHeapSize : null;")
+            result["js_heap_kb"] = round(heap / 1024, 1) if heap else None
+            results[f"stamp_page_js[{page}]"] = result
+    finally:
+        browser.quit()
+        server.shutdown()
+    return results
+
+
+def run(skip_browser=False, quick=False):
+    results = {}
+    for name, fn, repeat in python_cases(quick):
+        # Parse-failure paths log every call; keep that out of the report (its cost is still timed)
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            results[name] = measure(fn, repeat)
+        print(f"  {name:<32} p50 {results[name]['p50_ms']:>10.3f} ms   p95 {results[name]['p95_ms']:>10.3f} ms   peak {results[name]['peak_kb']} KB")
+
+    if not skip_browser:
+        try:
+            for name, result in browser_cases(quick).items():
+                results[name] = result
+                print(f"  {name:<32} p50 {result['p50_ms']:>10.3f} ms   p95 {result['p95_ms']:>10.3f} ms   heap {result['js_heap_kb']} KB")
+        except Exception as e:
+            print(f"[Bench] ⚠️ Skipping stamp_page.js benchmarks, could not drive Chrome: {e}")
+    return results
+
+
+def check(results, baseline, threshold):
+    """
+    Compares results to the baseline.
+    Returns a list of human-readable regressions (p50 or peak memory above baseline * (1 + threshold)).
+    """
+    regressions = []
+    for name, base in baseline.items():
+        cur = results.get(name)
+        if cur is None:
+            continue
+        limit = base["p50_ms"] * (1 + threshold)
+        if cur["p50_ms"] > limit and cur["p50_ms"] - base["p50_ms"] > NOISE_FLOOR_MS:
+            regressions.append(f"{name}: p50 {cur['p50_ms']:.3f} ms vs baseline {base['p50_ms']:.3f} ms")
+        if base.get("peak_kb") and cur.get("peak_kb") and cur["peak_kb"] > base["peak_kb"] * (1 + threshold):
+            regressions.append(f"{name}: peak {cur['peak_kb']} KB vs baseline {base['peak_kb']} KB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Groundhog microbenchmarks")
+    parser.add_argument("--update-baseline", action="store_true", help="Overwrite baseline.json with this run")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--skip-browser", action="store_true", help="Skip the headless Chrome stamp_page.js benchmarks")
+    parser.add_argument("--quick", action="store_true", help="Fewer repetitions (smoke test, noisier numbers)")
+    parser.add_argument("--json", type=str, help="Also write the raw results to this file")
+    args = parser.parse_args()
+
+    print("⏱️  Running microbenchmarks...")
+    results = run(skip_browser=args.skip_browser, quick=args.quick)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"✅ Baseline written to {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("⚠️ No baseline.json yet. Run with --update-baseline first.")
+        return 0
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+
+    regressions = check(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+        for r in regressions:
+            print(f"   - {r}")
+        return 1
+
+    print(f"\n✅ No regressions beyond {args.threshold:.0%}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
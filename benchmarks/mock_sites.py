@@ -0,0 +1,230 @@
+"""
+Synthetic local websites for end-to-end agent benchmarks: one small site per interaction pattern
+(search, listing, form, dropdown, infinite scroll), served from memory on a localhost port.
+
+Each site comes with a task: the goal, its start path and the script of steps a perfect model
+would take (see benchmarks/loopbench.py). Pages are static apart from a little inline JS, so
+runs are deterministic and never touch the network.
+"""
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+STYLE = """
+<style>
+  body { font-family: sans-serif; margin: 0 auto; max-width: 960px; padding: 24px; }
+  .card { border: 1px solid #ccc; margin: 12px 0; padding: 24px; height: 120px; }
+  input, select, button, textarea { font-size: 18px; margin: 8px 0; padding: 8px; display: block; }
+</style>
+"""
+
+
+def page(title, body, script=""):
+    return f"<!DOCTYPE html><html><head><title>{title}</title>{STYLE}</head><body><h1>{title}</h1>{body}{script}</body></html>"
+
+
+def search_home(query):
+    return page("Search", """
+        <form action="/search/results" method="get">
+          <input type="search" name="q" placeholder="Search products" aria-label="Search products">
+        </form>
+        <p>Type a product name and press Enter.</p>
+    """)
+
+
+def search_results(query):
+    q = query.get("q", [""])[0]
+    names = ["Laptop Air 13", "Laptop Pro 15", "Laptop Stand", "Laptop Sleeve", "Laptop Charger"]
+    hits = [n for n in names if q.lower() in n.lower()] or names
+    items = "".join(f'<div class="card"><a href="/search/item/{i}">{n}</a></div>' for i, n in enumerate(hits))
+    return page(f"Results for {q}", items)
+
+
+def search_item(query, item):
+    return page(f"Item {item}", """
+        <p>In stock.</p>
+        <button id="add" onclick="addToCart()">Add to cart</button>
+        <a id="cart" href="#">View cart (0)</a>
+    """, """
+        <script>
+        function addToCart() { document.getElementById('cart').textContent = 'View cart (1)'; }
+        </script>
+    """)
+
+
+def listing(query):
+    cards = "".join(f'<div class="card"><a href="/listing/product/{i}">Product {i}</a> <span>${10 + i}.00</span></div>'
+                    for i in range(1, 41))
+    return page("All products", cards)
+
+
+def listing_product(query, item):
+    return page(f"Product {item}", '<p>Ships tomorrow.</p><button>Buy now</button>')
+
+
+def form(query):
+    # `required` makes the browser refuse to submit until both fields are filled,
+    # so the Enter sent after typing the name does not submit early
+    return page("Contact us", """
+        <form action="/form/thanks" method="get">
+          <input type="text" name="name" placeholder="Your name" required>
+          <input type="email" name="email" placeholder="Your email" required>
+          <button type="submit">Send</button>
+        </form>
+    """)
+
+
+def form_thanks(query):
+    name = query.get("name", [""])[0]
+    return page("Thanks", f'<p>Thanks, {name}.</p><a href="/">Back home</a>')
+
+
+def dropdown(query):
+    return page("Choose a seat", """
+        <form action="/dropdown/confirm" method="get">
+          <select name="cabin" aria-label="Cabin class">
+            <option value="economy">Economy</option>
+            <option value="business">Business</option>
+            <option value="first">First</option>
+          </select>
+          <button type="submit">Continue</button>
+        </form>
+    """)
+
+
+def dropdown_confirm(query):
+    cabin = query.get("cabin", [""])[0].title()
+    return page("Confirm", f'<a href="/dropdown/">Change cabin ({cabin})</a>')
+
+
+def feed(query):
+    # Ten posts per batch; the next batch loads when the reader nears the bottom
+    return page("Feed", '<div id="feed"></div>', """
+        <script>
+        var loaded = 0;
+        function more() {
+            var feed = document.getElementById('feed');
+            for (var i = 0; i < 10; i++) {
+                loaded++;
+                var card = document.createElement('div');
+                card.className = 'card';
+                card.innerHTML = '<a href="/feed/post/' + loaded + '">Post ' + loaded + '</a>';
+                feed.appendChild(card);
+            }
+        }
+        more();
+        window.addEventListener('scroll', function() {
+            if (window.innerHeight + window.scrollY >= document.body.scrollHeight - 400 && loaded < 100) more();
+        });
+        </script>
+    """)
+
+
+def feed_post(query, item):
+    return page(f"Post {item}", '<p>Lorem ipsum.</p><button>Like</button>')
+
+
+# path -> handler(query) ; prefix -> handler(query, tail)
+ROUTES = {
+    "/": lambda query: page("Mock sites", "".join(f'<a href="{p}">{p}</a>' for p in ["/search/", "/listing/", "/form/", "/dropdown/", "/feed/"])),
+    "/search/": search_home,
+    "/search/results": search_results,
+    "/listing/": listing,
+    "/form/": form,
+    "/form/thanks": form_thanks,
+    "/dropdown/": dropdown,
+    "/dropdown/confirm": dropdown_confirm,
+    "/feed/": feed,
+}
+PREFIX_ROUTES = {
+    "/search/item/": search_item,
+    "/listing/product/": listing_product,
+    "/feed/post/": feed_post,
+}
+
+# Each step is matched against the element lines of the prompt ("[12] <a> Product 27 ...").
+# The last step only has to be visible for the task to count as finished.
+TASKS = [
+    {
+        "name": "search",
+        "goal": "Search for a laptop and add the Laptop Pro 15 to the cart",
+        "path": "/search/",
+        "script": [
+            {"match": r"<input> .*Search products", "action": "type", "value": "laptop"},
+            {"match": r"<a> Laptop Pro 15", "action": "click"},
+            {"match": r"<button> Add to cart", "action": "click"},
+            {"match": r"<a> View cart \(1\)", "finish": True},
+        ],
+    },
+    {
+        "name": "listing",
+        "goal": "Open Product 9 and get to the buy button",
+        "path": "/listing/",
+        "script": [
+            {"match": r"<a> Product 9\b", "action": "click"},
+            {"match": r"<button> Buy now", "finish": True},
+        ],
+    },
+    {
+        "name": "form",
+        "goal": "Send the contact form as Ada Lovelace, ada@example.com",
+        "path": "/form/",
+        "script": [
+            {"match": r"<input> .*Your name", "action": "type", "value": "Ada Lovelace"},
+            {"match": r"<input> .*Your email", "action": "type", "value": "ada@example.com"},
+            {"match": r"<a> Back home", "finish": True},
+        ],
+    },
+    {
+        "name": "dropdown",
+        "goal": "Pick the Business cabin and continue",
+        "path": "/dropdown/",
+        "script": [
+            {"match": r"<select> ", "action": "select", "value": "Business"},
+            {"match": r"<button> Continue", "action": "click"},
+            {"match": r"<a> Change cabin \(Business\)", "finish": True},
+        ],
+    },
+    {
+        "name": "infinite_scroll",
+        "goal": "Find Post 24 in the feed and like it",
+        "path": "/feed/",
+        "script": [
+            {"match": r"<a> Post 24\b", "action": "click"},
+            {"match": r"<button> Like", "finish": True},
+        ],
+    },
+]
+
+
+def render(path, query_string=""):
+    """Returns the HTML for a path, or None if it is not part of any site."""
+    query = parse_qs(query_string)
+    if path in ROUTES:
+        return ROUTES[path](query)
+    for prefix, handler in PREFIX_ROUTES.items():
+        if path.startswith(prefix):
+            return handler(query, path[len(prefix):])
+    return None
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        html = render(url.path, url.query)
+        body = (html or "<h1>Not found</h1>").encode("utf-8")
+        self.send_response(200 if html else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve():
+    """Serves every mock site on a free localhost port. Returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SiteHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
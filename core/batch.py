@@ -0,0 +1,276 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from core.controller import AsyncAgentController
+from core.recorder import TrajectoryRecorder
+from core.memo import MemoizedModel
+
+
+def load_tasks(path):
+    """
+    Reads a tasks JSONL file.
+    Each line needs "goal" and "url". Optional keys: "id", "max_steps", "timeout".
+    Tasks without an "id" get a stable one derived from goal + url so resume works.
+    """
+    tasks = []
+    with open(path, "r") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            task = json.loads(line)
+            if "goal" not in task or "url" not in task:
+                raise ValueError(f"Task on line {line_no} of {path} needs 'goal' and 'url'")
+            if "id" not in task:
+                task["id"] = hashlib.sha1(f"{task['goal']}\n{task['url']}".encode("utf-8")).hexdigest()[:12]
+            tasks.append(task)
+    return tasks
+
+
+def load_completed_ids(results_path):
+    """
+    Returns the ids already finished in a results file (empty if it doesn't exist yet).
+    Tasks that ended in "error" (crashed browser etc.) are not counted, so a rerun retries them.
+    """
+    done = set()
+    if not os.path.exists(results_path):
+        return done
+    with open(results_path, "r") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+                if result.get("status") != "error":
+                    done.add(result["id"])
+            except (json.JSONDecodeError, KeyError):
+                # A crash mid-write can leave a truncated last line; that task just reruns
+                continue
+    return done
+
+
+class BatchRunner:
+    def __init__(self, browser_factory, processor, model, workers=4, max_steps=15, task_timeout=300, record_dir=None,
+                 workflow_cache=None, num_candidates=1, resources=None, jump_scroll=False, adapter=None, prefetcher=None):
+        """
+        Runs many tasks across parallel browser workers sharing one model.
+
+        Args:
+            browser_factory: Zero-arg callable returning a new core.browser.Browser.
+            processor: Instance of core.processor.Processor (stateless, shared).
+            model: Instance of core.model.ModelEngine, shared by all workers.
+            workers (int): Number of concurrent browser sessions.
+            max_steps (int): Default per-task step limit.
+            task_timeout (float): Default per-task wall-clock limit in seconds.
+            record_dir (str, optional): Record every task's trajectory under this directory.
+            workflow_cache: Optional core.workflow_cache.WorkflowCache shared by all workers.
+            num_candidates (int): Candidate actions per model call (see AgentController).
+            resources: Optional core.resources.ResourceManager deciding when to recycle a worker's browser.
+            jump_scroll (bool): Jump to the best-matching off-screen element on ID 0 (see AgentController).
+            adapter (str, optional): LoRA adapter for tasks that don't name one in their "adapter" field.
+            prefetcher: Optional core.prefetch.Prefetcher shared by all workers.
+        """
+        self.browser_factory = browser_factory
+        self.processor = processor
+        self.model = model
+        self.workers = workers
+        self.max_steps = max_steps
+        self.task_timeout = task_timeout
+        self.record_dir = record_dir
+        self.workflow_cache = workflow_cache
+        self.num_candidates = num_candidates
+        self.resources = resources
+        self.jump_scroll = jump_scroll
+        self.adapter = adapter
+        self.prefetcher = prefetcher
+        # HTTP cache outcomes summed over every browser this run (filled in as browsers quit)
+        self.cache_stats = {}
+
+        # One thread for the model, so workers queue up instead of sharing the GPU concurrently
+        self.model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+
+    def run(self, tasks_path, results_path):
+        """
+        Runs every pending task in tasks_path, appending outcomes to results_path.
+        The aggregate summary is returned and also written to <results_path>.summary.json.
+        """
+        return asyncio.run(self.run_async(tasks_path, results_path))
+
+    async def run_async(self, tasks_path, results_path):
+        tasks = load_tasks(tasks_path)
+        completed = load_completed_ids(results_path)
+        pending = [t for t in tasks if t["id"] not in completed]
+
+        print(f"[Batch] {len(tasks)} tasks, {len(completed)} already done, {len(pending)} to run on {self.workers} workers.")
+
+        queue = asyncio.Queue()
+        for task in pending:
+            queue.put_nowait(task)
+
+        results = []
+        start = time.time()
+
+        with open(results_path, "a") as results_file:
+            if results_file.tell() > 0 and not self._ends_with_newline(results_path):
+                # Terminate a line truncated by a previous crash so new results parse cleanly
+                results_file.write("\n")
+
+            async def record(result):
+                results.append(result)
+                # Flush each line so a crash loses at most the tasks in flight
+                results_file.write(json.dumps(result) + "\n")
+                results_file.flush()
+                print(f"[Batch] {result['id']}: {result['status']} in {result['steps']} steps ({result['duration_s']:.1f}s) "
+                      f"[{len(results)}/{len(pending)}]")
+
+            n_workers = max(1, min(self.workers, len(pending)))
+            await asyncio.gather(*(self._worker(i, queue, record) for i in range(n_workers)))
+
+        summary = self._summarize(results, time.time() - start)
+        if self.workflow_cache is not None:
+            summary["workflow_cache"] = self.workflow_cache.report()
+        if self.cache_stats.get("pages"):
+            summary["browser_cache"] = dict(self.cache_stats)
+        if self.prefetcher is not None:
+            summary["prefetch"] = self.prefetcher.report()
+        if isinstance(self.model, MemoizedModel):
+            summary["inference_memo"] = self.model.memo.report()
+        self._print_summary(summary)
+        with open(results_path + ".summary.json", "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    async def _worker(self, worker_id, queue, record):
+        loop = asyncio.get_running_loop()
+        browser_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"browser-{worker_id}")
+        browser = None
+        # A recorder tracks one open trajectory at a time, so each worker gets its own
+        recorder = TrajectoryRecorder(self.record_dir) if self.record_dir else None
+
+        try:
+            while not queue.empty():
+                task = queue.get_nowait()
+
+                if browser is None:
+                    try:
+                        browser = await loop.run_in_executor(browser_executor, self.browser_factory)
+                    except Exception as e:
+                        print(f"[Batch] ❌ Worker {worker_id} could not launch a browser: {e}")
+                        await record(self._error_result(task, e))
+                        continue
+
+                controller = AsyncAgentController(
+                    browser, self.processor, self.model,
+                    browser_executor=browser_executor, model_executor=self.model_executor,
+                    recorder=recorder, workflow_cache=self.workflow_cache,
+                    num_candidates=self.num_candidates, jump_scroll=self.jump_scroll,
+                    adapter=task.get("adapter", self.adapter), prefetcher=self.prefetcher
+                )
+                result = await self._run_one(controller, task)
+                await record(result)
+
+                if result["status"] in ("error", "timeout"):
+                    # The session may be wedged (or still busy with an abandoned call); start fresh
+                    recycle = True
+                elif self.resources is not None:
+                    # Measuring walks /proc, so keep it off the event loop
+                    recycle = await loop.run_in_executor(browser_executor, self.resources.task_done, browser, worker_id)
+                else:
+                    recycle = False
+
+                if not recycle and hasattr(browser, "reset_session"):
+                    # Next task starts logged out, with the HTTP cache still warm
+                    try:
+                        await loop.run_in_executor(browser_executor, browser.reset_session)
+                    except Exception as e:
+                        print(f"[Batch] ⚠️ Worker {worker_id} could not reset its session, restarting the browser: {e}")
+                        recycle = True
+
+                if recycle:
+                    await loop.run_in_executor(browser_executor, self._quit, browser)
+                    browser = None
+        finally:
+            if browser is not None:
+                await loop.run_in_executor(browser_executor, self._quit, browser)
+            browser_executor.shutdown(wait=False)
+
+    def _ends_with_newline(self, path):
+        with open(path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _quit(self, browser):
+        if self.resources is not None:
+            self.resources.forget(browser)
+        for key, value in (getattr(browser, "cache_stats", None) or {}).items():
+            self.cache_stats[key] = self.cache_stats.get(key, 0) + value
+        try:
+            browser.quit()
+        except Exception as e:
+            print(f"[Batch] ⚠️ Browser did not quit cleanly: {e}")
+
+    async def _run_one(self, controller, task):
+        max_steps = task.get("max_steps", self.max_steps)
+        timeout = task.get("timeout", self.task_timeout)
+
+        result = self._error_result(task)
+        start = time.time()
+        try:
+            async for update in controller.run_task_events(task["goal"], task["url"], max_steps, timeout=timeout):
+                if update["done"]:
+                    result["success"] = update["success"]
+                    result["status"] = update["status"]
+                    result["steps"] = update["steps"]
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            print(f"[Batch] ❌ Task {task['id']} crashed: {result['error']}")
+        result["duration_s"] = round(time.time() - start, 3)
+        return result
+
+    def _error_result(self, task, error=None):
+        return {
+            "id": task["id"], "goal": task["goal"], "url": task["url"],
+            "success": False, "status": "error", "steps": 0, "duration_s": 0.0,
+            "error": f"{type(error).__name__}: {error}" if error else None,
+        }
+
+    def _summarize(self, results, wall_s):
+        n = len(results)
+        statuses = {}
+        for r in results:
+            statuses[r["status"]] = statuses.get(r["status"], 0) + 1
+        total_steps = sum(r["steps"] for r in results)
+        return {
+            "tasks": n,
+            "succeeded": sum(1 for r in results if r["success"]),
+            "statuses": statuses,
+            "wall_s": round(wall_s, 2),
+            "tasks_per_min": round(n / wall_s * 60, 2) if wall_s > 0 else 0.0,
+            "steps_per_s": round(total_steps / wall_s, 3) if wall_s > 0 else 0.0,
+            "mean_task_s": round(sum(r["duration_s"] for r in results) / n, 2) if n else 0.0,
+        }
+
+    def _print_summary(self, summary):
+        print("\n" + "=" * 40)
+        print(f"📊 Batch finished: {summary['succeeded']}/{summary['tasks']} succeeded in {summary['wall_s']}s")
+        print(f"   Outcomes: {summary['statuses']}")
+        print(f"   Throughput: {summary['tasks_per_min']} tasks/min, {summary['steps_per_s']} steps/s")
+        print(f"   Mean task time: {summary['mean_task_s']}s")
+        if "workflow_cache" in summary:
+            cache = summary["workflow_cache"]
+            print(f"   Workflow cache: {cache['hits']}/{cache['lookups']} hits, {cache['model_calls_saved']} model calls saved")
+        if "browser_cache" in summary:
+            cache = summary["browser_cache"]
+            total = cache["hit_bytes"] + cache["network_bytes"]
+            print(f"   HTTP cache: {cache['hit_bytes'] / 2**20:.1f} MB of {total / 2**20:.1f} MB served from cache "
+                  f"({cache['hits']} hits, {cache['misses']} misses over {cache['pages']} page loads)")
+        if "prefetch" in summary:
+            prefetch = summary["prefetch"]
+            print(f"   Prefetch: {prefetch['hits']}/{prefetch['issued']} prefetched pages visited, "
+                  f"{prefetch['hits']}/{prefetch['navigations']} navigations warm, ~{prefetch['saved_s']}s of fetching saved, "
+                  f"{prefetch['bytes'] / 2**20:.1f} MB fetched")
+        if "inference_memo" in summary:
+            memo = summary["inference_memo"]
+            print(f"   Inference memo: {memo['memory_hits'] + memo['disk_hits']}/{memo['lookups']} hits "
+                  f"({memo['disk_hits']} from disk)")
@@ -1,6 +1,8 @@
 import os
 import time
 import io
+import base64
+from urllib.parse import urlsplit
 from PIL import Image
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
@@ -9,13 +11,35 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, ElementNotInteractableException
+from core.telemetry import tracer, metrics
+from core.layout import PageLayout
+from core.profiles import CACHE_STATS_JS, STORAGE_TYPES
+from core.prefetch import PREFETCH_JS, PREFETCH_TIMINGS_JS
 
 class Browser:
-    def __init__(self, headless=False, script_path=None):
+    def __init__(self, headless=False, script_path=None, observation="viewport", max_layout_viewports=6, profiles=None):
         """
         Initializes the Chrome driver and loads the stamping script
+
+        Args:
+            observation (str): "viewport" re-captures the page on every step.
+                               "layout" captures the page once (HTML, geometry and a tall screenshot)
+                               and serves scroll positions from that capture until the DOM changes.
+            max_layout_viewports (int): How many viewports tall a layout capture may be (bounds memory).
+            profiles: Optional core.profiles.ProfileManager. Chrome then runs on a persistent profile
+                      slot whose HTTP cache stays warm across tasks and restarts.
         """
         self.max_id = 0
+        self.observation = observation
+        self.max_layout_viewports = max_layout_viewports
+        self.layout = None
+        self.scroll_y = 0
+        # How long the controller should wait after scroll(); cached tiles need no settling
+        self.scroll_settle_s = 0 if observation == "layout" else 2
+        self.profiles = profiles
+        self.profile_dir = profiles.acquire() if profiles is not None else None
+        self._origins = set()
+        self.cache_stats = {"pages": 0, "hits": 0, "misses": 0, "opaque": 0, "hit_bytes": 0, "network_bytes": 0}
 
         options = uc.ChromeOptions()
         if headless:
@@ -28,16 +52,28 @@ class Browser:
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
 
+        chrome_kwargs = {}
+        if self.profile_dir:
+            for arg in profiles.chrome_arguments():
+                options.add_argument(arg)
+            chrome_kwargs["user_data_dir"] = os.path.abspath(self.profile_dir)
+
         linux_binary_path = "/usr/bin/google-chrome"
 
-        if os.path.exists(linux_binary_path):
-            self.driver = uc.Chrome(
-                options=options, 
-                browser_executable_path=linux_binary_path,
-                version_main=None # Let UC auto-detect version
-            )
-        else:
-            self.driver = uc.Chrome(options=options)
+        try:
+            if os.path.exists(linux_binary_path):
+                self.driver = uc.Chrome(
+                    options=options, 
+                    browser_executable_path=linux_binary_path,
+                    version_main=None, # Let UC auto-detect version
+                    **chrome_kwargs
+                )
+            else:
+                self.driver = uc.Chrome(options=options, **chrome_kwargs)
+        except Exception:
+            if self.profile_dir:
+                profiles.release(self.profile_dir)
+            raise
 
         self.wait = WebDriverWait(self.driver, 10)
 
@@ -54,15 +90,116 @@ class Browser:
         else:
             raise FileNotFoundError(f"Could not find stamp_page.js at {script_path}")
 
+        if observation == "layout":
+            layout_path = os.path.join(os.path.dirname(os.path.abspath(script_path)), "stamp_layout.js")
+            with open(layout_path, "r") as f:
+                self.layout_js = f.read()
+
     def navigate(self, url):
         """Goes to a URL and waits for the body to be present."""
         print(f"[Browser] Navigating to {url}...")
-        self.driver.get(url)
+        self.layout = None
+        self.scroll_y = 0
+        with tracer.span("browser.navigate", url=url):
+            self.driver.get(url)
+            try:
+                with tracer.span("browser.wait", reason="body"):
+                    self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+                self._settle(3)  # Small buffer for dynamic content to settle
+            except TimeoutException:
+                print("[Browser] Warning: Timeout waiting for page load, proceeding anyway.")
+        if self.profiles is not None:
+            self._origins.add(self._origin(url))
+            self._record_cache_stats()
+
+    @staticmethod
+    def _origin(url):
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _record_cache_stats(self):
+        """Adds the page just loaded to cache_stats (bytes served from the HTTP cache vs the network)."""
+        try:
+            stats = self.driver.execute_script(CACHE_STATS_JS)
+        except Exception as e:
+            print(f"[Browser] ⚠️ Could not read cache stats: {e}")
+            return
+        self.cache_stats["pages"] += 1
+        for key in ["hits", "misses", "opaque", "hit_bytes", "network_bytes"]:
+            self.cache_stats[key] += stats.get(key, 0)
+
+        resources = metrics.counter("groundhog_browser_resources_total", "Page resources by HTTP cache outcome")
+        resources.inc(stats.get("hits", 0), result="hit")
+        resources.inc(stats.get("misses", 0), result="miss")
+        resources.inc(stats.get("opaque", 0), result="opaque")
+        transferred = metrics.counter("groundhog_browser_bytes_total", "Page bytes by where they came from")
+        transferred.inc(stats.get("hit_bytes", 0), source="cache")
+        transferred.inc(stats.get("network_bytes", 0), source="network")
+
+    def reset_session(self):
+        """
+        Forgets cookies and site storage from earlier tasks while keeping the HTTP cache warm,
+        so consecutive tasks on one browser don't share logins, carts or consent state.
+        Storage is cleared for every origin navigated to and every origin holding a cookie.
+        No-op unless running on a managed profile with isolate_storage.
+        """
+        if self.profiles is None or not self.profiles.isolate_storage:
+            return
+        with tracer.span("browser.reset_session"):
+            self.driver.get("about:blank")
+            self.layout = None
+            cookies = self.driver.execute_cdp_cmd("Network.getAllCookies", {}).get("cookies", [])
+            for cookie in cookies:
+                domain = cookie.get("domain", "").lstrip(".")
+                if domain:
+                    self._origins.add(f"https://{domain}")
+                    self._origins.add(f"http://{domain}")
+            self.driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            for origin in self._origins:
+                self.driver.execute_cdp_cmd("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": STORAGE_TYPES})
+            self._origins.clear()
+
+    @property
+    def current_url(self):
+        return self.driver.current_url
+
+    def prefetch(self, element_ids):
+        """
+        Asks Chrome to prefetch, at idle priority, the pages the given stamped links point to.
+        Returns immediately with the URLs requested; the fetches run while the agent does other work.
+        """
+        with tracer.span("browser.prefetch", links=len(element_ids)) as span:
+            try:
+                urls = self.driver.execute_script(PREFETCH_JS, [str(i) for i in element_ids]) or []
+            except Exception as e:
+                print(f"[Browser] ⚠️ Could not prefetch: {e}")
+                urls = []
+            span.set("urls", len(urls))
+            return urls
+
+    def prefetch_timings(self):
+        """[{url, bytes, duration_s}] for the prefetches on this page that have finished."""
         try:
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(3)  # Small buffer for dynamic content to settle
-        except TimeoutException:
-            print("[Browser] Warning: Timeout waiting for page load, proceeding anyway.")
+            return self.driver.execute_script(PREFETCH_TIMINGS_JS) or []
+        except Exception as e:
+            print(f"[Browser] ⚠️ Could not read prefetch timings: {e}")
+            return []
+
+    def process_ids(self):
+        """PIDs of chromedriver and the Chrome it launched (their renderers are found as children)."""
+        pids = []
+        service = getattr(self.driver, "service", None)
+        if service is not None and getattr(service, "process", None) is not None:
+            pids.append(service.process.pid)
+        browser_pid = getattr(self.driver, "browser_pid", None)
+        if browser_pid:
+            pids.append(browser_pid)
+        return pids
+
+    def _settle(self, seconds):
+        """Fixed sleep for the page to react. Traced so idle time shows up per step."""
+        with tracer.span("browser.sleep", seconds=seconds):
+            time.sleep(seconds)
 
     def capture_state(self):
         """
@@ -74,9 +211,13 @@ class Browser:
             screenshot (PIL.Image): The raw screenshot
             html (str): The raw HTML string with injected IDs
         """
+        if self.observation == "layout":
+            return self._capture_layout_state()
+
         # Inject IDs
         # execute the script we loaded
-        max_id = self.driver.execute_script(self.stamper_js)
+        with tracer.span("browser.stamp"):
+            max_id = self.driver.execute_script(self.stamper_js)
         if max_id is None:
             self.max_id = 0
             print("[Browser] ⚠️ Warning: JS returned None. Max ID set to 0.")
@@ -86,12 +227,15 @@ class Browser:
 
         # Get HTML
         # We need the outerHTML of the document element to get the attributes we just added
-        raw_html = self.driver.execute_script("return document.documentElement.outerHTML;")
+        with tracer.span("browser.html") as span:
+            raw_html = self.driver.execute_script("return document.documentElement.outerHTML;")
+            span.set("bytes", len(raw_html))
 
         # Get Screenshot
         # We get it as PNG bytes and convert to PIL Image in memory
-        png_data = self.driver.get_screenshot_as_png()
-        screenshot = Image.open(io.BytesIO(png_data)).convert("RGB")
+        with tracer.span("browser.screenshot"):
+            png_data = self.driver.get_screenshot_as_png()
+            screenshot = Image.open(io.BytesIO(png_data)).convert("RGB")
 
         return screenshot, raw_html
 
@@ -100,6 +244,14 @@ class Browser:
         Executes an action on a specific element identified by the VLM.
         Returns True if successful, False otherwise.
         """
+        # Actions can change what is on screen without touching the DOM (typed text, focus)
+        self.layout = None
+        with tracer.span("browser.action", action=action, element_id=element_id) as span:
+            success = self._execute_action(action, element_id, value)
+            span.set("success", success)
+            return success
+
+    def _execute_action(self, action, element_id, value=None):
         # LOGIC VALIDATION
         try:
             eid_int = int(element_id)
@@ -127,7 +279,7 @@ class Browser:
             
             # Scroll into view to ensure interactability
             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", element)
-            time.sleep(0.5)
+            self._settle(0.5)
 
             print(f"[Browser] Executing {action} on Element {element_id} ({element.tag_name})")
 
@@ -167,7 +319,7 @@ class Browser:
                     # In a real agent, you might need a follow-up action to click the option
                     # But for single-step prediction, clicking the dropdown opener is often the first step
 
-            time.sleep(1) # Wait for page reaction
+            self._settle(1) # Wait for page reaction
             return True
 
         # EXCEPTION HANDLING
@@ -193,6 +345,9 @@ class Browser:
         Scrolls the page. 
         Used when the VLM cannot find the target (ID=0) or predicts a scroll action.
         """
+        if self.layout is not None and (amount is None or isinstance(amount, (int, float))):
+            return self._scroll_layout(direction, amount)
+
         if amount is None:
             # Default to roughly one viewport height
             amount = "window.innerHeight * 0.8"
@@ -208,9 +363,83 @@ class Browser:
         elif direction == "bottom":
             script = "window.scrollTo(0, document.body.scrollHeight);"
         
-        self.driver.execute_script(script)
+        with tracer.span("browser.scroll", direction=direction):
+            self.driver.execute_script(script)
         print(f"[Browser] Scrolled {direction}")
-        time.sleep(0.5)
+        self._settle(0.5)
+
+    def scroll_to(self, y):
+        """Scrolls so page position y (CSS px) is at the top of the viewport."""
+        cached = self.layout is not None
+        if cached:
+            self.scroll_y = y = self.layout.clamp(y)
+        with tracer.span("browser.scroll", direction="to", y=y, cached=cached):
+            self.driver.execute_script("window.scrollTo(0, arguments[0]);", y)
+        print(f"[Browser] Jumped to y={y}")
+        if not cached:
+            self._settle(0.5)
+
+    def _layout_is_current(self):
+        """One tiny round trip instead of a restamp: has the page changed since the layout capture?"""
+        with tracer.span("browser.layout_check"):
+            mutations, url = self.driver.execute_script(
+                "return [window.__m2wMutations === undefined ? -1 : window.__m2wMutations, location.href];"
+            )
+        return mutations == self.layout.mutations and url == self.layout.url and self.layout.covers(self.scroll_y)
+
+    def _capture_layout_state(self):
+        if self.layout is not None and self._layout_is_current():
+            with tracer.span("browser.tile", y=self.scroll_y):
+                print(f"[Browser] Serving cached layout at y={self.scroll_y}")
+                return self.layout.tile(self.scroll_y)
+
+        with tracer.span("browser.stamp", mode="layout"):
+            info = self.driver.execute_script(self.layout_js)
+        self.max_id = int(info["maxId"])
+        print(f"[Browser] Stamped page layout. Max ID: {self.max_id}")
+
+        with tracer.span("browser.html") as span:
+            raw_html = self.driver.execute_script("return document.documentElement.outerHTML;")
+            span.set("bytes", len(raw_html))
+
+        # Capture from the current position down, so later scrolls are served from memory
+        origin = info["scrollY"]
+        height = min(info["pageHeight"] - origin, info["viewportHeight"] * self.max_layout_viewports)
+        height = max(height, info["viewportHeight"])
+        with tracer.span("browser.screenshot", full_page=True, height=height):
+            data = self.driver.execute_cdp_cmd("Page.captureScreenshot", {
+                "format": "png",
+                "captureBeyondViewport": True,
+                "clip": {"x": 0, "y": origin, "width": info["viewportWidth"], "height": height, "scale": 1},
+            })
+            screenshot = Image.open(io.BytesIO(base64.b64decode(data["data"]))).convert("RGB")
+
+        self.layout = PageLayout(
+            screenshot, raw_html, info["viewportWidth"], info["viewportHeight"], info["pageHeight"],
+            origin_y=origin, url=self.driver.current_url, mutations=info["mutations"]
+        )
+        self.scroll_y = origin
+        return self.layout.tile(origin)
+
+    def _scroll_layout(self, direction, amount=None):
+        """Moves the cached viewport; the window follows so lazy-loaded content still triggers."""
+        step = self.layout.viewport_height * 0.8 if amount is None else amount
+        targets = {
+            "down": self.scroll_y + step,
+            "up": self.scroll_y - step,
+            "top": 0,
+            "bottom": self.layout.max_scroll,
+        }
+        self.scroll_y = self.layout.clamp(targets.get(direction, self.scroll_y))
+
+        with tracer.span("browser.scroll", direction=direction, cached=True):
+            self.driver.execute_script("window.scrollTo(0, arguments[0]);", self.scroll_y)
+        print(f"[Browser] Scrolled {direction} to y={self.scroll_y} (layout)")
 
     def quit(self):
-        self.driver.quit()
\ No newline at end of file
+        try:
+            self.driver.quit()
+        finally:
+            if self.profile_dir:
+                self.profiles.release(self.profile_dir)
+                self.profile_dir = None
\ No newline at end of file
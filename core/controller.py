@@ -2,21 +2,56 @@ import time
 import json
 import re
 import os
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from core.browser import Browser
 from core.processor import Processor
 from core.model import ModelEngine
+from core.telemetry import tracer, count
+from core.workflow_cache import UNKNOWN_STEP
+
+def _full_state_update(state, event):
+    """Folds a step event into the accumulated {"screenshot", "log", "done"} dictionary."""
+    state["lines"].extend(event["lines"])
+    if event["screenshot"] is not None:
+        state["screenshot"] = event["screenshot"]
+    update = {"screenshot": state["screenshot"], "log": "\n".join(state["lines"]), "done": event["done"]}
+    if event["done"]:
+        update.update(success=event["success"], status=event["status"], steps=event["steps"])
+    return update
 
 class AgentController:
-    def __init__(self, browser: Browser, processor: Processor, model: ModelEngine):
+    def __init__(self, browser: Browser, processor: Processor, model: ModelEngine, recorder=None, workflow_cache=None,
+                 num_candidates=1, jump_scroll=False, adapter=None, prefetcher=None):
         """
         Args:
-            browser: Instance of core.browser.Browser
+            browser: Instance of core.browser.Browser (or core.recorder.ReplayBrowser)
             processor: Instance of core.processor.Processor
             model: Instance of core.model.ModelEngine
+            recorder: Optional core.recorder.TrajectoryRecorder that saves every step
+            workflow_cache: Optional core.workflow_cache.WorkflowCache that replays learned actions
+            num_candidates (int): Actions to ask the model for per step (beam search). Invalid or failing
+                                  ones fall through to the next candidate instead of costing a step.
+            jump_scroll (bool): On ID 0, scroll straight to the off-screen element that best matches
+                                the goal instead of one viewport down.
+            adapter (str, optional): Named LoRA adapter to predict with (see ModelEngine); None = the model's default.
+            prefetcher: Optional core.prefetch.Prefetcher that prefetches likely next pages while the model runs.
         """
         self.browser = browser
         self.processor = processor
         self.model = model
+        self.recorder = recorder
+        self.workflow_cache = workflow_cache
+        self.num_candidates = num_candidates
+        self.jump_scroll = jump_scroll
+        self.adapter = adapter
+        self.prefetcher = prefetcher
+        self._prefetch = None
+        self._offscreen = None
+        self._jumped = set()
+        self._cache_steps = []
+        self._cache_prev = None
 
     def _extract_json(self, text):
         """
@@ -52,72 +87,275 @@ class AgentController:
         ids = re.findall(r"\[(\d+)\]", distilled_dom)
         return set(ids)
 
-    def run_task_generator(self, goal, start_url, max_steps=15):
+    def _observe(self, goal, screenshot, raw_html):
+        """
+        Turns a raw browser capture into model inputs.
+        Returns (processed_img, distilled_dom, prompt).
+        """
+        processed_img = self.processor.process_image(screenshot)
+        if self.jump_scroll:
+            distilled_dom, self._offscreen = self.processor.distill_dom_with_index(raw_html)
+        else:
+            distilled_dom = self.processor.distill_dom(raw_html)
+        prompt = self.processor.format_prompt(goal, distilled_dom)
+        return processed_img, distilled_dom, prompt
+
+    def _parse_action(self, action_dict):
+        """
+        Normalizes a parsed model prediction.
+        Returns (element_id, action_type, value).
+        """
+        element_id = str(action_dict.get("element_id", "0"))
+        # cleanup weird strings
+        if element_id.lower() in ["none", "null", "nan", "undefined"]: element_id = "0"
+
+        action_type = action_dict.get("action", "").lower()
+        value = action_dict.get("value", "")
+        return element_id, action_type, value
+
+    def _generate(self, processed_img, prompt):
+        """Returns the model's raw outputs for this step, best first (just one unless num_candidates > 1)."""
+        # Only pass adapter when set, so single-model stand-ins (ReplayModel) keep working
+        kwargs = {"adapter": self.adapter} if self.adapter is not None else {}
+        if self.num_candidates > 1 and hasattr(self.model, "predict_candidates"):
+            return [text for text, _ in self.model.predict_candidates(processed_img, prompt, k=self.num_candidates, **kwargs)]
+        return [self.model.predict(processed_img, prompt, **kwargs)]
+
+    def _select_candidate(self, candidates, distilled_dom):
+        """
+        Picks the first candidate that parses and is actionable on this page.
+        Returns (raw_pred, action_dict, fallbacks), where fallbacks are the remaining
+        (raw_pred, action_dict) element actions to try if the browser fails to execute the chosen one.
+        If no candidate is usable the first is returned, so the normal retry path handles it.
+        """
+        if len(candidates) == 1:
+            return candidates[0], self._extract_json(candidates[0]), []
+
+        valid_ids = self._get_valid_ids_from_dom(distilled_dom)
+        usable = []
+        for raw in candidates:
+            action_dict = self._extract_json(raw)
+            if not action_dict:
+                continue
+            element_id, action_type, _ = self._parse_action(action_dict)
+            if action_dict.get("is_finished", False) or element_id == "0" or action_type == "scroll" or element_id in valid_ids:
+                usable.append((raw, action_dict))
+
+        if not usable:
+            return candidates[0], self._extract_json(candidates[0]), []
+        if usable[0][0] is not candidates[0]:
+            count("candidate_fallback")
+
+        raw_pred, action_dict = usable[0]
+        # Only other element actions are worth trying after a failed click; never finish or scroll instead
+        fallbacks = []
+        for raw, candidate in usable[1:]:
+            element_id, action_type, _ = self._parse_action(candidate)
+            if not candidate.get("is_finished", False) and element_id != "0" and action_type != "scroll":
+                fallbacks.append((raw, candidate))
+        return raw_pred, action_dict, fallbacks
+
+    def _next_fallback(self, fallbacks, logs):
+        """Pops the next fallback candidate. Returns (action_dict, element_id, action_type, value)."""
+        _, action_dict = fallbacks.pop(0)
+        element_id, action_type, value = self._parse_action(action_dict)
+        msg = f"↪️ Action failed, trying next candidate: {action_type} on ID {element_id} ({value})"
+        print(f"[Agent] {msg}")
+        logs.append(msg)
+        count("candidate_fallback")
+        return action_dict, element_id, action_type, value
+
+    def _record_start(self, goal, start_url):
+        if self.recorder:
+            self.recorder.start(goal, start_url)
+
+    def _record_step(self, step, screenshot, raw_html, distilled_dom, prompt, raw_pred, action_dict):
+        if self.recorder:
+            self.recorder.record_step(
+                step, screenshot, raw_html, getattr(self.browser, "max_id", 0),
+                distilled_dom, prompt, raw_pred, action_dict
+            )
+
+    def _record_finish(self, status):
+        if self.recorder:
+            self.recorder.finish(status)
+
+    def _current_url(self, fallback):
+        url = getattr(self.browser, "current_url", None)
+        return url if isinstance(url, str) else fallback
+
+    def _cache_lookup(self, goal, url, distilled_dom):
+        """Returns (raw_pred, cache_key) from the workflow cache, or (None, None) on a miss."""
+        if self.workflow_cache is None or self._cache_prev is UNKNOWN_STEP:
+            return None, None
+        cached = self.workflow_cache.lookup(goal, url, distilled_dom, previous=self._cache_prev)
+        if cached is None:
+            return None, None
+        cache_key = cached.pop("_cache_key")
+        return json.dumps(cached), cache_key
+
+    def _cache_note(self, goal, url, distilled_dom, action_dict):
+        """Remembers a step that worked; it only enters the cache if the whole task succeeds."""
+        if self.workflow_cache is None:
+            return
+        step = self.workflow_cache.make_step(goal, url, distilled_dom, action_dict, previous=self._cache_prev)
+        if step is not None and self._cache_prev is not UNKNOWN_STEP:
+            self._cache_steps.append(step)
+        # A recordable step gives the next one a known predecessor again; an unrecordable one loses it
+        self._cache_prev = step if step is not None else UNKNOWN_STEP
+
+    def _cache_commit(self):
+        if self.workflow_cache is not None:
+            self.workflow_cache.commit(self._cache_steps)
+        self._cache_steps = []
+        self._cache_prev = None
+
+    def _cache_reject(self, cache_key):
+        if cache_key:
+            print("[Agent] ⚠️ Cached action failed, dropping it from the workflow cache.")
+            self.workflow_cache.invalidate(cache_key)
+
+    def _jump_target(self, goal, logs):
         """
-        loop for UIs (Gradio).
-        Yields a dictionary at every step: 
+        Picks where an ID-0 step should scroll to: the page y of the best goal match off screen,
+        or None to fall back to scrolling one viewport down.
+        """
+        if not self.jump_scroll or not self._offscreen or not hasattr(self.browser, "scroll_to"):
+            return None
+        entry = self._offscreen.best(goal, exclude=self._jumped)
+        if entry is None:
+            return None
+        # Don't come back to the same element if the model still can't use it
+        self._jumped.add(self._offscreen.key(entry))
+        count("jump_scroll")
+        logs.append(f"🎯 Jumping to off-screen [{entry[0]}] <{entry[1]}> {entry[2]}")
+        return self._offscreen.jump_position(entry)
+
+    def _prefetch_start(self):
+        """Fresh per-task prefetch state, when prefetching is on and the browser supports it."""
+        enabled = self.prefetcher is not None and hasattr(self.browser, "prefetch")
+        self._prefetch = self.prefetcher.task() if enabled else None
+
+    def _prefetch_issue(self, goal, distilled_dom):
+        """Starts fetching the likeliest next pages; runs just before the model so they load while it thinks."""
+        urls = self._prefetch.issue(self.browser, goal, distilled_dom)
+        if urls:
+            print(f"[Agent] Prefetching {len(urls)} page(s) while the model thinks.")
+
+    def _prefetch_collect(self):
+        """Reads prefetch timings before an action can navigate away. Returns the URL before the action."""
+        self._prefetch.collect(self.browser)
+        return self._current_url(None)
+
+    def _prefetch_navigated(self, before_url):
+        if self._prefetch.navigated(before_url, self._current_url(None)):
+            count("prefetch_hit")
+
+    def _scroll_settle_s(self):
+        """Pause after a scroll; browsers serving cached layouts say they need none."""
+        seconds = getattr(self.browser, "scroll_settle_s", 2)
+        return seconds if isinstance(seconds, (int, float)) else 2
+
+    def _settle(self, seconds):
+        """Waits for the page to react to an action."""
+        with tracer.span("agent.sleep", seconds=seconds):
+            time.sleep(seconds)
+
+    def _event(self, kind, step, logs, screenshot=None, done=False, **fields):
+        """
+        Builds one step event carrying only what is new since the previous event.
+        Moves the pending lines out of `logs`, so each line is sent exactly once.
+        """
+        event = {"type": kind, "step": step, "lines": logs[:], "screenshot": screenshot, "done": done}
+        event.update(fields)
+        logs.clear()
+        return event
+
+    def run_task_events(self, goal, start_url, max_steps=15):
+        """
+        Main agent loop. Yields typed step events holding deltas only:
         {
-            "screenshot": PIL_Image, 
-            "log": "text string", 
+            "type": "observation" | "thinking" | "action" | "result",
+            "step": int,
+            "lines": [new log lines],
+            "screenshot": PIL_Image (only on "observation", else None),
             "done": bool
         }
+        "action" events also carry "action"; the final "result" event carries "success", "status" and "steps".
         """
         print(f"\n🚀 [Agent] Starting Task: {goal}")
+        self._record_start(goal, start_url)
         self.browser.navigate(start_url)
         
         logs = [f"🚀 Goal: {goal}", f"🌐 URL: {start_url}"]
+        self._cache_steps = []
+        self._cache_prev = None
+        self._jumped = set()
+        self._prefetch_start()
         
         for step in range(1, max_steps + 1):
             step_header = f"\n--- Step {step}/{max_steps} ---"
             print(step_header)
+            count("step")
             logs.append(step_header)
             
             screenshot, raw_html = self.browser.capture_state()
             
-            processed_img = self.processor.process_image(screenshot)
-            distilled_dom = self.processor.distill_dom(raw_html)
-            prompt = self.processor.format_prompt(goal, distilled_dom)
+            processed_img, distilled_dom, prompt = self._observe(goal, screenshot, raw_html)
             
             element_count = distilled_dom.count('\n') + 1
             dom_msg = f"👁️ Processed DOM: {element_count} visible elements."
             print(dom_msg)
             logs.append(dom_msg)
 
-            yield {"screenshot": processed_img, "log": "\n".join(logs), "done": False}
+            yield self._event("observation", step, logs, screenshot=processed_img)
 
-            print("[Agent] Thinking...")
-            logs.append("🧠 Thinking...")
-            yield {"screenshot": processed_img, "log": "\n".join(logs), "done": False}
-            
-            raw_pred = self.model.predict(processed_img, prompt)
-            
-            action_dict = self._extract_json(raw_pred)
+            url = self._current_url(start_url) if self.workflow_cache is not None else start_url
+            raw_pred, cache_key = self._cache_lookup(goal, url, distilled_dom)
+
+            if raw_pred is not None:
+                hit_msg = "⚡ Workflow cache hit, skipping the model."
+                print(f"[Agent] {hit_msg}")
+                logs.append(hit_msg)
+                action_dict, fallbacks = self._extract_json(raw_pred), []
+            else:
+                print("[Agent] Thinking...")
+                logs.append("🧠 Thinking...")
+                yield self._event("thinking", step, logs)
+
+                if self._prefetch is not None:
+                    self._prefetch_issue(goal, distilled_dom)
+                candidates = self._generate(processed_img, prompt)
+                raw_pred, action_dict, fallbacks = self._select_candidate(candidates, distilled_dom)
             
             print(f"[Agent] Raw Output: {raw_pred}")
+            self._record_step(step, screenshot, raw_html, distilled_dom, prompt, raw_pred, action_dict)
+            # Full-size capture is not needed past this point; drop it before the next one is taken
+            screenshot = raw_html = None
             
             if not action_dict:
                 err = f"⚠️ Invalid JSON output. Retrying...\nRaw: {raw_pred}"
                 print(err)
                 logs.append(err)
+                count("retry")
                 continue
 
             if action_dict.get("is_finished", False):
                 msg = f"✅ Task Complete. Result: {action_dict.get('value', '')}"
                 print(msg)
+                count("task_success")
                 logs.append(msg)
-                yield {"screenshot": processed_img, "log": "\n".join(logs), "done": True}
+                self._cache_note(goal, url, distilled_dom, action_dict)
+                self._cache_commit()
+                self._record_finish("success")
+                yield self._event("result", step, logs, done=True, success=True, status="success", steps=step)
                 return
 
-            element_id = str(action_dict.get("element_id", "0"))
-            # cleanup weird strings
-            if element_id.lower() in ["none", "null", "nan", "undefined"]: element_id = "0"
-            
-            action_type = action_dict.get("action", "").lower()
-            value = action_dict.get("value", "")
+            element_id, action_type, value = self._parse_action(action_dict)
 
             action_msg = f"🤖 Action: {action_type} on ID {element_id} ({value})"
             logs.append(action_msg)
-            yield {"screenshot": processed_img, "log": "\n".join(logs), "done": False}
+            yield self._event("action", step, logs, action=action_dict)
 
             valid_ids = self._get_valid_ids_from_dom(distilled_dom)
 
@@ -126,23 +364,343 @@ class AgentController:
                 warn = f"⚠️ Hallucination: ID {element_id} not visible. Retrying..."
                 print(warn)
                 logs.append(warn)
+                count("hallucination")
+                self._cache_reject(cache_key)
                 continue 
 
             # case: scroll
             if element_id == "0" or action_type == "scroll":
-                logs.append("📜 Scrolling down...")
-                self.browser.scroll("down")
-                time.sleep(2)
+                count("scroll")
+                self._cache_note(goal, url, distilled_dom, action_dict)
+                target = self._jump_target(goal, logs)
+                if target is None:
+                    logs.append("📜 Scrolling down...")
+                    self.browser.scroll("down")
+                else:
+                    self.browser.scroll_to(target)
+                self._settle(self._scroll_settle_s())
                 continue
 
             # case: execute
+            before_url = self._prefetch_collect() if self._prefetch is not None else None
             success = self.browser.execute_action(action_type, element_id, value)
-            if not success:
+            while not success and fallbacks:
+                action_dict, element_id, action_type, value = self._next_fallback(fallbacks, logs)
+                success = self.browser.execute_action(action_type, element_id, value)
+            if success:
+                self._cache_note(goal, url, distilled_dom, action_dict)
+            else:
                 logs.append("⚠️ Browser action failed.")
+                count("action_failed")
+                self._cache_reject(cache_key)
             
-            time.sleep(2)
+            self._settle(2)
+            if self._prefetch is not None:
+                self._prefetch_navigated(before_url)
 
         fail_msg = "❌ Max steps reached."
         print(fail_msg)
         logs.append(fail_msg)
-        yield {"screenshot": processed_img, "log": "\n".join(logs), "done": True}
\ No newline at end of file
+        self._record_finish("max_steps")
+        yield self._event("result", max_steps, logs, done=True, success=False, status="max_steps", steps=max_steps)
+
+    def run_task_generator(self, goal, start_url, max_steps=15):
+        """
+        Full-state stream built on run_task_events.
+        Yields a dictionary at every event: 
+        {
+            "screenshot": PIL_Image (latest frame), 
+            "log": "text string" (everything so far), 
+            "done": bool
+        }
+        The final dictionary also carries "success", "status" and "steps".
+        Every yield re-joins the whole log, so prefer run_task_events for long sessions.
+        """
+        state = {"lines": [], "screenshot": None}
+        for event in self.run_task_events(goal, start_url, max_steps):
+            yield _full_state_update(state, event)
+
+    def run_task(self, goal, start_url, max_steps=15):
+        """
+        Runs a task to completion (CLI / batch use).
+        Returns True only if the model declared the task finished.
+        """
+        success = False
+        for event in self.run_task_events(goal, start_url, max_steps):
+            if event["done"]:
+                success = event["success"]
+        return success
+
+class AsyncAgentController(AgentController):
+    """
+    Asyncio-native variant of AgentController.
+
+    Browser, model and processing calls are blocking, so they are run on executors
+    and awaited. This lets many tasks share one event loop (and one model) instead of
+    needing an OS thread per task.
+    """
+
+    # Shared by every controller that is not given its own model executor,
+    # so concurrent tasks queue up on a single model instead of calling it in parallel.
+    _default_model_executor = None
+
+    def __init__(self, browser, processor, model, browser_executor=None, model_executor=None, cpu_executor=None,
+                 recorder=None, workflow_cache=None, num_candidates=1, jump_scroll=False, adapter=None, prefetcher=None):
+        """
+        Args:
+            browser: Instance of core.browser.Browser
+            processor: Instance of core.processor.Processor
+            model: Instance of core.model.ModelEngine
+            browser_executor: Executor for driver calls. Defaults to a private single thread,
+                              since a WebDriver session should only be used from one thread.
+            model_executor: Executor for model.predict. Defaults to one thread shared by all
+                            AsyncAgentControllers.
+            cpu_executor: Executor for Processor work (image resize, DOM distillation).
+                          A ProcessPoolExecutor avoids holding the GIL. Defaults to the loop's executor.
+            recorder: Optional core.recorder.TrajectoryRecorder that saves every step
+            workflow_cache: Optional core.workflow_cache.WorkflowCache (may be shared between controllers)
+            num_candidates (int): Candidate actions per step, see AgentController
+            jump_scroll (bool): Jump to off-screen goal matches on ID 0, see AgentController
+            adapter (str, optional): Named LoRA adapter to predict with, see AgentController
+            prefetcher: Optional core.prefetch.Prefetcher (may be shared between controllers), see AgentController
+        """
+        super().__init__(browser, processor, model, recorder=recorder, workflow_cache=workflow_cache,
+                         num_candidates=num_candidates, jump_scroll=jump_scroll, adapter=adapter, prefetcher=prefetcher)
+
+        self._owns_browser_executor = browser_executor is None
+        self.browser_executor = browser_executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="browser")
+
+        if model_executor is None:
+            if AsyncAgentController._default_model_executor is None:
+                AsyncAgentController._default_model_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model")
+            model_executor = AsyncAgentController._default_model_executor
+        self.model_executor = model_executor
+        self.cpu_executor = cpu_executor
+
+    async def _call(self, executor, fn, *args, deadline=None):
+        """
+        Runs a blocking call on an executor and awaits it.
+        Raises asyncio.TimeoutError if the task deadline passes first.
+        NOTE: a timed-out call keeps running in its thread, it is only abandoned.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, functools.partial(fn, *args))
+        if deadline is None:
+            return await future
+        return await asyncio.wait_for(future, max(0.0, deadline - loop.time()))
+
+    async def _sleep(self, seconds, deadline=None):
+        """Non-blocking replacement for time.sleep that respects the task deadline."""
+        if deadline is not None:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= seconds:
+                raise asyncio.TimeoutError()
+        await asyncio.sleep(seconds)
+
+    async def _observe_async(self, goal, screenshot, raw_html, deadline=None):
+        processed_img = await self._call(self.cpu_executor, self.processor.process_image, screenshot, deadline=deadline)
+        if self.jump_scroll:
+            distilled_dom, self._offscreen = await self._call(
+                self.cpu_executor, self.processor.distill_dom_with_index, raw_html, deadline=deadline
+            )
+        else:
+            distilled_dom = await self._call(self.cpu_executor, self.processor.distill_dom, raw_html, deadline=deadline)
+        prompt = self.processor.format_prompt(goal, distilled_dom)
+        return processed_img, distilled_dom, prompt
+
+    async def run_task_events(self, goal, start_url, max_steps=15, timeout=None, cancel_event=None):
+        """
+        Async generator version of AgentController.run_task_events.
+        Yields the same step events; the final "result" status is one of
+        "success", "max_steps", "cancelled" or "timeout".
+
+        Args:
+            timeout (float, optional): Wall-clock budget for the whole task in seconds.
+            cancel_event (asyncio.Event, optional): Set it to stop the task cooperatively
+                                                    at the next stage boundary.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+
+        print(f"\n🚀 [Agent] Starting Task: {goal}")
+        logs = [f"🚀 Goal: {goal}", f"🌐 URL: {start_url}"]
+        processed_img = None
+        step = 0
+        self._cache_steps = []
+        self._cache_prev = None
+        self._jumped = set()
+        self._prefetch_start()
+
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+
+        try:
+            self._record_start(goal, start_url)
+            await self._call(self.browser_executor, self.browser.navigate, start_url, deadline=deadline)
+
+            for step in range(1, max_steps + 1):
+                if cancelled():
+                    break
+
+                step_header = f"\n--- Step {step}/{max_steps} ---"
+                print(step_header)
+                count("step")
+                logs.append(step_header)
+
+                screenshot, raw_html = await self._call(self.browser_executor, self.browser.capture_state, deadline=deadline)
+                processed_img, distilled_dom, prompt = await self._observe_async(goal, screenshot, raw_html, deadline=deadline)
+
+                element_count = distilled_dom.count('\n') + 1
+                dom_msg = f"👁️ Processed DOM: {element_count} visible elements."
+                print(dom_msg)
+                logs.append(dom_msg)
+                yield self._event("observation", step, logs, screenshot=processed_img)
+
+                if cancelled():
+                    break
+
+                url = start_url
+                if self.workflow_cache is not None:
+                    url = await self._call(self.browser_executor, self._current_url, start_url, deadline=deadline)
+                raw_pred, cache_key = self._cache_lookup(goal, url, distilled_dom)
+
+                if raw_pred is not None:
+                    hit_msg = "⚡ Workflow cache hit, skipping the model."
+                    print(f"[Agent] {hit_msg}")
+                    logs.append(hit_msg)
+                    action_dict, fallbacks = self._extract_json(raw_pred), []
+                else:
+                    print("[Agent] Thinking...")
+                    logs.append("🧠 Thinking...")
+                    yield self._event("thinking", step, logs)
+
+                    if self._prefetch is not None:
+                        await self._call(self.browser_executor, self._prefetch_issue, goal, distilled_dom, deadline=deadline)
+                    candidates = await self._call(self.model_executor, self._generate, processed_img, prompt, deadline=deadline)
+                    raw_pred, action_dict, fallbacks = self._select_candidate(candidates, distilled_dom)
+                print(f"[Agent] Raw Output: {raw_pred}")
+                if self.recorder:
+                    await self._call(
+                        self.browser_executor, self._record_step,
+                        step, screenshot, raw_html, distilled_dom, prompt, raw_pred, action_dict
+                    )
+                # Full-size capture is not needed past this point; drop it before the next one is taken
+                screenshot = raw_html = None
+
+                if not action_dict:
+                    err = f"⚠️ Invalid JSON output. Retrying...\nRaw: {raw_pred}"
+                    print(err)
+                    logs.append(err)
+                    count("retry")
+                    continue
+
+                if action_dict.get("is_finished", False):
+                    msg = f"✅ Task Complete. Result: {action_dict.get('value', '')}"
+                    print(msg)
+                    count("task_success")
+                    logs.append(msg)
+                    self._cache_note(goal, url, distilled_dom, action_dict)
+                    self._cache_commit()
+                    self._record_finish("success")
+                    yield self._event("result", step, logs, done=True, success=True, status="success", steps=step)
+                    return
+
+                element_id, action_type, value = self._parse_action(action_dict)
+
+                action_msg = f"🤖 Action: {action_type} on ID {element_id} ({value})"
+                logs.append(action_msg)
+                yield self._event("action", step, logs, action=action_dict)
+
+                if cancelled():
+                    break
+
+                valid_ids = self._get_valid_ids_from_dom(distilled_dom)
+
+                # case: Not in DOM - hallucination
+                if element_id != "0" and action_type != "scroll" and element_id not in valid_ids:
+                    warn = f"⚠️ Hallucination: ID {element_id} not visible. Retrying..."
+                    print(warn)
+                    logs.append(warn)
+                    count("hallucination")
+                    self._cache_reject(cache_key)
+                    continue
+
+                # case: scroll
+                if element_id == "0" or action_type == "scroll":
+                    count("scroll")
+                    self._cache_note(goal, url, distilled_dom, action_dict)
+                    target = self._jump_target(goal, logs)
+                    if target is None:
+                        logs.append("📜 Scrolling down...")
+                        await self._call(self.browser_executor, self.browser.scroll, "down", deadline=deadline)
+                    else:
+                        await self._call(self.browser_executor, self.browser.scroll_to, target, deadline=deadline)
+                    await self._sleep(self._scroll_settle_s(), deadline)
+                    continue
+
+                # case: execute
+                before_url = None
+                if self._prefetch is not None:
+                    before_url = await self._call(self.browser_executor, self._prefetch_collect, deadline=deadline)
+                success = await self._call(
+                    self.browser_executor, self.browser.execute_action, action_type, element_id, value, deadline=deadline
+                )
+                while not success and fallbacks:
+                    action_dict, element_id, action_type, value = self._next_fallback(fallbacks, logs)
+                    success = await self._call(
+                        self.browser_executor, self.browser.execute_action, action_type, element_id, value, deadline=deadline
+                    )
+                if success:
+                    self._cache_note(goal, url, distilled_dom, action_dict)
+                else:
+                    logs.append("⚠️ Browser action failed.")
+                    count("action_failed")
+                    self._cache_reject(cache_key)
+
+                await self._sleep(2, deadline)
+                if self._prefetch is not None:
+                    await self._call(self.browser_executor, self._prefetch_navigated, before_url, deadline=deadline)
+
+            else:
+                fail_msg = "❌ Max steps reached."
+                print(fail_msg)
+                logs.append(fail_msg)
+                self._record_finish("max_steps")
+                yield self._event("result", max_steps, logs, done=True, success=False, status="max_steps", steps=max_steps)
+                return
+
+            stop_msg = "🛑 Task cancelled."
+            print(stop_msg)
+            logs.append(stop_msg)
+            self._record_finish("cancelled")
+            yield self._event("result", step, logs, done=True, success=False, status="cancelled", steps=step)
+
+        except asyncio.TimeoutError:
+            timeout_msg = f"⏱️ Task timed out after {timeout}s."
+            print(timeout_msg)
+            count("timeout")
+            logs.append(timeout_msg)
+            self._record_finish("timeout")
+            yield self._event("result", step, logs, done=True, success=False, status="timeout", steps=step)
+
+    async def run_task_generator(self, goal, start_url, max_steps=15, timeout=None, cancel_event=None):
+        """Async version of AgentController.run_task_generator (full-state dictionaries)."""
+        state = {"lines": [], "screenshot": None}
+        async for event in self.run_task_events(goal, start_url, max_steps, timeout, cancel_event):
+            yield _full_state_update(state, event)
+
+    async def run_task(self, goal, start_url, max_steps=15, timeout=None, cancel_event=None):
+        """
+        Runs a task to completion.
+        Returns True only if the model declared the task finished.
+        """
+        success = False
+        async for event in self.run_task_events(goal, start_url, max_steps, timeout, cancel_event):
+            if event["done"]:
+                success = event.get("success", False)
+        return success
+
+    def close(self):
+        """Releases the private browser executor (the browser itself is owned by the caller)."""
+        if self._owns_browser_executor:
+            self.browser_executor.shutdown(wait=False)
@@ -0,0 +1,233 @@
+import os
+import io
+import json
+import time
+import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PIL import Image
+from core.processor import Processor
+
+PROGRESS_FILE = "progress.jsonl"
+IMAGE_DIR = "images"
+
+# Set once per worker process by _init_worker
+_processor = None
+
+
+def iter_shards(path, shard_size, limit=None):
+    """
+    Yields lists of raw Mind2Web rows (dicts), shard_size at a time.
+    Reads Multimodal-Mind2Web parquet files (needs pyarrow) or JSONL with the same fields.
+    """
+    remaining = limit
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        batches = (batch.to_pylist() for batch in pq.ParquetFile(path).iter_batches(batch_size=shard_size))
+    else:
+        batches = _jsonl_batches(path, shard_size)
+
+    for rows in batches:
+        if remaining is not None:
+            rows = rows[:remaining]
+            remaining -= len(rows)
+        if rows:
+            yield rows
+        if remaining is not None and remaining <= 0:
+            return
+
+
+def _jsonl_batches(path, shard_size):
+    rows = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rows.append(json.loads(line))
+            if len(rows) == shard_size:
+                yield rows
+                rows = []
+    if rows:
+        yield rows
+
+
+def load_screenshot(value, base_dir):
+    """
+    Decodes a screenshot field: a PIL image, HF-style {"bytes", "path"} dict, raw bytes,
+    a file path (relative to the input file) or a base64 string.
+    """
+    if isinstance(value, Image.Image):
+        return value
+    if isinstance(value, dict):
+        value = value.get("bytes") or value.get("path")
+    if isinstance(value, (bytes, bytearray)):
+        return Image.open(io.BytesIO(value))
+    if isinstance(value, str):
+        path = value if os.path.isabs(value) else os.path.join(base_dir, value)
+        if os.path.isfile(path):
+            return Image.open(path)
+        return Image.open(io.BytesIO(base64.b64decode(value)))
+    raise ValueError("example has no screenshot")
+
+
+def _stable_fraction(text):
+    """Deterministic value in [0, 1) per text. Python's hash() is salted per process, so it can't be used."""
+    return int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16) / 0x100000000
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def process_example(processor, example, base_dir, out_dir, keep_negatives=0.3):
+    """
+    Turns one Mind2Web action into a training record and writes its resized screenshot.
+    Returns (record, None), or (None, reason) when the example is skipped.
+    """
+    goal = example["confirmed_task"]
+    target_index = int(example["target_action_index"])
+    is_finished = target_index == len(_as_list(example["action_reprs"])) - 1
+
+    distilled_dom = processor.distill_dom(example["cleaned_html"])
+
+    # pos_candidates holds the ground-truth element
+    target_uid = None
+    pos_candidates = _as_list(example.get("pos_candidates"))
+    if pos_candidates:
+        candidate = pos_candidates[0]
+        if isinstance(candidate, str):
+            candidate = json.loads(candidate)
+        target_uid = candidate.get("backend_node_id")
+
+    final_target_id = "None"
+    if target_uid:
+        if f"[{target_uid}]" in distilled_dom:
+            final_target_id = target_uid
+        else:
+            # Target was cut off: train the sentinel, but keep only a fraction so the model doesn't learn to give up
+            final_target_id = "0"
+            if _stable_fraction(goal) >= keep_negatives:
+                return None, "negative_dropped"
+
+    op = example["operation"]
+    if isinstance(op, str):
+        op = json.loads(op)
+
+    label = {
+        "action": op["op"].lower(),
+        "element_id": final_target_id,
+        "value": op.get("value", ""),
+        "is_finished": is_finished,
+    }
+
+    image = processor.process_image(load_screenshot(example["screenshot"], base_dir).convert("RGB"))
+    image_rel = os.path.join(IMAGE_DIR, f"{example['action_uid']}.jpeg")
+    image.save(os.path.join(out_dir, image_rel), "JPEG", quality=90)
+
+    record = {
+        "annotation_id": example["annotation_id"],
+        "action_uid": example["action_uid"],
+        "prompt": processor.format_prompt(goal, distilled_dom),
+        "label": json.dumps(label),
+        "image": image_rel,
+    }
+    return record, None
+
+
+def _init_worker(max_elements):
+    global _processor
+    # Mind2Web HTML carries backend_node_id and is already restricted to the page, so nothing is hidden
+    _processor = Processor(max_elements=max_elements, id_attribute="backend_node_id", visibility_attribute=None)
+
+
+def shard_path(out_dir, index):
+    return os.path.join(out_dir, f"shard-{index:05d}.jsonl")
+
+
+def process_shard(index, rows, base_dir, out_dir, keep_negatives):
+    """Processes one shard in a worker. The shard file appears atomically, only once it is complete."""
+    stats = {"shard": index, "examples": len(rows), "written": 0, "negative_dropped": 0, "errors": 0}
+    path = shard_path(out_dir, index)
+    with open(path + ".tmp", "w") as f:
+        for example in rows:
+            try:
+                record, skipped = process_example(_processor, example, base_dir, out_dir, keep_negatives)
+            except Exception as e:
+                print(f"[Preprocess] ⚠️ Skipping {example.get('action_uid')}: {type(e).__name__}: {e}")
+                stats["errors"] += 1
+                continue
+            if record is None:
+                stats[skipped] += 1
+                continue
+            f.write(json.dumps(record) + "\n")
+            stats["written"] += 1
+    os.replace(path + ".tmp", path)
+    return stats
+
+
+def load_progress(out_dir):
+    """Stats of every shard finished by a previous run, keyed by shard index."""
+    done = {}
+    path = os.path.join(out_dir, PROGRESS_FILE)
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                stats = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from a crash
+            if os.path.exists(shard_path(out_dir, stats["shard"])):
+                done[stats["shard"]] = stats
+    return done
+
+
+def preprocess(input_path, out_dir, workers=None, shard_size=500, keep_negatives=0.3, max_elements=200, limit=None):
+    """
+    Converts raw Mind2Web rows into sharded training JSONL plus resized screenshots, across a process pool.
+    Finished shards are recorded in progress.jsonl, so rerunning the same command resumes.
+    Returns the totals over all shards (including ones done by earlier runs).
+    """
+    os.makedirs(os.path.join(out_dir, IMAGE_DIR), exist_ok=True)
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    done = load_progress(out_dir)
+    if done:
+        print(f"[Preprocess] Resuming: {len(done)} shards already done.")
+
+    workers = workers or os.cpu_count() or 1
+    start = time.time()
+    pending = set()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(max_elements,)) as pool, \
+            open(os.path.join(out_dir, PROGRESS_FILE), "a") as progress:
+
+        def collect(futures):
+            for future in futures:
+                stats = future.result()
+                done[stats["shard"]] = stats
+                progress.write(json.dumps(stats) + "\n")
+                progress.flush()
+                print(f"[Preprocess] shard {stats['shard']}: {stats['written']}/{stats['examples']} written "
+                      f"({len(done)} shards, {time.time() - start:.0f}s)")
+
+        for index, rows in enumerate(iter_shards(input_path, shard_size, limit)):
+            if index in done:
+                continue
+            # Keep a couple of shards per worker in flight, so reading never races far ahead of processing
+            while len(pending) >= workers * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+            pending.add(pool.submit(process_shard, index, rows, base_dir, out_dir, keep_negatives))
+
+        finished, _ = wait(pending)
+        collect(finished)
+
+    totals = {"shards": len(done), "wall_s": round(time.time() - start, 2)}
+    for key in ["examples", "written", "negative_dropped", "errors"]:
+        totals[key] = sum(s[key] for s in done.values())
+    return totals
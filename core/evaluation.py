@@ -0,0 +1,211 @@
+import os
+import json
+import time
+import queue
+import threading
+from PIL import Image
+from core.controller import AgentController
+from core.telemetry import metrics
+
+IMAGE_EXTENSIONS = ["jpeg", "jpg", "png", "webp"]
+
+
+def load_records(jsonl_path, limit=None):
+    """Reads processed Mind2Web records ({annotation_id, action_uid, prompt, label})."""
+    records = []
+    with open(jsonl_path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            records.append(json.loads(line))
+            if limit and len(records) >= limit:
+                break
+    return records
+
+
+def find_image(record, image_dir):
+    """
+    Resolves a record's screenshot.
+    Uses an explicit "image" path if the record has one, otherwise <image_dir>/<annotation_id>.<ext>
+    (the layout written by the training notebook).
+    """
+    if record.get("image"):
+        path = record["image"]
+        return path if os.path.isabs(path) else os.path.join(image_dir, path)
+    for ext in IMAGE_EXTENSIONS:
+        path = os.path.join(image_dir, f"{record['annotation_id']}.{ext}")
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def score_prediction(parser, raw_output, label):
+    """
+    Compares one raw model output to its label.
+    Returns a dict of booleans: parsed, element, action, value, is_finished, step.
+    `parser` is an AgentController, reused so parsing matches what the live agent does.
+    """
+    pred = parser._extract_json(raw_output)
+    if not pred:
+        return {"parsed": False, "element": False, "action": False, "value": False, "is_finished": False, "step": False}
+
+    pred_id, pred_action, pred_value = parser._parse_action(pred)
+    gold_id, gold_action, gold_value = parser._parse_action(label)
+
+    element = pred_id == gold_id
+    action = pred_action == gold_action
+    # Only typed/selected text carries meaning; click values are ignored
+    value = True if gold_action == "click" else str(pred_value).strip().lower() == str(gold_value).strip().lower()
+    is_finished = bool(pred.get("is_finished", False)) == bool(label.get("is_finished", False))
+
+    return {
+        "parsed": True,
+        "element": element,
+        "action": action,
+        "value": value,
+        "is_finished": is_finished,
+        "step": element and action and value,
+    }
+
+
+class Evaluator:
+    def __init__(self, model, processor, batch_size=4, workers=4, prefetch_batches=2):
+        """
+        Offline step-accuracy evaluation over processed Mind2Web JSONL.
+
+        Args:
+            model: core.model.ModelEngine (anything with predict_batch(images, prompts)).
+            processor: core.processor.Processor, used to bring screenshots to inference size.
+            batch_size (int): Examples per generate() call.
+            workers (int): Threads loading and resizing images ahead of the model.
+            prefetch_batches (int): How many batches may be staged ahead of the model.
+        """
+        self.model = model
+        self.processor = processor
+        self.batch_size = batch_size
+        self.workers = workers
+        self.prefetch_batches = prefetch_batches
+        self.parser = AgentController(None, processor, model)
+
+    def _load_example(self, record, image_dir):
+        path = find_image(record, image_dir)
+        if path is None:
+            return None
+        with Image.open(path) as img:
+            image = img.convert("RGB")
+        if image.size[0] != self.processor.TARGET_WIDTH or image.size[1] > self.processor.MAX_HEIGHT:
+            image = self.processor.process_image(image)
+        return image
+
+    def _producer(self, records, image_dir, work, ready):
+        while True:
+            try:
+                idx = work.get_nowait()
+            except queue.Empty:
+                return
+            record = records[idx]
+            try:
+                image = self._load_example(record, image_dir)
+            except Exception as e:
+                print(f"[Eval] ⚠️ Could not load image for {record.get('annotation_id')}: {e}")
+                image = None
+            ready.put((idx, image))
+
+    def _run_batch(self, chunk, records, totals, out_file):
+        """Predicts and scores one batch. Returns the time spent in the model."""
+        t0 = time.time()
+        outputs = self.model.predict_batch([img for _, img in chunk], [records[i]["prompt"] for i, _ in chunk])
+        model_time = time.time() - t0
+
+        for (i, _), raw_output in zip(chunk, outputs):
+            record = records[i]
+            label = json.loads(record["label"]) if isinstance(record["label"], str) else record["label"]
+            scores = score_prediction(self.parser, raw_output, label)
+            for k in totals:
+                totals[k] += scores[k]
+            if out_file:
+                out_file.write(json.dumps({
+                    "annotation_id": record.get("annotation_id"),
+                    "action_uid": record.get("action_uid"),
+                    "label": label,
+                    "output": raw_output,
+                    "scores": scores,
+                }) + "\n")
+        return model_time
+
+    def evaluate(self, records, image_dir, output_path=None):
+        """
+        Runs the model over every record and returns the summary metrics.
+        Per-example predictions are written to output_path as JSONL if given.
+        """
+        work = queue.Queue()
+        for i in range(len(records)):
+            work.put(i)
+        # Bounded so loaders stay at most a few batches ahead of the GPU
+        ready = queue.Queue(maxsize=max(1, self.batch_size * self.prefetch_batches))
+
+        threads = [
+            threading.Thread(target=self._producer, args=(records, image_dir, work, ready), daemon=True)
+            for _ in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+
+        totals = {k: 0 for k in ["parsed", "element", "action", "value", "is_finished", "step"]}
+        evaluated = 0
+        missing_images = 0
+
+        tokens_metric = metrics.counter("groundhog_model_generated_tokens_total", "Tokens generated")
+        prompt_metric = metrics.counter("groundhog_model_prompt_tokens_total", "Prompt tokens processed")
+        tokens_before = tokens_metric.value()
+        prompt_before = prompt_metric.value()
+
+        out_file = open(output_path, "w") if output_path else None
+        start = time.time()
+        model_time = 0.0
+
+        try:
+            # Loaders finish out of order; batches are still formed in record order so that
+            # batch composition (and therefore padding) is the same on every run
+            arrived = {}
+            next_idx = 0
+            batch = []
+            while next_idx < len(records) or batch:
+                if next_idx < len(records):
+                    idx, image = ready.get()
+                    arrived[idx] = image
+                    while next_idx in arrived:
+                        image = arrived.pop(next_idx)
+                        if image is None:
+                            missing_images += 1
+                        else:
+                            batch.append((next_idx, image))
+                        next_idx += 1
+
+                while len(batch) >= self.batch_size or (batch and next_idx >= len(records)):
+                    chunk, batch = batch[:self.batch_size], batch[self.batch_size:]
+                    model_time += self._run_batch(chunk, records, totals, out_file)
+                    evaluated += len(chunk)
+                    print(f"[Eval] {evaluated}/{len(records)} | element acc {totals['element'] / evaluated:.3f}")
+        finally:
+            if out_file:
+                out_file.close()
+
+        wall = time.time() - start
+        n = max(evaluated, 1)
+        return {
+            "examples": evaluated,
+            "batch_size": self.batch_size,
+            "missing_images": missing_images,
+            "element_accuracy": round(totals["element"] / n, 4),
+            "action_accuracy": round(totals["action"] / n, 4),
+            "step_accuracy": round(totals["step"] / n, 4),
+            "is_finished_accuracy": round(totals["is_finished"] / n, 4),
+            "parse_failure_rate": round(1 - totals["parsed"] / n, 4),
+            "wall_s": round(wall, 2),
+            "model_s": round(model_time, 2),
+            "examples_per_s": round(evaluated / wall, 3) if wall > 0 else 0.0,
+            "generated_tokens_per_s": round((tokens_metric.value() - tokens_before) / wall, 2) if wall > 0 else 0.0,
+            "prompt_tokens_per_s": round((prompt_metric.value() - prompt_before) / wall, 2) if wall > 0 else 0.0,
+        }
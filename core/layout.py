@@ -0,0 +1,67 @@
+import re
+
+# Written together by scripts/stamp_layout.js, so they are adjacent in outerHTML
+GEOMETRY_PATTERN = re.compile(
+    r'data-m2w-visible="(?:true|false)" data-m2w-y="(-?\d+)" data-m2w-h="(\d+)" data-m2w-shown="([01])"'
+)
+
+# Must match the slack used by stamp_page.js / stamp_layout.js
+VISIBILITY_BUFFER = 200
+
+
+class PageLayout:
+    """
+    A full-page capture (screenshot + stamped HTML with geometry) that can be cut into
+    viewport-sized observations for any scroll position without touching the browser.
+    """
+    def __init__(self, screenshot, html, viewport_width, viewport_height, page_height, origin_y=0, url=None, mutations=0):
+        """
+        Args:
+            screenshot (PIL.Image): Capture of the page from origin_y downwards.
+            html (str): outerHTML stamped by stamp_layout.js.
+            viewport_width, viewport_height (int): CSS pixel size of the window.
+            page_height (int): Full scrollable height in CSS pixels.
+            origin_y (int): Page y the screenshot starts at.
+            url, mutations: Page state at capture time, compared later to detect changes.
+        """
+        self.screenshot = screenshot
+        self.html = html
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self.page_height = page_height
+        self.origin_y = origin_y
+        self.url = url
+        self.mutations = mutations
+        # Screenshot pixels per CSS pixel (devicePixelRatio)
+        self.scale = screenshot.size[0] / float(viewport_width)
+
+    @property
+    def max_scroll(self):
+        return max(0, self.page_height - self.viewport_height)
+
+    def clamp(self, y):
+        return int(max(0, min(y, self.max_scroll)))
+
+    def covers(self, y):
+        """True if the viewport at scroll position y lies inside the captured screenshot."""
+        captured_bottom = self.origin_y + self.screenshot.size[1] / self.scale
+        return self.origin_y <= y and y + self.viewport_height <= captured_bottom + 1
+
+    def tile(self, y):
+        """
+        Returns (screenshot, html) as capture_state would have seen them scrolled to y:
+        the viewport crop, and the HTML with data-m2w-visible recomputed for that viewport.
+        """
+        top = int(round((y - self.origin_y) * self.scale))
+        bottom = top + int(round(self.viewport_height * self.scale))
+        screenshot = self.screenshot.crop((0, top, self.screenshot.size[0], min(bottom, self.screenshot.size[1])))
+
+        viewport_height = self.viewport_height
+
+        def restamp(m):
+            rel_top = int(m.group(1)) - y
+            height = int(m.group(2))
+            visible = m.group(3) == "1" and rel_top <= viewport_height + VISIBILITY_BUFFER and rel_top + height >= -VISIBILITY_BUFFER
+            return f'data-m2w-visible="{"true" if visible else "false"}" data-m2w-y="{m.group(1)}" data-m2w-h="{m.group(2)}" data-m2w-shown="{m.group(3)}"'
+
+        return screenshot, GEOMETRY_PATTERN.sub(restamp, self.html)
@@ -0,0 +1,196 @@
+import os
+import json
+import math
+import time
+import random
+from PIL import Image
+from core.evaluation import find_image
+
+# Qwen2.5-VL vision defaults (preprocessor_config.json); read from the HF processor when one is given
+PATCH_SIZE = 14
+MERGE_SIZE = 2
+MIN_PIXELS = 56 * 56
+MAX_PIXELS = 28 * 28 * 16384
+
+# The chat template holds one of these per image; the processor expands it to the image's token count
+IMAGE_PAD = "<|image_pad|>"
+
+
+def image_token_count(width, height, patch_size=PATCH_SIZE, merge_size=MERGE_SIZE, min_pixels=MIN_PIXELS, max_pixels=MAX_PIXELS):
+    """
+    Exact number of vision tokens Qwen2.5-VL uses for an image, i.e. its smart_resize
+    (snap to multiples of patch*merge, within the pixel budget) divided into merged patches.
+    """
+    factor = patch_size * merge_size
+    h_bar = round(height / factor) * factor
+    w_bar = round(width / factor) * factor
+    if h_bar * w_bar > max_pixels:
+        beta = math.sqrt(height * width / max_pixels)
+        h_bar = max(factor, math.floor(height / beta / factor) * factor)
+        w_bar = max(factor, math.floor(width / beta / factor) * factor)
+    elif h_bar * w_bar < min_pixels:
+        beta = math.sqrt(min_pixels / (height * width))
+        h_bar = math.ceil(height * beta / factor) * factor
+        w_bar = math.ceil(width * beta / factor) * factor
+    return (h_bar // patch_size) * (w_bar // patch_size) // (merge_size ** 2)
+
+
+def _vision_config(processor):
+    image_processor = getattr(processor, "image_processor", None)
+    config = {}
+    for key, default in [("patch_size", PATCH_SIZE), ("merge_size", MERGE_SIZE), ("min_pixels", MIN_PIXELS), ("max_pixels", MAX_PIXELS)]:
+        value = getattr(image_processor, key, None)
+        config[key] = value if isinstance(value, int) else default
+    # Newer transformers keep the pixel budget in size={"shortest_edge", "longest_edge"}
+    size = getattr(image_processor, "size", None)
+    if isinstance(size, dict) and "longest_edge" in size:
+        config["min_pixels"] = size.get("shortest_edge", config["min_pixels"])
+        config["max_pixels"] = size["longest_edge"]
+    return config
+
+
+def training_messages(record, image=None):
+    """The chat messages one training example is rendered from (prompt + screenshot, then the label)."""
+    return [
+        {"role": "user", "content": [{"type": "text", "text": record["prompt"]}, {"type": "image", "image": image}]},
+        {"role": "assistant", "content": [{"type": "text", "text": record["label"]}]},
+    ]
+
+
+def build_length_index(records, image_dir, processor, batch_size=256):
+    """
+    Computes the exact sequence length of every record as the collate function will see it:
+    chat-templated text tokens (tokenized in batches with the fast tokenizer) plus vision tokens
+    from the screenshot size (read from the image header, no decode).
+    Returns {"text_tokens": [...], "image_tokens": [...], "total_tokens": [...]}, aligned with records.
+    Records without a readable screenshot get 0 image tokens.
+    """
+    vision = _vision_config(processor)
+    tokenizer = getattr(processor, "tokenizer", processor)
+    text_tokens, image_tokens, total_tokens = [], [], []
+
+    for start in range(0, len(records), batch_size):
+        chunk = records[start:start + batch_size]
+        texts = [processor.apply_chat_template(training_messages(r), tokenize=False, add_generation_prompt=False) for r in chunk]
+        encoded = tokenizer(texts, add_special_tokens=False)["input_ids"]
+
+        for record, text, ids in zip(chunk, texts, encoded):
+            n_image = 0
+            path = find_image(record, image_dir)
+            if path and os.path.isfile(path):
+                with Image.open(path) as image:
+                    n_image = image_token_count(*image.size, **vision)
+            # Placeholders are replaced by the image tokens, not added to them
+            n_text = len(ids) - text.count(IMAGE_PAD)
+            text_tokens.append(n_text)
+            image_tokens.append(n_image)
+            total_tokens.append(n_text + n_image)
+
+    return {"text_tokens": text_tokens, "image_tokens": image_tokens, "total_tokens": total_tokens}
+
+
+def save_length_index(index, path, **meta):
+    with open(path, "w") as f:
+        json.dump({**meta, **index}, f)
+
+
+def load_length_index(path, records=None):
+    """Loads an index written by save_length_index, checking it still lines up with the records."""
+    with open(path) as f:
+        index = json.load(f)
+    if records is not None and len(index["total_tokens"]) != len(records):
+        raise ValueError(f"Length index {path} has {len(index['total_tokens'])} entries but the data has {len(records)}; rebuild it.")
+    return index
+
+
+class LengthGroupedSampler:
+    """
+    Batch sampler that puts similar-length examples in the same batch, so padding stays small.
+    Shuffles, cuts the order into mega-batches of batch_size * mega_batch_mult, sorts each by length
+    and splits it into batches, then shuffles the batches. Order stays random across epochs while
+    each batch is length-homogeneous. Use as DataLoader(dataset, batch_sampler=...).
+    """
+    def __init__(self, lengths, batch_size, mega_batch_mult=50, shuffle=True, seed=0, drop_last=False):
+        self.lengths = list(lengths)
+        self.batch_size = batch_size
+        self.mega_batch_mult = mega_batch_mult
+        self.shuffle = shuffle
+        self.seed = seed
+        self.drop_last = drop_last
+        self.epoch = 0
+
+    def set_epoch(self, epoch):
+        """Reseeds the shuffle, so each epoch (and a resumed run of it) sees the same batches."""
+        self.epoch = epoch
+
+    def batches(self):
+        rng = random.Random(self.seed + self.epoch)
+        order = list(range(len(self.lengths)))
+        if self.shuffle:
+            rng.shuffle(order)
+
+        mega_size = self.batch_size * self.mega_batch_mult
+        batches = []
+        for start in range(0, len(order), mega_size):
+            mega = sorted(order[start:start + mega_size], key=lambda i: self.lengths[i], reverse=True)
+            batches.extend(mega[i:i + self.batch_size] for i in range(0, len(mega), self.batch_size))
+
+        if self.drop_last:
+            batches = [b for b in batches if len(b) == self.batch_size]
+        if self.shuffle:
+            # Keep the longest batch first so an out-of-memory shows up at step 0, not hours in
+            longest = max(range(len(batches)), key=lambda i: self.lengths[batches[i][0]], default=0)
+            rest = batches[:longest] + batches[longest + 1:]
+            rng.shuffle(rest)
+            batches = batches[longest:longest + 1] + rest
+        return batches
+
+    def __iter__(self):
+        return iter(self.batches())
+
+    def __len__(self):
+        if self.drop_last:
+            return len(self.lengths) // self.batch_size
+        return math.ceil(len(self.lengths) / self.batch_size)
+
+
+def padding_stats(batches, lengths):
+    """Real vs padded tokens if every batch is padded to its longest example."""
+    real = padded = 0
+    for batch in batches:
+        batch_lengths = [lengths[i] for i in batch]
+        real += sum(batch_lengths)
+        padded += max(batch_lengths) * len(batch_lengths)
+    return {
+        "batches": len(batches),
+        "real_tokens": real,
+        "padded_tokens": padded,
+        "padding_waste": round(1 - real / padded, 4) if padded else 0.0,
+    }
+
+
+class PaddingMeter:
+    """
+    Accumulates padding waste and wall-clock time over training steps.
+    Call update() with each batch's attention mask sum and numel (or the equivalent counts).
+    """
+    def __init__(self):
+        self.start = time.time()
+        self.steps = 0
+        self.real_tokens = 0
+        self.padded_tokens = 0
+
+    def update(self, real_tokens, padded_tokens):
+        self.steps += 1
+        self.real_tokens += int(real_tokens)
+        self.padded_tokens += int(padded_tokens)
+
+    def summary(self):
+        elapsed = time.time() - self.start
+        return {
+            "steps": self.steps,
+            "wall_s": round(elapsed, 2),
+            "s_per_step": round(elapsed / self.steps, 3) if self.steps else None,
+            "real_tokens_per_s": round(self.real_tokens / elapsed, 1) if elapsed else None,
+            "padding_waste": round(1 - self.real_tokens / self.padded_tokens, 4) if self.padded_tokens else 0.0,
+        }
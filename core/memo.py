@@ -0,0 +1,208 @@
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from core.telemetry import metrics
+
+
+def image_digest(image):
+    """Hash of the pixels the model sees (the processed screenshot), independent of how it was encoded."""
+    h = hashlib.sha1(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("utf-8"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class InferenceMemo:
+    def __init__(self, max_entries=2048, disk_dir=None, disk_mb=256):
+        """
+        Exact-match cache of model outputs. Generation is deterministic, so an identical
+        (pixels, prompt, model, adapter, decoding settings) always produces the same text.
+
+        Args:
+            max_entries (int): In-memory LRU capacity.
+            disk_dir (str, optional): Directory for the on-disk tier, shared across runs. None = memory only.
+            disk_mb (float): Size cap of the on-disk tier; the least recently used files go first.
+        """
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.disk_bytes = int(disk_mb * 2**20)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._files = OrderedDict()
+        self._file_total = 0
+        self.stats = {"lookups": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan()
+
+    @staticmethod
+    def key(identity, image, prompt, params=""):
+        """Cache key for one call. `params` holds decoding settings (method, max_new_tokens, beams)."""
+        h = hashlib.sha1(f"{identity}\n{params}\n".encode("utf-8"))
+        h.update(image_digest(image).encode("utf-8"))
+        h.update(prompt.encode("utf-8"))
+        return h.hexdigest()
+
+    def _scan(self):
+        """Indexes existing disk entries, least recently used first."""
+        found = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".json"):
+                stat = os.stat(os.path.join(self.disk_dir, name))
+                found.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(found):
+            self._files[key] = size
+            self._file_total += size
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _count(self, result):
+        self.stats[result] += 1
+        metrics.counter("groundhog_inference_memo_total", "Inference memo lookups by result").inc(result=result)
+
+    def get(self, key):
+        """Returns the stored output, or None on a miss."""
+        with self._lock:
+            self.stats["lookups"] += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._count("memory_hits")
+                return self._entries[key]
+            on_disk = key in self._files
+
+        if on_disk:
+            try:
+                with open(self._path(key), "r") as f:
+                    value = json.load(f)
+                # mtime is the recency order used for eviction after a restart
+                os.utime(self._path(key))
+            except (OSError, json.JSONDecodeError):
+                value = None
+            if value is not None:
+                with self._lock:
+                    if key in self._files:
+                        self._files.move_to_end(key)
+                    self._remember(key, value)
+                    self._count("disk_hits")
+                return value
+
+        with self._lock:
+            self._count("misses")
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+        if not self.disk_dir:
+            return
+
+        data = json.dumps(value)
+        # Write to a temp file of our own, then rename: a reader never sees half a file, and writers
+        # of the same key (sessions, batch workers, other runs sharing the directory) never share a temp file
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(data)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            # Outputs are deterministic, so a copy written by someone else is the same entry
+            if not os.path.exists(self._path(key)):
+                raise
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        with self._lock:
+            self._file_total += len(data) - self._files.pop(key, 0)
+            self._files[key] = len(data)
+            evicted = []
+            while self._file_total > self.disk_bytes and len(self._files) > 1:
+                old, size = self._files.popitem(last=False)
+                self._file_total -= size
+                evicted.append(old)
+            self.stats["evictions"] += len(evicted)
+            metrics.gauge("groundhog_inference_memo_disk_bytes", "Size of the on-disk inference memo").set(self._file_total)
+        for old in evicted:
+            try:
+                os.remove(self._path(old))
+            except OSError:
+                pass
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def report(self):
+        lookups = max(self.stats["lookups"], 1)
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return dict(self.stats, entries=len(self._entries), disk_entries=len(self._files),
+                    disk_bytes=self._file_total, hit_rate=round(hits / lookups, 4))
+
+
+class MemoizedModel:
+    """
+    Wraps a model (ModelEngine or GatedModel) so repeated observations are answered from an InferenceMemo
+    instead of the GPU. Put it outside any gate, so hits never wait for a model slot.
+    """
+    def __init__(self, model, memo):
+        self.model = model
+        self.memo = memo
+
+    def _key(self, image, prompt, adapter, params):
+        identity = self.model.identity(adapter) if hasattr(self.model, "identity") else type(self.model).__name__
+        return self.memo.key(identity, image, prompt, params)
+
+    def predict(self, image, prompt_text, adapter=None):
+        key = self._key(image, prompt_text, adapter, "greedy:512")
+        output = self.memo.get(key)
+        if output is None:
+            kwargs = {"adapter": adapter} if adapter is not None else {}
+            output = self.model.predict(image, prompt_text, **kwargs)
+            self.memo.put(key, output)
+        return output
+
+    def predict_candidates(self, image, prompt_text, k=3, max_new_tokens=512, adapter=None):
+        key = self._key(image, prompt_text, adapter, f"beams:{k}:{max_new_tokens}")
+        candidates = self.memo.get(key)
+        if candidates is None:
+            kwargs = {"adapter": adapter} if adapter is not None else {}
+            candidates = self.model.predict_candidates(image, prompt_text, k=k, max_new_tokens=max_new_tokens, **kwargs)
+            self.memo.put(key, [list(c) for c in candidates])
+            return candidates
+        return [tuple(c) for c in candidates]
+
+    def predict_batch(self, images, prompts, max_new_tokens=512, adapters=None):
+        """
+        Looks every pair up; only the misses go to the model, in one batch.
+        Batched prompts are left-padded to the longest one, which can change the greedy output slightly,
+        so entries of a real batch are keyed apart from predict(); a batch of one is the same call as predict().
+        """
+        per_pair = adapters if isinstance(adapters, (list, tuple)) else [adapters] * len(prompts)
+        method = "greedy" if len(prompts) == 1 else "batch"
+        keys = [self._key(image, prompt, adapter, f"{method}:{max_new_tokens}")
+                for image, prompt, adapter in zip(images, prompts, per_pair)]
+        outputs = [self.memo.get(key) for key in keys]
+
+        missing = [i for i, output in enumerate(outputs) if output is None]
+        if missing:
+            kwargs = {}
+            if adapters is not None:
+                kwargs["adapters"] = [per_pair[i] for i in missing] if isinstance(adapters, (list, tuple)) else adapters
+            texts = self.model.predict_batch([images[i] for i in missing], [prompts[i] for i in missing],
+                                             max_new_tokens=max_new_tokens, **kwargs)
+            for i, text in zip(missing, texts):
+                outputs[i] = text
+                self.memo.put(keys[i], text)
+        return outputs
+
+    def identity(self, adapter=None):
+        return self.model.identity(adapter)
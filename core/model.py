@@ -1,11 +1,205 @@
 import os
+import time
+import hashlib
+import threading
+import contextlib
+import importlib.util
 import torch
 from PIL import Image
 from transformers import AutoProcessor, Qwen2_5_VLForConditionalGeneration, BitsAndBytesConfig
 from peft import PeftModel
+from huggingface_hub import try_to_load_from_cache
+from core.telemetry import tracer, metrics
+
+
+class _FirstTokenTimer:
+    """
+    Minimal generate() streamer that records when the first new token arrives.
+    generate() pushes the prompt first, then one chunk per decoded token,
+    so the second put() marks the end of prefill.
+    """
+    def __init__(self):
+        self.calls = 0
+        self.first_token_ns = None
+
+    def put(self, value):
+        self.calls += 1
+        if self.calls == 2:
+            self.first_token_ns = time.perf_counter_ns()
+
+    def end(self):
+        pass
+
+# Adapter name that selects the bare base model
+BASE_ADAPTER = "base"
+
+# Attention kernels from_pretrained() accepts; "auto" picks the fastest one installed
+ATTENTION_BACKENDS = ("auto", "flash_attention_2", "sdpa", "eager")
+# KV cache layouts for greedy generate(); "quantized" stores keys/values in kv_bits bits
+KV_CACHE_MODES = ("full", "quantized")
+# QuantizedCache keeps this many most recent positions in bf16 and quantizes groups of 64 elements
+QUANT_RESIDUAL = 128
+QUANT_GROUP = 64
+# Histogram buckets (bytes) for per-request GPU memory: 64 MB .. 16 GB
+MEMORY_BUCKETS = tuple(2**i << 20 for i in range(6, 15))
+# Where PEFT saves a LoRA adapter's weights
+ADAPTER_WEIGHT_FILES = ("adapter_model.safetensors", "adapter_model.bin")
+
+
+class MemoryBudgetExceeded(Exception):
+    """Raised when a request would not fit in the engine's GPU memory budget even on its own."""
+
+
+def _has_module(name):
+    try:
+        return importlib.util.find_spec(name) is not None
+    except ModuleNotFoundError:
+        # Parent package missing (e.g. "optimum" for "optimum.quanto")
+        return False
+
+
+def resolve_attention(requested="auto", device="cuda"):
+    """Maps "auto" to FlashAttention-2 when it is installed and the GPU supports it (Ampere+), else PyTorch SDPA."""
+    if requested not in ATTENTION_BACKENDS:
+        raise ValueError(f"Unknown attention backend {requested!r}; choose from {ATTENTION_BACKENDS}")
+    if requested != "auto":
+        return requested
+    if device == "cuda" and _has_module("flash_attn") and torch.cuda.get_device_capability()[0] >= 8:
+        return "flash_attention_2"
+    return "sdpa"
+
+
+def quantized_cache_backend():
+    """Name of an installed QuantizedCache backend, spelled as QuantizedCache expects ("quanto" or "hqq"), or None."""
+    if _has_module("optimum.quanto"):
+        return "quanto"
+    if _has_module("hqq"):
+        return "hqq"
+    return None
+
+
+def weights_revision(config, model_id):
+    """
+    Which base weights were loaded: the resolved Hub commit, or for a local directory a fingerprint
+    of its weight files (names, sizes, modification times; hashing gigabytes on every start is too slow).
+    """
+    commit = getattr(config, "_commit_hash", None)
+    if commit:
+        return commit[:12]
+    if not os.path.isdir(model_id):
+        return ""
+    h = hashlib.sha1()
+    for name in sorted(os.listdir(model_id)):
+        if name.endswith((".safetensors", ".bin")):
+            stat = os.stat(os.path.join(model_id, name))
+            h.update(f"{name}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()[:12]
+
+
+def adapter_digest(path):
+    """
+    Content hash of a LoRA adapter's weight file, from a local directory or the Hub cache,
+    so an adapter retrained into the same path is told apart. Empty if the file can't be found.
+    """
+    for filename in ADAPTER_WEIGHT_FILES:
+        local = os.path.join(path, filename)
+        if not os.path.isfile(local):
+            try:
+                local = try_to_load_from_cache(path, filename)
+            except Exception:
+                local = None
+        if isinstance(local, str) and os.path.isfile(local):
+            h = hashlib.sha1()
+            with open(local, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+            return h.hexdigest()[:12]
+    return ""
+
+
+def estimate_request_bytes(text_config, prompt_tokens, new_tokens, sequences=1, kv_bits=16):
+    """
+    Rough GPU memory one generate() call needs on top of the weights: the KV cache at full length,
+    the largest prefill activation (one MLP block over the whole prompt) and the last-position logits.
+
+    Args:
+        text_config: Config of the language model (layers, heads, hidden and MLP sizes, vocab).
+        prompt_tokens (int): Prompt length per sequence, padding included.
+        new_tokens (int): max_new_tokens of the call.
+        sequences (int): Sequences decoded together (batch size x beams).
+        kv_bits (int): Bits per cached key/value element; 16 is the plain bf16 cache.
+    """
+    heads = text_config.num_attention_heads
+    head_dim = getattr(text_config, "head_dim", None) or text_config.hidden_size // heads
+    kv_heads = getattr(text_config, "num_key_value_heads", None) or heads
+    # Keys and values, every layer, per position
+    per_position = 2 * text_config.num_hidden_layers * kv_heads * head_dim
+    positions = prompt_tokens + new_tokens
+
+    if kv_bits < 16:
+        full = min(QUANT_RESIDUAL, positions)
+        # Quantized groups also carry a bf16 scale and zero point
+        quantized = (positions - full) * per_position * (kv_bits / 8 + 4 / QUANT_GROUP)
+        kv = sequences * (full * per_position * 2 + quantized)
+    else:
+        kv = sequences * positions * per_position * 2
+
+    # gate, up and activated projections in bf16
+    activations = sequences * prompt_tokens * text_config.intermediate_size * 2 * 3
+    logits = sequences * text_config.vocab_size * 4
+    return int(kv + activations + logits)
+
+
+class MemoryBudget:
+    """
+    Admits generate() calls by estimated memory instead of by count. A call whose estimate fits next to
+    the weights and the calls already running starts at once; otherwise it waits for memory to free up.
+    A call that could never fit raises MemoryBudgetExceeded rather than running the GPU out of memory.
+    """
+    def __init__(self, budget_bytes, base_bytes=0):
+        """
+        Args:
+            budget_bytes (int): GPU memory the engine may use in total.
+            base_bytes (int): Memory already taken by weights and adapters.
+        """
+        self.budget_bytes = budget_bytes
+        self.base_bytes = base_bytes
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self):
+        """Bytes left for requests once the weights are loaded."""
+        return self.budget_bytes - self.base_bytes
+
+    def fits(self, need):
+        return need <= self.capacity
+
+    @contextlib.contextmanager
+    def reserve(self, need):
+        """Holds `need` bytes of the budget for the duration of one call."""
+        if not self.fits(need):
+            metrics.counter("groundhog_model_budget_rejections_total", "Requests too large for the GPU memory budget").inc()
+            raise MemoryBudgetExceeded(
+                f"Request needs ~{need / 2**20:.0f} MB; the budget leaves {self.capacity / 2**20:.0f} MB after the weights"
+            )
+        reserved = metrics.gauge("groundhog_model_reserved_bytes", "Estimated GPU memory held by running requests")
+        with self._cond:
+            while self.in_flight + need > self.capacity:
+                self._cond.wait()
+            self.in_flight += need
+            reserved.set(self.in_flight)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.in_flight -= need
+                reserved.set(self.in_flight)
+                self._cond.notify_all()
 
 class ModelEngine:
-    def __init__(self, model_id="Qwen/Qwen2.5-VL-7B-Instruct", adapter_path=None):
+    def __init__(self, model_id="Qwen/Qwen2.5-VL-7B-Instruct", adapter_path=None, adapters=None, default_adapter=None,
+                 attention="auto", kv_cache="full", kv_bits=4, memory_budget_mb=None):
         """
         Initializes the VLM.
         
@@ -14,12 +208,35 @@ class ModelEngine:
                             If using a merged model, pass that ID here.
             adapter_path (str, optional): If using LoRA, pass the adapter ID/Path here.
                                           If None, it assumes model_id is a full model.
+                                          Registered as the adapter named "default".
+            adapters (dict, optional): More LoRA adapters {name: ID/path} sharing the same base weights.
+                                       Each costs megabytes, not another copy of the model.
+            default_adapter (str, optional): Adapter used when a call doesn't name one.
+                                             Defaults to "default" if adapter_path is given, else the base model.
+            attention (str): Attention kernel, one of ATTENTION_BACKENDS. "auto" uses FlashAttention-2
+                             when installed, else SDPA; both avoid materializing the full attention matrix.
+            kv_cache (str): "full" (bf16) or "quantized" (kv_bits per element, needs optimum-quanto or hqq).
+                            Applies to greedy calls; beam search always uses the full cache.
+            kv_bits (int): Bits per element of the quantized KV cache (2 or 4).
+            memory_budget_mb (float, optional): GPU memory this engine may use, weights included.
+                                                Requests are admitted by estimated size within it; batches
+                                                and beams are downsized to fit and anything larger is rejected
+                                                with MemoryBudgetExceeded. None disables the check.
         """
+        self.model_id = model_id
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         
         if self.device == "cpu":
             print("⚠️ [Model] WARNING: Running on CPU. 4-bit quantization requires CUDA.")
 
+        if kv_cache not in KV_CACHE_MODES:
+            raise ValueError(f"Unknown KV cache mode {kv_cache!r}; choose from {KV_CACHE_MODES}")
+        self.kv_backend = quantized_cache_backend() if kv_cache == "quantized" else None
+        if kv_cache == "quantized" and self.kv_backend is None:
+            print("⚠️ [Model] WARNING: Quantized KV cache needs optimum-quanto or hqq. Using the full cache.")
+        self.kv_bits = kv_bits if self.kv_backend else 16
+        self.attention = resolve_attention(attention, self.device)
+
         #configure 4-bit Quantization
         # This keeps the model small (~6GB VRAM) even though it's the full 7B
         bnb_config = BitsAndBytesConfig(
@@ -39,63 +256,385 @@ class ModelEngine:
             model_id,
             device_map="auto",
             quantization_config=bnb_config,
+            attn_implementation=self.attention,
             low_cpu_mem_usage=True
         )
+        self.text_config = self.model.config.get_text_config()
+        self.revision = weights_revision(self.model.config, model_id)
+        cache = f"{self.kv_bits}-bit ({self.kv_backend})" if self.kv_backend else "bf16"
+        print(f"[Model] Attention: {self.attention}, KV cache: {cache}")
 
-        # attach LoRA Adapter (ONLY if provided)
+        # LoRA adapters share the base weights; only one is active at a time. Calls on the active
+        # adapter run side by side, a switch waits until they have finished (see _use_adapter)
+        self.budget = None
+        self.weight_bytes = 0
+        self.adapter_bytes = {}
+        self.adapter_paths = {}
+        self.adapter_digests = {}
+        self._init_adapter_state()
         if adapter_path:
-            print(f"[Model] Loading LoRA Adapter from {adapter_path}...")
-            self.model = PeftModel.from_pretrained(self.model, adapter_path)
+            self.load_adapter("default", adapter_path)
+        for name, path in (adapters or {}).items():
+            self.load_adapter(name, path)
+
+        self.default_adapter = default_adapter or ("default" if adapter_path else BASE_ADAPTER)
+        self._check_adapter(self.default_adapter)
         
+        # Batched generation appends new tokens on the right, so prompts must be padded on the left
+        self.processor.tokenizer.padding_side = "left"
+
+        # Everything resident before the first request: weights, quantization state and adapters
+        self.weight_bytes = torch.cuda.memory_allocated() if self.device == "cuda" else 0
+        if memory_budget_mb is not None:
+            self.budget = MemoryBudget(int(memory_budget_mb * 2**20), base_bytes=self.weight_bytes)
+            print(f"[Model] Memory budget: {memory_budget_mb:.0f} MB, {self.budget.capacity / 2**20:.0f} MB left for requests.")
+
         self.model.eval()
         print("[Model] ✅ Ready.")
 
-    def predict(self, image: Image.Image, prompt_text: str):
-        # format the conversation
-        messages = [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "image", "image": image},
-                    {"type": "text", "text": prompt_text},
-                ],
-            }
-        ]
-
-        # apply Chat Template
-        text_input = self.processor.apply_chat_template(
-            messages, tokenize=False, add_generation_prompt=True
-        )
+    def load_adapter(self, name, path):
+        """
+        Registers a LoRA adapter on the shared base model under `name`. Can be called while serving.
+        Returns the adapter's weight size in bytes.
+        """
+        if name == BASE_ADAPTER or name in self.adapter_bytes:
+            raise ValueError(f"Adapter name {name!r} is already taken")
 
-        # process Inputs
-        inputs = self.processor(
-            text=[text_input],
-            images=[image],
-            padding=True,
-            return_tensors="pt",
-        )
-        
-        inputs = inputs.to(self.device)
-
-        # generate
-        with torch.no_grad():
-            generated_ids = self.model.generate(
-                **inputs,
-                max_new_tokens=512,
-                do_sample=False,
-                temperature=0.0
+        print(f"[Model] Loading LoRA Adapter '{name}' from {path}...")
+        with self._adapter_cond:
+            # Not under a running generate()
+            while self._adapter_users:
+                self._adapter_draining = True
+                self._adapter_cond.wait()
+            if isinstance(self.model, PeftModel):
+                self.model.load_adapter(path, adapter_name=name)
+            else:
+                self.model = PeftModel.from_pretrained(self.model, path, adapter_name=name)
+            self.model.eval()
+
+        # LoRA weights are named like ...lora_A.<name>.weight
+        size = sum(p.numel() * p.element_size() for n, p in self.model.named_parameters() if f".{name}." in n)
+        self.adapter_bytes[name] = size
+        self.adapter_paths[name] = path
+        self.adapter_digests[name] = adapter_digest(path)
+        self.weight_bytes += size
+        if self.budget is not None:
+            self.budget.base_bytes = self.weight_bytes
+        metrics.gauge("groundhog_model_adapter_bytes", "Weight size of each loaded LoRA adapter").set(size, adapter=name)
+        print(f"[Model] Adapter '{name}' ready ({size / 2**20:.1f} MB).")
+        return size
+
+    @property
+    def adapters(self):
+        """Names that can be passed as `adapter`, the base model first."""
+        return [BASE_ADAPTER] + list(self.adapter_bytes)
+
+    def identity(self, adapter=None):
+        """
+        Names everything besides the inputs that decides an output: base weights and their revision,
+        attention kernel, adapter (path and weight hash) and KV cache precision.
+        """
+        name = adapter or self.default_adapter
+        weights = f"{self.adapter_paths.get(name, '')}@{self.adapter_digests.get(name, '')}"
+        return f"{self.model_id}@{self.revision}|{self.attention}|{name}={weights}|kv{self.kv_bits}"
+
+    def _check_adapter(self, name):
+        if name != BASE_ADAPTER and name not in self.adapter_bytes:
+            raise ValueError(f"Unknown adapter {name!r}; loaded: {self.adapters}")
+
+    def _init_adapter_state(self):
+        self._adapter_cond = threading.Condition()
+        self._adapter_users = 0          # generate() calls running on the adapter in effect
+        self._adapter_in_effect = None   # adapter name those calls use (BASE_ADAPTER = adapters disabled)
+        self._adapter_draining = False   # someone waits to switch: no new calls join until it has had its turn
+        self._base_mode = None           # open disable_adapter() context while the base model is in effect
+
+    @contextlib.contextmanager
+    def _use_adapter(self, name):
+        """
+        Activates an adapter (None = the default) for the duration of one generate() call.
+        Calls on the adapter already in effect run concurrently (the memory budget and the caller's
+        gate decide how many); a call needing another adapter waits for them to finish, and calls
+        arriving after it wait for its turn, so a busy adapter can't starve the others.
+        """
+        name = name or self.default_adapter
+        self._check_adapter(name)
+        if not self.adapter_bytes:
+            # Plain model, nothing to switch
+            yield name
+            return
+
+        with self._adapter_cond:
+            while self._adapter_users and (self._adapter_in_effect != name or self._adapter_draining):
+                if self._adapter_in_effect != name:
+                    self._adapter_draining = True
+                self._adapter_cond.wait()
+            if not self._adapter_users:
+                self._adapter_draining = False
+                self._switch_adapter(name)
+            self._adapter_users += 1
+        try:
+            yield name
+        finally:
+            with self._adapter_cond:
+                self._adapter_users -= 1
+                if not self._adapter_users:
+                    if self._base_mode is not None:
+                        self._base_mode.close()
+                        self._base_mode = None
+                        self._adapter_in_effect = None
+                    self._adapter_cond.notify_all()
+
+    def _switch_adapter(self, name):
+        """Puts `name` in effect. Caller holds _adapter_cond with no calls running."""
+        self._adapter_in_effect = name
+        if name == BASE_ADAPTER:
+            self._base_mode = contextlib.ExitStack()
+            self._base_mode.enter_context(self.model.disable_adapter())
+            return
+        if self.model.active_adapter != name:
+            self.model.set_adapter(name)
+            metrics.counter("groundhog_model_adapter_switches_total", "Times the active LoRA adapter changed").inc()
+
+    def _estimate(self, inputs, max_new_tokens, beams=1):
+        """Estimated bytes for generating from `inputs`; beam search runs on the full bf16 cache."""
+        batch, prompt_len = inputs.input_ids.shape
+        kv_bits = self.kv_bits if beams == 1 else 16
+        return estimate_request_bytes(self.text_config, prompt_len, max_new_tokens, sequences=batch * beams, kv_bits=kv_bits)
+
+    def _fits(self, need):
+        return self.budget is None or self.budget.fits(need)
+
+    def _reserve(self, need):
+        return self.budget.reserve(need) if self.budget is not None else contextlib.nullcontext()
+
+    def _cache_kwargs(self, beams=1):
+        """generate() arguments selecting the quantized KV cache, when enabled."""
+        if not self.kv_backend or beams > 1:
+            return {}
+        return {"cache_implementation": "quantized", "cache_config": {"backend": self.kv_backend, "nbits": self.kv_bits}}
+
+    def _build_inputs(self, images, prompts):
+        """Applies the chat template and tokenizes a batch of (image, prompt) pairs."""
+        with tracer.span("model.tokenize", batch_size=len(prompts)):
+            text_inputs = []
+            for image, prompt_text in zip(images, prompts):
+                # format the conversation
+                messages = [
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "image", "image": image},
+                            {"type": "text", "text": prompt_text},
+                        ],
+                    }
+                ]
+                # apply Chat Template
+                text_inputs.append(self.processor.apply_chat_template(
+                    messages, tokenize=False, add_generation_prompt=True
+                ))
+
+            # process Inputs
+            inputs = self.processor(
+                text=text_inputs,
+                images=list(images),
+                padding=True,
+                return_tensors="pt",
             )
 
-        # decode
-        input_len = inputs.input_ids.shape[1]
-        generated_ids_trimmed = [
-            out_ids[input_len:] for out_ids in generated_ids
-        ]
-        
-        output_text = self.processor.batch_decode(
-            generated_ids_trimmed, 
-            skip_special_tokens=True, 
-            clean_up_tokenization_spaces=False
-        )
+            return inputs.to(self.device)
+
+    def predict(self, image: Image.Image, prompt_text: str, adapter=None):
+        """Greedy generation for one (image, prompt). `adapter` picks a registered LoRA (None = default)."""
+        with tracer.span("model.predict") as span:
+            inputs = self._build_inputs([image], [prompt_text])
+
+            input_len = inputs.input_ids.shape[1]
+            span.set("prompt_tokens", input_len)
+            need = self._estimate(inputs, 512)
+            span.set("estimated_bytes", need)
+
+            # generate
+            timer = _FirstTokenTimer()
+            with self._reserve(need), self._use_adapter(adapter) as name, torch.no_grad():
+                span.set("adapter", name)
+                if self.device == "cuda":
+                    torch.cuda.reset_peak_memory_stats()
+                start_ns = time.perf_counter_ns()
+                generated_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=512,
+                    do_sample=False,
+                    temperature=0.0,
+                    streamer=timer,
+                    **self._cache_kwargs()
+                )
+                end_ns = time.perf_counter_ns()
+
+            # decode
+            generated_ids_trimmed = [
+                out_ids[input_len:] for out_ids in generated_ids
+            ]
+            new_tokens = len(generated_ids_trimmed[0])
+
+            output_text = self.processor.batch_decode(
+                generated_ids_trimmed, 
+                skip_special_tokens=True, 
+                clean_up_tokenization_spaces=False
+            )
+
+            self._record_generation(span, start_ns, timer.first_token_ns, end_ns, input_len, new_tokens)
+            return output_text[0]
+
+    def predict_batch(self, images, prompts, max_new_tokens=512, adapters=None):
+        """
+        Greedy generation for several (image, prompt) pairs.
+        `adapters` is one adapter name for the whole batch, or one per pair; pairs are grouped
+        by adapter and each group runs in one forward pass.
+        Returns the decoded outputs in input order.
+        """
+        if adapters is None or isinstance(adapters, str):
+            return self._predict_group(images, prompts, max_new_tokens, adapters)
+
+        groups = {}
+        for i, name in enumerate(adapters):
+            groups.setdefault(name or self.default_adapter, []).append(i)
+
+        outputs = [None] * len(prompts)
+        for name, indices in groups.items():
+            texts = self._predict_group([images[i] for i in indices], [prompts[i] for i in indices], max_new_tokens, name)
+            for i, text in zip(indices, texts):
+                outputs[i] = text
+        return outputs
+
+    def _predict_group(self, images, prompts, max_new_tokens, adapter):
+        with tracer.span("model.predict_batch", batch_size=len(prompts)) as span:
+            inputs = self._build_inputs(images, prompts)
+            need = self._estimate(inputs, max_new_tokens)
+            if len(prompts) > 1 and not self._fits(need):
+                # Too big for the budget in one pass: run it as two halves
+                span.set("split", True)
+                metrics.counter("groundhog_model_downsized_total", "Requests shrunk to fit the GPU memory budget").inc(kind="batch")
+                half = len(prompts) // 2
+                return (self._predict_group(images[:half], prompts[:half], max_new_tokens, adapter)
+                        + self._predict_group(images[half:], prompts[half:], max_new_tokens, adapter))
+
+            input_len = inputs.input_ids.shape[1]
+            prompt_tokens = int(inputs.attention_mask.sum())
+            span.set("prompt_tokens", prompt_tokens)
+            span.set("estimated_bytes", need)
+
+            timer = _FirstTokenTimer()
+            with self._reserve(need), self._use_adapter(adapter) as name, torch.no_grad():
+                span.set("adapter", name)
+                if self.device == "cuda":
+                    torch.cuda.reset_peak_memory_stats()
+                start_ns = time.perf_counter_ns()
+                generated_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    temperature=0.0,
+                    streamer=timer,
+                    **self._cache_kwargs()
+                )
+                end_ns = time.perf_counter_ns()
+
+            generated_ids_trimmed = generated_ids[:, input_len:]
+            pad_id = self.processor.tokenizer.pad_token_id
+            new_tokens = int((generated_ids_trimmed != pad_id).sum()) if pad_id is not None else generated_ids_trimmed.numel()
+
+            output_text = self.processor.batch_decode(
+                generated_ids_trimmed,
+                skip_special_tokens=True,
+                clean_up_tokenization_spaces=False
+            )
+
+            self._record_generation(span, start_ns, timer.first_token_ns, end_ns, prompt_tokens, new_tokens)
+            return output_text
+
+    def predict_candidates(self, image: Image.Image, prompt_text: str, k=3, max_new_tokens=512, adapter=None):
+        """
+        Beam search returning the k best distinct outputs from one generate() call.
+        Returns [(text, score)] best first; score is the length-normalized log-probability.
+        Lets the controller fall back to the runner-up action instead of paying for a new step.
+        Under a memory budget, k shrinks until the beams fit (down to a single greedy candidate).
+        """
+        with tracer.span("model.predict_candidates", k=k) as span:
+            inputs = self._build_inputs([image], [prompt_text])
+            input_len = inputs.input_ids.shape[1]
+            span.set("prompt_tokens", input_len)
+
+            beams = k
+            while beams > 1 and not self._fits(self._estimate(inputs, max_new_tokens, beams=beams)):
+                beams -= 1
+            if beams < k:
+                span.set("beams", beams)
+                metrics.counter("groundhog_model_downsized_total", "Requests shrunk to fit the GPU memory budget").inc(kind="beams")
+            need = self._estimate(inputs, max_new_tokens, beams=beams)
+            span.set("estimated_bytes", need)
+
+            # Beam search does not support streamers, so the whole call is reported as prefill
+            with self._reserve(need), self._use_adapter(adapter) as name, torch.no_grad():
+                span.set("adapter", name)
+                if self.device == "cuda":
+                    torch.cuda.reset_peak_memory_stats()
+                start_ns = time.perf_counter_ns()
+                out = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    do_sample=False,
+                    num_beams=beams,
+                    num_return_sequences=beams,
+                    early_stopping=beams > 1,
+                    output_scores=True,
+                    return_dict_in_generate=True,
+                    **self._cache_kwargs(beams)
+                )
+                end_ns = time.perf_counter_ns()
+
+            generated_ids_trimmed = out.sequences[:, input_len:]
+            pad_id = self.processor.tokenizer.pad_token_id
+            new_tokens = int((generated_ids_trimmed != pad_id).sum()) if pad_id is not None else generated_ids_trimmed.numel()
+
+            texts = self.processor.batch_decode(
+                generated_ids_trimmed,
+                skip_special_tokens=True,
+                clean_up_tokenization_spaces=False
+            )
+            scores = out.sequences_scores.tolist() if getattr(out, "sequences_scores", None) is not None else [0.0] * len(texts)
+
+            self._record_generation(span, start_ns, None, end_ns, input_len, new_tokens)
+
+            candidates, seen = [], set()
+            for text, score in sorted(zip(texts, scores), key=lambda c: c[1], reverse=True):
+                # Beams often differ only in whitespace after the JSON closes
+                if text.strip() not in seen:
+                    seen.add(text.strip())
+                    candidates.append((text, score))
+            return candidates
+
+    def _record_generation(self, span, start_ns, first_token_ns, end_ns, prompt_tokens, new_tokens):
+        """Splits generate() time into prefill/decode and records token and GPU memory metrics."""
+        first_token_ns = first_token_ns or end_ns
+        prefill_s = (first_token_ns - start_ns) / 1e9
+        decode_s = (end_ns - first_token_ns) / 1e9
+
+        span.set("new_tokens", new_tokens)
+        span.set("prefill_s", prefill_s)
+        span.set("decode_s", decode_s)
+
+        stage = metrics.histogram("groundhog_stage_seconds", "Wall time spent in each pipeline stage")
+        stage.observe(prefill_s, stage="model.prefill")
+        stage.observe(decode_s, stage="model.decode")
+        metrics.counter("groundhog_model_prompt_tokens_total", "Prompt tokens processed").inc(prompt_tokens)
+        metrics.counter("groundhog_model_generated_tokens_total", "Tokens generated").inc(new_tokens)
 
-        return output_text[0]
\ No newline at end of file
+        if self.device == "cuda":
+            peak = torch.cuda.max_memory_allocated()
+            span.set("peak_gpu_bytes", peak)
+            metrics.gauge("groundhog_model_peak_gpu_bytes", "Peak GPU memory of the last generate() call").set(peak)
+            # What the request added on top of the weights (overlapping calls are included when several run at once)
+            span.set("request_gpu_bytes", peak - self.weight_bytes)
+            metrics.histogram("groundhog_model_request_gpu_bytes", "GPU memory each generate() call used above the weights",
+                              buckets=MEMORY_BUCKETS).observe(peak - self.weight_bytes)
@@ -0,0 +1,75 @@
+import re
+import math
+from collections import Counter
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Goal words that say nothing about which element to look for
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "with", "from", "at", "by", "is", "it",
+    "my", "me", "i", "find", "go", "show", "get", "open", "click", "select", "search", "look", "page",
+    "then", "that", "this", "under", "over", "than", "all", "any", "some", "please",
+}
+
+
+# Land a little above the target so the model also sees what leads up to it
+JUMP_MARGIN = 150
+
+
+def tokenize(text):
+    return [w for w in WORD_PATTERN.findall(text.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+class OffscreenIndex:
+    """
+    Interactive elements that are stamped but outside the viewport, with their page position.
+    Lets a "target not visible" (ID 0) step jump to the region that best matches the goal
+    instead of scrolling one viewport at a time.
+    """
+    def __init__(self, entries=None):
+        # (element_id, tag, text, attr_str, page_y)
+        self.entries = entries or []
+
+    def __len__(self):
+        return len(self.entries)
+
+    @staticmethod
+    def key(entry):
+        """Identifies an entry across restamps (element ids shift when the DOM changes)."""
+        return (entry[2], entry[4])
+
+    @staticmethod
+    def jump_position(entry):
+        return max(0, entry[4] - JUMP_MARGIN)
+
+    def rank(self, goal, exclude=()):
+        """
+        Scores every entry against the goal: one point per shared word, plus more for words
+        that few entries share (idf over the index), so "XPS" outweighs "laptop" on a laptop listing.
+        Returns [(score, entry)] best first, skipping zero scores and entries whose key() is in `exclude`.
+        """
+        goal_words = set(tokenize(goal))
+        if not goal_words or not self.entries:
+            return []
+
+        docs = [set(tokenize(f"{text} {attr_str}")) for _, _, text, attr_str, _ in self.entries]
+        df = Counter(w for doc in docs for w in doc if w in goal_words)
+        n = len(docs)
+
+        ranked = []
+        for entry, doc in zip(self.entries, docs):
+            if self.key(entry) in exclude:
+                continue
+            score = sum(1 + math.log(n / df[w]) for w in goal_words & doc)
+            if score > 0:
+                ranked.append((score, entry))
+        # Ties go to the element nearer the top of the page
+        ranked.sort(key=lambda r: (-r[0], r[1][4]))
+        return ranked
+
+    def best(self, goal, exclude=(), min_score=1.0):
+        """The best-matching entry, or None if nothing matches well enough."""
+        ranked = self.rank(goal, exclude)
+        if ranked and ranked[0][0] >= min_score:
+            return ranked[0][1]
+        return None
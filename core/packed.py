@@ -0,0 +1,188 @@
+import os
+import io
+import json
+import mmap
+import struct
+import hashlib
+from PIL import Image
+from core.evaluation import find_image
+
+META_FILE = "meta.json"
+INDEX_FILE = "index.bin"
+FORMAT_VERSION = 1
+
+# Per record: record shard, offset, length, image shard, offset, length (image shard -1 = no image)
+INDEX_FIELDS = 6
+# "image" is the record's own screenshot path, if it has one: record(i) must resolve (find_image) to the same file
+RECORD_KEYS = ["annotation_id", "action_uid", "prompt", "label", "image"]
+
+
+def shard_name(index):
+    return f"shard-{index:05d}.bin"
+
+
+class PackWriter:
+    """
+    Appends records and screenshots to size-capped binary shards.
+    Records are stored as UTF-8 JSON, images as their original compressed bytes, deduplicated by
+    content hash (consecutive actions of a task often share an identical screenshot).
+    meta.json is written last by close(), so a pack without it is incomplete.
+    """
+    def __init__(self, out_dir, shard_bytes=1 << 30):
+        os.makedirs(out_dir, exist_ok=True)
+        self.out_dir = out_dir
+        self.shard_bytes = shard_bytes
+        self.shard = -1
+        self.file = None
+        self.offset = 0
+        self.images = {}  # sha1 -> (shard, offset, length)
+        self.image_bytes = 0
+        self.duplicate_images = 0
+        self.rows = []
+        self._roll()
+
+    def _roll(self):
+        if self.file:
+            self.file.close()
+        self.shard += 1
+        self.file = open(os.path.join(self.out_dir, shard_name(self.shard)), "wb")
+        self.offset = 0
+
+    def _write(self, blob):
+        if self.offset and self.offset + len(blob) > self.shard_bytes:
+            self._roll()
+        location = (self.shard, self.offset, len(blob))
+        self.file.write(blob)
+        self.offset += len(blob)
+        return location
+
+    def add(self, record, image_bytes=None):
+        image = (-1, 0, 0)
+        if image_bytes is not None:
+            digest = hashlib.sha1(image_bytes).hexdigest()
+            if digest in self.images:
+                self.duplicate_images += 1
+            else:
+                self.images[digest] = self._write(image_bytes)
+                self.image_bytes += len(image_bytes)
+            image = self.images[digest]
+
+        blob = json.dumps({k: record.get(k) for k in RECORD_KEYS}).encode("utf-8")
+        self.rows.append(self._write(blob) + image)
+
+    def close(self):
+        self.file.close()
+        with open(os.path.join(self.out_dir, INDEX_FILE), "wb") as f:
+            for row in self.rows:
+                f.write(struct.pack(f"{INDEX_FIELDS}q", *row))
+        meta = {
+            "format": FORMAT_VERSION,
+            "records": len(self.rows),
+            "shards": [shard_name(i) for i in range(self.shard + 1)],
+            "unique_images": len(self.images),
+            "duplicate_images": self.duplicate_images,
+            "image_bytes": self.image_bytes,
+        }
+        with open(os.path.join(self.out_dir, META_FILE), "w") as f:
+            json.dump(meta, f, indent=2)
+        return meta
+
+
+def _to_jpeg(image_bytes, quality):
+    """Re-encodes non-JPEG screenshots; PNG decode is several times slower than JPEG at this size."""
+    if image_bytes[:3] == b"\xff\xd8\xff":
+        return image_bytes
+    buffer = io.BytesIO()
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        image.convert("RGB").save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+
+def pack_records(records, image_dir, out_dir, shard_bytes=1 << 30, jpeg_quality=None):
+    """
+    Packs processed JSONL records and their screenshot files (resolved like the evaluator does).
+    With jpeg_quality set, non-JPEG screenshots are transcoded to JPEG at that quality.
+    """
+    writer = PackWriter(out_dir, shard_bytes=shard_bytes)
+    missing = 0
+    encoded = {}  # last path -> bytes; consecutive actions of a task usually share one screenshot
+    for record in records:
+        path = find_image(record, image_dir)
+        image_bytes = None
+        if path and os.path.isfile(path):
+            if path not in encoded:
+                with open(path, "rb") as f:
+                    data = f.read()
+                encoded = {path: _to_jpeg(data, jpeg_quality) if jpeg_quality else data}
+            image_bytes = encoded[path]
+        else:
+            missing += 1
+        writer.add(record, image_bytes)
+    meta = writer.close()
+    meta["missing_images"] = missing
+    return meta
+
+
+class PackedDataset:
+    """
+    Map-style dataset over a pack written by PackWriter (works as a torch Dataset).
+    Shards are memory-mapped lazily in whichever process reads them, so with DataLoader(num_workers>0)
+    the image decode happens in the workers and the parent only ships indices.
+    Items are {annotation_id, action_uid, prompt, label, image}, image a decoded RGB PIL image or None;
+    record(i) has the original fields, image being the source path (or None).
+    """
+    def __init__(self, path, decode_images=True):
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported pack format {self.meta.get('format')} in {path}")
+        self.path = path
+        self.decode_images = decode_images
+        self._maps = None
+        self._index = None
+
+    def __len__(self):
+        return self.meta["records"]
+
+    def __getstate__(self):
+        # mmaps can't cross a process boundary; each worker reopens its own
+        state = self.__dict__.copy()
+        state["_maps"] = None
+        state["_index"] = None
+        return state
+
+    def _open(self):
+        self._maps = []
+        for name in self.meta["shards"]:
+            with open(os.path.join(self.path, name), "rb") as f:
+                self._maps.append(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b"")
+        with open(os.path.join(self.path, INDEX_FILE), "rb") as f:
+            index_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+        self._index = memoryview(index_map).cast("q")
+
+    def _row(self, i):
+        if self._maps is None:
+            self._open()
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self._index[i * INDEX_FIELDS:(i + 1) * INDEX_FIELDS]
+
+    def image_bytes(self, i):
+        shard, offset, length = self._row(i)[3:]
+        if shard < 0:
+            return None
+        return self._maps[shard][offset:offset + length]
+
+    def record(self, i):
+        shard, offset, length = self._row(i)[:3]
+        return json.loads(self._maps[shard][offset:offset + length])
+
+    def __getitem__(self, i):
+        item = self.record(i)
+        data = self.image_bytes(i)
+        if data is None or not self.decode_images:
+            item["image"] = data
+        else:
+            with Image.open(io.BytesIO(data)) as image:
+                item["image"] = image.convert("RGB")
+        return item
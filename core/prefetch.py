@@ -0,0 +1,153 @@
+import threading
+from urllib.parse import urldefrag
+from core.offscreen import OffscreenIndex
+from core.workflow_cache import LINE_PATTERN
+from core.telemetry import metrics
+
+PREFETCH_MARKER = "data-m2w-prefetch"
+
+# Adds a <link rel=prefetch> for each stamped element that is (or sits inside) an http(s) link to another page.
+# Chrome fetches these at idle priority into its HTTP cache. Returns the absolute URLs requested.
+# The links carry PREFETCH_MARKER, so the layout observer (scripts/stamp_layout.js) does not count them as page changes.
+PREFETCH_JS = """
+var ids = arguments[0], urls = [];
+var here = location.href.split('#')[0];
+ids.forEach(function(id) {
+    var el = document.querySelector("[data-m2w-id='" + id + "']");
+    var a = el && el.closest('a[href]');
+    if (!a || !/^https?:/.test(a.href)) return;
+    var url = a.href.split('#')[0];
+    if (url === here || urls.indexOf(url) >= 0) return;
+    var link = document.createElement('link');
+    link.rel = 'prefetch';
+    link.href = url;
+    link.setAttribute('data-m2w-prefetch', '');
+    document.head.appendChild(link);
+    urls.push(url);
+});
+return urls;
+"""
+
+# Finished prefetches on the current page: size on the wire and fetch time.
+# Cross-origin responses without Timing-Allow-Origin report 0 bytes.
+PREFETCH_TIMINGS_JS = """
+return performance.getEntriesByType('resource').filter(function(e) {
+    return e.initiatorType === 'link';
+}).map(function(e) {
+    return {url: e.name.split('#')[0], bytes: e.transferSize, duration_s: e.duration / 1000};
+});
+"""
+
+
+class Prefetcher:
+    def __init__(self, max_links=3, max_mb=8, min_score=1.0, page_kb=512):
+        """
+        Speculatively prefetches the pages behind the links most likely to be clicked next,
+        while the model is still thinking, so the navigation that follows hits a warm cache.
+        Shared by every controller; each task gets its own PrefetchTask.
+
+        Args:
+            max_links (int): Links prefetched per step, best goal matches first.
+            max_mb (float): Prefetched bytes allowed per task; prefetching stops once they are used up.
+            min_score (float): Minimum goal-match score (see OffscreenIndex.rank) for a link to be worth fetching.
+            page_kb (float): Size charged against max_mb for each URL when it is requested. Replaced by the
+                measured size once the prefetch finishes and reports one (cross-origin pages report 0 and keep it).
+        """
+        self.max_links = max_links
+        self.max_bytes = int(max_mb * 2**20)
+        self.page_bytes = max(int(page_kb * 2**10), 1)
+        self.min_score = min_score
+        self._lock = threading.Lock()
+        self.stats = {"steps": 0, "issued": 0, "completed": 0, "bytes": 0, "navigations": 0, "hits": 0,
+                      "saved_s": 0.0, "capped": 0}
+
+    def candidates(self, goal, distilled_dom):
+        """Element ids of the visible links that best match the goal, best first."""
+        entries = []
+        for order, line in enumerate(distilled_dom.split("\n")):
+            match = LINE_PATTERN.match(line)
+            if match and match.group(2) == "a" and match.group(1) not in ("0", "-"):
+                entries.append((match.group(1), "a", match.group(3), "", order))
+        ranked = OffscreenIndex(entries).rank(goal)
+        return [entry[0] for score, entry in ranked[:self.max_links] if score >= self.min_score]
+
+    def task(self):
+        return PrefetchTask(self)
+
+    def _add(self, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self.stats[key] += value
+        for key in ("issued", "hits", "capped"):
+            if counts.get(key):
+                metrics.counter("groundhog_prefetch_total", "Speculative page prefetches by outcome").inc(counts[key], result=key)
+        if counts.get("bytes"):
+            metrics.counter("groundhog_prefetch_bytes_total", "Bytes fetched speculatively").inc(counts["bytes"])
+        if counts.get("saved_s"):
+            metrics.counter("groundhog_prefetch_saved_seconds_total", "Fetch time moved off the critical path by prefetch hits").inc(counts["saved_s"])
+
+    def report(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["saved_s"] = round(stats["saved_s"], 3)
+        # Precision: how many prefetched pages were actually visited; coverage: how many visits were prefetched
+        stats["hit_rate"] = round(stats["hits"] / stats["issued"], 4) if stats["issued"] else 0.0
+        stats["coverage"] = round(stats["hits"] / stats["navigations"], 4) if stats["navigations"] else 0.0
+        return stats
+
+
+class PrefetchTask:
+    """
+    One task's prefetches: what is in flight for the current step and the bytes charged so far.
+    Each URL is charged page_bytes when requested, so fetches still running (or never measured) count too.
+    """
+    def __init__(self, prefetcher):
+        self.prefetcher = prefetcher
+        self.pending = {}
+        self.bytes = 0
+
+    def issue(self, browser, goal, distilled_dom):
+        """Starts prefetching for this step (call just before the model). Returns the URLs requested."""
+        self.pending = {}
+        room = (self.prefetcher.max_bytes - self.bytes) // self.prefetcher.page_bytes
+        if room <= 0:
+            self.prefetcher._add(capped=1)
+            return []
+        ids = self.prefetcher.candidates(goal, distilled_dom)[:room]
+        urls = browser.prefetch(ids) if ids else []
+        self.pending = {url: None for url in urls}
+        self.bytes += len(urls) * self.prefetcher.page_bytes
+        self.prefetcher._add(steps=1, issued=len(urls))
+        return urls
+
+    def collect(self, browser):
+        """
+        Records size and fetch time of the finished prefetches, before the next navigation discards them,
+        and swaps their charged estimate for the measured size where there is one.
+        """
+        if not self.pending:
+            return
+        completed = size = 0
+        for entry in browser.prefetch_timings():
+            url = entry["url"]
+            if url in self.pending and self.pending[url] is None:
+                self.pending[url] = entry["duration_s"]
+                completed += 1
+                size += entry["bytes"]
+                if entry["bytes"]:
+                    self.bytes += entry["bytes"] - self.prefetcher.page_bytes
+        self.prefetcher._add(completed=completed, bytes=size)
+
+    def navigated(self, from_url, to_url):
+        """
+        Called after an action with the page URL before and after it. A new URL counts as a navigation,
+        and as a hit if it was prefetched; its fetch time is what the navigation no longer waits for.
+        Returns True on a hit.
+        """
+        from_url, to_url = urldefrag(from_url or "")[0], urldefrag(to_url or "")[0]
+        if not to_url or to_url == from_url:
+            return False
+        hit = to_url in self.pending
+        self.prefetcher._add(navigations=1, hits=int(hit), saved_s=self.pending.get(to_url) or 0.0)
+        self.pending = {}
+        return hit
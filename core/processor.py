@@ -1,10 +1,25 @@
 import re
 from bs4 import BeautifulSoup
 from PIL import Image
+from core.telemetry import tracer
+from core.offscreen import OffscreenIndex
+
+# Cap on indexed off-screen elements, so endless listings don't grow the index without bound
+MAX_OFFSCREEN = 1000
 
 class Processor:
-    def __init__(self, max_elements=200):
+    def __init__(self, max_elements=200, id_attribute="data-m2w-id", visibility_attribute="data-m2w-visible"):
+        """
+        Args:
+            max_elements (int): Cap on listed elements (sentinel included).
+            id_attribute (str): Attribute holding element ids. Live pages are stamped with data-m2w-id;
+                                Mind2Web's cleaned_html uses backend_node_id.
+            visibility_attribute (str, optional): Attribute marking in-viewport elements, or None to treat
+                                                  every element as visible (Mind2Web HTML is pre-filtered).
+        """
         self.max_elements = max_elements
+        self.id_attribute = id_attribute
+        self.visibility_attribute = visibility_attribute
         self.TARGET_WIDTH = 1024
         self.MAX_HEIGHT = 1280
 
@@ -52,6 +67,24 @@ class Processor:
         ONLY includes elements that are currently visible in the viewport.
         CRITICAL: Matches the format used in training (groundhog-data-processing.ipynb).
         """
+        with tracer.span("processor.distill", html_bytes=len(html_string)) as span:
+            distilled = self._distill_dom(html_string)
+            span.set("elements", distilled.count("\n") + 1)
+            return distilled
+
+    def distill_dom_with_index(self, html_string):
+        """
+        distill_dom plus an OffscreenIndex of the interactive elements outside the viewport,
+        built in the same parse. Needs the data-m2w-y positions written by the stamping scripts.
+        """
+        with tracer.span("processor.distill", html_bytes=len(html_string), index=True) as span:
+            offscreen = []
+            distilled = self._distill_dom(html_string, offscreen)
+            span.set("elements", distilled.count("\n") + 1)
+            span.set("offscreen", len(offscreen))
+            return distilled, OffscreenIndex(offscreen)
+
+    def _distill_dom(self, html_string, offscreen=None):
         soup = BeautifulSoup(html_string, "html.parser")
 
         # prune structural junk
@@ -71,9 +104,9 @@ class Processor:
         # traverse ALL tags in document order
         for tag in soup.find_all(True):
             # use our custom injected ID
-            uid = tag.attrs.get("data-m2w-id", "")
+            uid = tag.attrs.get(self.id_attribute, "")
 
-            is_visible = tag.attrs.get("data-m2w-visible", "false") == "true"
+            is_visible = self.visibility_attribute is None or tag.attrs.get(self.visibility_attribute, "false") == "true"
 
             # condition A: Header (Keep for context, even without ID)
             if tag.name in HEADER_TAGS:
@@ -87,7 +120,7 @@ class Processor:
                 continue
 
             #condition C: visibility + interactive check
-            if not is_visible:
+            if not is_visible and (offscreen is None or len(offscreen) >= MAX_OFFSCREEN or not self._has_position(tag)):
                 continue
 
             is_interactive_tag = tag.name in INTERACTIVE_TAGS
@@ -104,6 +137,10 @@ class Processor:
                 if not text and not attr_str and tag.name not in ["input", "button", "select", "textarea"]:
                     continue
 
+                if not is_visible:
+                    offscreen.append((uid, tag.name, text, attr_str, int(tag.attrs["data-m2w-y"])))
+                    continue
+
                 # formatting: [1250] <li> Car (role='tab')
                 line = f"[{uid}] <{tag.name}> {text} {attr_str}"
                 line = " ".join(line.split())
@@ -113,13 +150,25 @@ class Processor:
         if len(candidates) > self.max_elements:
             candidates = candidates[:self.max_elements]
 
+        # The parse tree is full of parent/child cycles; break them now instead of waiting for the cyclic GC
+        soup.decompose()
+
         return "\n".join(candidates)
     
+    def _has_position(self, tag):
+        """Off-screen but laid out, with a known page position (see stamp_page.js / stamp_layout.js)."""
+        y = tag.attrs.get("data-m2w-y", "")
+        return tag.attrs.get("data-m2w-shown", "1") == "1" and y.lstrip("-").isdigit()
+
     def process_image(self, image):
         """
         Resizes and crops the screenshot exactly as done during training.
         This prevents distribution shift.
         """
+        with tracer.span("processor.image"):
+            return self._process_image(image)
+
+    def _process_image(self, image):
         # calculate new height to preserve aspect ratio based on fixed width
         w_percent = (self.TARGET_WIDTH / float(image.size[0]))
         h_size = int((float(image.size[1]) * float(w_percent)))
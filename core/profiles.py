@@ -0,0 +1,104 @@
+import os
+import shutil
+import threading
+from core.telemetry import metrics
+
+# Per-site state inside a Chrome user-data-dir (relative to its "Default" profile).
+# Removing these logs the agent out everywhere; the HTTP cache ("Cache", "Code Cache") is left alone.
+STORAGE_PATHS = [
+    "Cookies", "Cookies-journal", "Network/Cookies", "Network/Cookies-journal",
+    "Local Storage", "Session Storage", "IndexedDB", "Service Worker", "File System",
+    "WebStorage", "Login Data", "Login Data-journal", "Web Data", "Web Data-journal",
+    "History", "History-journal", "Sessions", "Current Session", "Current Tabs",
+]
+
+# Site storage cleared between tasks over CDP (Storage.clearDataForOrigin). No HTTP cache here.
+STORAGE_TYPES = "cookies,local_storage,indexeddb,websql,service_workers,cache_storage,file_systems,shader_cache"
+
+# Reports, for the page just loaded, how many bytes came from the HTTP cache vs the network.
+# Cross-origin resources without Timing-Allow-Origin report no sizes and are counted as opaque.
+CACHE_STATS_JS = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var stats = {resources: 0, hits: 0, misses: 0, opaque: 0, hit_bytes: 0, network_bytes: 0};
+entries.forEach(function(e) {
+    stats.resources++;
+    if (e.transferSize === 0 && e.decodedBodySize > 0) {
+        stats.hits++;
+        stats.hit_bytes += e.encodedBodySize;
+    } else if (e.transferSize > 0) {
+        stats.misses++;
+        stats.network_bytes += e.transferSize;
+    } else {
+        stats.opaque++;
+    }
+});
+return stats;
+"""
+
+
+class ProfileManager:
+    """
+    Hands out persistent Chrome user-data-dirs ("slots") so the HTTP cache survives across tasks,
+    browser restarts and runs. Chrome locks its profile, so each live browser gets its own slot;
+    a slot freed by a quit browser is reused by the next one, cache intact.
+    New slots start as a copy of `template` (a profile warmed on the target sites), minus its site storage.
+    """
+    def __init__(self, root, template=None, cache_mb=512, isolate_storage=True):
+        """
+        Args:
+            root (str): Directory holding the slots (slot-0, slot-1, ...). Created if missing.
+            template (str, optional): Warmed user-data-dir copied into each new slot.
+            cache_mb (int): Disk cache cap per slot passed to Chrome.
+            isolate_storage (bool): Start every browser and task without cookies or site storage,
+                                    keeping only the cache. False keeps logins across tasks.
+        """
+        self.root = root
+        self.template = template
+        self.cache_mb = cache_mb
+        self.isolate_storage = isolate_storage
+        self._lock = threading.Lock()
+        self._in_use = set()
+        os.makedirs(root, exist_ok=True)
+
+    def acquire(self):
+        """Returns the path of a free slot, creating one (from the template, if any) when all are taken."""
+        with self._lock:
+            index = 0
+            while index in self._in_use:
+                index += 1
+            self._in_use.add(index)
+        path = os.path.join(self.root, f"slot-{index}")
+
+        if not os.path.exists(path):
+            if self.template:
+                shutil.copytree(self.template, path, ignore=shutil.ignore_patterns("Singleton*", "*.lock", "lockfile"))
+                metrics.counter("groundhog_profile_slots_total", "Browser profile slots created").inc(source="template")
+            else:
+                os.makedirs(path)
+                metrics.counter("groundhog_profile_slots_total", "Browser profile slots created").inc(source="empty")
+        if self.isolate_storage:
+            self.clear_storage(path)
+        return path
+
+    def release(self, path):
+        """Marks a slot free once its browser has quit. Its cache stays on disk for the next user."""
+        index = int(os.path.basename(path).rsplit("-", 1)[1])
+        with self._lock:
+            self._in_use.discard(index)
+
+    @staticmethod
+    def clear_storage(path):
+        """Deletes cookies and site storage from a (stopped) profile, keeping the HTTP cache."""
+        profile = os.path.join(path, "Default")
+        for rel in STORAGE_PATHS:
+            target = os.path.join(profile, rel)
+            if os.path.isdir(target):
+                shutil.rmtree(target, ignore_errors=True)
+            elif os.path.exists(target):
+                os.remove(target)
+
+    def chrome_arguments(self):
+        return [f"--disk-cache-size={self.cache_mb * 1024 * 1024}"]
+
+    def __len__(self):
+        return len(self._in_use)
@@ -0,0 +1,217 @@
+import os
+import io
+import json
+import gzip
+import time
+import hashlib
+import tempfile
+from PIL import Image
+
+# On-disk layout (one root can hold many trajectories):
+#
+#   <root>/screenshots/<sha256>.png        content-addressed, shared across trajectories
+#   <root>/<trajectory_id>/meta.json       goal, start_url, outcome
+#   <root>/<trajectory_id>/steps.jsonl.gz  one record per step (raw HTML, distilled DOM, prompt, output, action)
+
+SCREENSHOT_DIR = "screenshots"
+
+
+def _image_digest(image):
+    """Hashes decoded pixels (not encoded bytes) so identical frames dedupe regardless of encoder."""
+    h = hashlib.sha256()
+    h.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode("ascii"))
+    h.update(image.tobytes())
+    return h.hexdigest()
+
+
+class TrajectoryRecorder:
+    def __init__(self, root_dir):
+        """
+        Saves every step the controller takes so it can be replayed offline.
+
+        Args:
+            root_dir (str): Directory holding trajectories and the shared screenshot store.
+        """
+        self.root_dir = root_dir
+        self.screenshot_dir = os.path.join(root_dir, SCREENSHOT_DIR)
+        os.makedirs(self.screenshot_dir, exist_ok=True)
+
+        self.trajectory_dir = None
+        self.meta = None
+        self._steps_file = None
+
+    def start(self, goal, start_url):
+        """Opens a new trajectory. Returns its directory."""
+        if self._steps_file is not None:
+            self.finish("abandoned")
+
+        traj_id = time.strftime("%Y%m%d-%H%M%S") + "-" + hashlib.sha1(f"{goal}\n{start_url}\n{time.time()}".encode()).hexdigest()[:8]
+        self.trajectory_dir = os.path.join(self.root_dir, traj_id)
+        os.makedirs(self.trajectory_dir)
+
+        self.meta = {"id": traj_id, "goal": goal, "start_url": start_url, "started_at": time.time(), "steps": 0, "status": None}
+        self._write_meta()
+        self._steps_file = gzip.open(os.path.join(self.trajectory_dir, "steps.jsonl.gz"), "at", encoding="utf-8")
+        print(f"[Recorder] Recording trajectory to {self.trajectory_dir}")
+        return self.trajectory_dir
+
+    def save_screenshot(self, image):
+        """Stores a screenshot once per unique content. Returns its digest."""
+        digest = _image_digest(image)
+        path = os.path.join(self.screenshot_dir, f"{digest}.png")
+        if os.path.exists(path):
+            return digest
+
+        # Each writer gets its own temp file, so recorders saving the same frame at once (batch workers
+        # share this directory) never clobber each other; the rename makes the file appear complete
+        fd, tmp_path = tempfile.mkstemp(dir=self.screenshot_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                image.save(f, format="PNG", optimize=False, compress_level=6)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another recorder stored the same content first: that is just as good
+            if not os.path.exists(path):
+                raise
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return digest
+
+    def record_step(self, step, screenshot, raw_html, max_id, distilled_dom, prompt, raw_output, action):
+        """Appends one step. `action` is the parsed model output (None if it wasn't valid JSON)."""
+        record = {
+            "step": step,
+            "screenshot": self.save_screenshot(screenshot),
+            "raw_html": raw_html,
+            "max_id": max_id,
+            "distilled_dom": distilled_dom,
+            "prompt": prompt,
+            "raw_output": raw_output,
+            "action": action,
+        }
+        self._steps_file.write(json.dumps(record) + "\n")
+        self._steps_file.flush()
+        self.meta["steps"] = step
+
+    def finish(self, status):
+        """Closes the current trajectory with its final status."""
+        if self._steps_file is None:
+            return
+        self._steps_file.close()
+        self._steps_file = None
+        self.meta["status"] = status
+        self.meta["finished_at"] = time.time()
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(os.path.join(self.trajectory_dir, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+
+
+def load_trajectory(trajectory_dir):
+    """
+    Reads a recorded trajectory.
+    Returns (meta, steps) where each step dict has its "screenshot" digest resolved to a file path.
+    """
+    with open(os.path.join(trajectory_dir, "meta.json")) as f:
+        meta = json.load(f)
+
+    screenshot_dir = os.path.join(os.path.dirname(os.path.abspath(trajectory_dir)), SCREENSHOT_DIR)
+    steps = []
+    with gzip.open(os.path.join(trajectory_dir, "steps.jsonl.gz"), "rt", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            step = json.loads(line)
+            step["screenshot_path"] = os.path.join(screenshot_dir, f"{step['screenshot']}.png")
+            steps.append(step)
+    return meta, steps
+
+
+class ReplayBrowser:
+    def __init__(self, trajectory_dir):
+        """
+        Drop-in stand-in for core.browser.Browser that serves recorded observations.
+        No Chrome and no network: capture_state() returns the recorded screenshot and HTML
+        of the next step, and actions are only checked against what was recorded.
+        """
+        self.meta, self.steps = load_trajectory(trajectory_dir)
+        if not self.steps:
+            raise ValueError(f"Trajectory {trajectory_dir} has no recorded steps")
+
+        self.max_id = 0
+        self.cursor = 0
+        self.actions = []
+        self.divergences = 0
+        self._images = {}
+
+    def navigate(self, url):
+        print(f"[ReplayBrowser] Replaying {len(self.steps)} steps recorded from {self.meta['start_url']}")
+        self.cursor = 0
+        self.actions = []
+        self.divergences = 0
+
+    def _load_image(self, path):
+        # Identical frames share a digest, so decode each file once
+        if path not in self._images:
+            with Image.open(path) as img:
+                self._images[path] = img.convert("RGB")
+        return self._images[path]
+
+    def capture_state(self):
+        if self.cursor >= len(self.steps):
+            print("[ReplayBrowser] ⚠️ Recording exhausted, repeating the last observation.")
+            step = self.steps[-1]
+        else:
+            step = self.steps[self.cursor]
+        self.cursor += 1
+
+        self.max_id = int(step.get("max_id") or 0)
+        return self._load_image(step["screenshot_path"]), step["raw_html"]
+
+    def _current_step(self):
+        return self.steps[min(self.cursor, len(self.steps)) - 1]
+
+    def _check(self, taken):
+        recorded = self._current_step().get("action") or {}
+        expected = (str(recorded.get("action", "")).lower(), str(recorded.get("element_id", "")))
+        if taken != expected:
+            self.divergences += 1
+            print(f"[ReplayBrowser] ⚠️ Diverged from recording: took {taken}, recorded {expected}")
+
+    def execute_action(self, action, element_id, value=None):
+        self.actions.append({"action": action, "element_id": str(element_id), "value": value})
+        self._check((action, str(element_id)))
+        return True
+
+    def scroll(self, direction="down", amount=None):
+        self.actions.append({"action": "scroll", "direction": direction})
+        recorded = self._current_step().get("action") or {}
+        if str(recorded.get("element_id", "0")) != "0" and str(recorded.get("action", "")).lower() != "scroll":
+            self.divergences += 1
+
+    def quit(self):
+        self._images.clear()
+
+
+class ReplayModel:
+    def __init__(self, trajectory_dir):
+        """
+        Stand-in for core.model.ModelEngine that returns the recorded raw outputs in order.
+        Use it to benchmark Processor/controller changes without a GPU.
+        """
+        _, steps = load_trajectory(trajectory_dir)
+        self.outputs = [s["raw_output"] for s in steps]
+        self.prompts = [s["prompt"] for s in steps]
+        self.calls = 0
+        self.prompt_mismatches = 0
+
+    def predict(self, image, prompt_text):
+        i = min(self.calls, len(self.outputs) - 1)
+        if prompt_text != self.prompts[i]:
+            # The Processor produced a different prompt than at record time
+            self.prompt_mismatches += 1
+        self.calls += 1
+        return self.outputs[i]
@@ -0,0 +1,168 @@
+import gc
+import os
+import sys
+from core.telemetry import metrics
+
+try:
+    import psutil
+except ImportError:  # Falls back to /proc (Linux only)
+    psutil = None
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _proc_rss(pid):
+    """Resident set size of one process in bytes, or 0 if it is gone."""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def _proc_children(pid):
+    """All descendants of a process (Chrome forks renderers, GPU and utility processes)."""
+    if psutil is not None:
+        try:
+            return [c.pid for c in psutil.Process(pid).children(recursive=True)]
+        except psutil.Error:
+            return []
+
+    parents = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return []
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the ppid is the second field after it
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+
+    found, stack = [], [pid]
+    while stack:
+        for child in parents.get(stack.pop(), []):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def python_rss():
+    return _proc_rss(os.getpid())
+
+
+def browser_rss(browser):
+    """Total RSS of a browser's driver, Chrome and all of Chrome's child processes."""
+    roots = browser.process_ids() if hasattr(browser, "process_ids") else []
+    pids = set()
+    for pid in roots:
+        pids.add(pid)
+        pids.update(_proc_children(pid))
+    return sum(_proc_rss(pid) for pid in pids)
+
+
+def gpu_allocated():
+    """Bytes currently allocated by torch on the GPU (0 if torch was never imported here)."""
+    # Only look if the model already pulled torch in; importing it just for this costs seconds
+    torch = sys.modules.get("torch")
+    if torch is None or not torch.cuda.is_available():
+        return 0
+    return torch.cuda.memory_allocated()
+
+
+class ResourceManager:
+    def __init__(self, max_tasks_per_browser=50, max_browser_mb=2048, max_python_mb=None):
+        """
+        Watches memory of the agent process, its browsers and the GPU, and decides
+        when a browser has lived long enough to be replaced.
+
+        Args:
+            max_tasks_per_browser (int, optional): Recycle a browser after this many tasks.
+            max_browser_mb (float, optional): Recycle a browser once Chrome's RSS passes this.
+            max_python_mb (float, optional): Collect garbage and release cached GPU blocks once this process passes this.
+        """
+        self.max_tasks_per_browser = max_tasks_per_browser
+        self.max_browser_mb = max_browser_mb
+        self.max_python_mb = max_python_mb
+        self._tasks = {}
+
+    def sample(self, browser=None, worker="0"):
+        """Measures everything once, exports the numbers as gauges and returns them in bytes."""
+        usage = {"python_rss": python_rss(), "gpu_allocated": gpu_allocated()}
+        metrics.gauge("groundhog_python_rss_bytes", "Resident memory of the agent process").set(usage["python_rss"])
+        metrics.gauge("groundhog_gpu_allocated_bytes", "GPU memory allocated by torch").set(usage["gpu_allocated"])
+        if browser is not None:
+            usage["browser_rss"] = browser_rss(browser)
+            metrics.gauge("groundhog_browser_rss_bytes", "Resident memory of Chrome and its children").set(usage["browser_rss"], worker=str(worker))
+        return usage
+
+    def task_done(self, browser, worker="0"):
+        """
+        Call after every task on a browser.
+        Returns the reason the browser should be recycled now, or None to keep it.
+        """
+        key = id(browser)
+        self._tasks[key] = self._tasks.get(key, 0) + 1
+        usage = self.sample(browser, worker)
+
+        reason = None
+        if self.max_tasks_per_browser and self._tasks[key] >= self.max_tasks_per_browser:
+            reason = "tasks"
+        elif self._browser_over(usage):
+            reason = "browser_memory"
+        self._reclaim_if_over(usage)
+
+        if reason:
+            metrics.counter("groundhog_browser_recycles_total", "Browsers replaced by the resource manager").inc(reason=reason)
+            print(f"[Resources] ♻️ Recycling browser ({reason}) after {self._tasks[key]} tasks, "
+                  f"Chrome {usage['browser_rss'] / 2**20:.0f} MB, agent {usage['python_rss'] / 2**20:.0f} MB")
+        return reason
+
+    def check(self, browser, worker="0"):
+        """
+        Call between the steps of a task whose browser lives only as long as the task (interactive sessions).
+        Applies the same memory budgets as task_done without counting a task.
+        Returns "browser_memory" if the browser should be quit now, else None.
+        """
+        usage = self.sample(browser, worker)
+        self._reclaim_if_over(usage)
+        if not self._browser_over(usage):
+            return None
+        metrics.counter("groundhog_browser_recycles_total", "Browsers replaced by the resource manager").inc(reason="browser_memory")
+        print(f"[Resources] ♻️ Quitting browser mid-task, Chrome {usage['browser_rss'] / 2**20:.0f} MB")
+        return "browser_memory"
+
+    def _browser_over(self, usage):
+        return bool(self.max_browser_mb) and usage["browser_rss"] > self.max_browser_mb * 1024 * 1024
+
+    def _reclaim_if_over(self, usage):
+        if self.max_python_mb and usage["python_rss"] > self.max_python_mb * 1024 * 1024:
+            self.reclaim()
+
+    def reclaim(self):
+        """Frees what the Python side can give back without a restart."""
+        collected = gc.collect()
+        torch = sys.modules.get("torch")
+        if torch is not None and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        metrics.counter("groundhog_memory_reclaims_total", "Forced garbage collections by the resource manager").inc()
+        print(f"[Resources] 🧹 Agent over {self.max_python_mb} MB, collected {collected} objects.")
+
+    def forget(self, browser, worker=None):
+        """
+        Drops the task count of a browser that was quit. Pass `worker` when that label won't be reused
+        (one per interactive session), so its memory gauge is dropped too.
+        """
+        self._tasks.pop(id(browser), None)
+        if worker is not None:
+            metrics.gauge("groundhog_browser_rss_bytes", "Resident memory of Chrome and its children").remove(worker=str(worker))
@@ -0,0 +1,158 @@
+import time
+import itertools
+import threading
+from collections import deque
+from core.telemetry import metrics
+
+
+class SessionRejected(Exception):
+    """Raised when the waiting queue is full."""
+
+
+class Ticket:
+    """One user's place in the scheduler, from enqueue() to release()."""
+    def __init__(self, ticket_id):
+        self.id = ticket_id
+        self.enqueued_at = time.monotonic()
+        self.started_at = None
+
+    @property
+    def admitted(self):
+        return self.started_at is not None
+
+
+class GatedModel:
+    """
+    Wraps a shared ModelEngine so at most N generate() calls run at once.
+    Extra callers block until a slot frees up instead of piling onto the GPU.
+    """
+    def __init__(self, model, max_concurrent=1):
+        self.model = model
+        self._gate = threading.BoundedSemaphore(max_concurrent)
+
+    def _gated(self, fn, *args, **kwargs):
+        start = time.perf_counter()
+        with self._gate:
+            metrics.histogram("groundhog_model_gate_wait_seconds", "Time spent waiting for a free model slot").observe(time.perf_counter() - start)
+            return fn(*args, **kwargs)
+
+    def predict(self, *args, **kwargs):
+        return self._gated(self.model.predict, *args, **kwargs)
+
+    def predict_candidates(self, *args, **kwargs):
+        return self._gated(self.model.predict_candidates, *args, **kwargs)
+
+    def predict_batch(self, *args, **kwargs):
+        return self._gated(self.model.predict_batch, *args, **kwargs)
+
+    def identity(self, adapter=None):
+        return self.model.identity(adapter)
+
+
+class SessionScheduler:
+    def __init__(self, max_sessions=2, max_queue=20, max_steps=15, max_session_s=600, expected_session_s=120):
+        """
+        Admission control for interactive sessions: caps live browser sessions,
+        queues the rest in arrival order and estimates when each waiter will start.
+
+        Args:
+            max_sessions (int): Sessions (browsers) allowed to run at once.
+            max_queue (int): Waiters allowed before new arrivals are turned away.
+            max_steps (int): Per-session step quota.
+            max_session_s (float): Per-session wall-clock quota in seconds.
+            expected_session_s (float): Session length assumed for ETAs until real ones are observed.
+        """
+        self.max_sessions = max_sessions
+        self.max_queue = max_queue
+        self.max_steps = max_steps
+        self.max_session_s = max_session_s
+        self.expected_session_s = expected_session_s
+
+        self._cond = threading.Condition()
+        self._ids = itertools.count(1)
+        self._waiting = deque()
+        self._active = {}
+        self._recent = deque(maxlen=20)
+
+    def enqueue(self):
+        """Joins the queue. Raises SessionRejected if it is full."""
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                metrics.counter("groundhog_sessions_rejected_total", "Sessions turned away by admission control").inc()
+                raise SessionRejected(f"{len(self._waiting)} users already waiting")
+            ticket = Ticket(next(self._ids))
+            self._waiting.append(ticket)
+            self._publish()
+            return ticket
+
+    def wait(self, ticket, timeout=1.0):
+        """
+        Blocks up to `timeout` seconds for the ticket's turn.
+        Returns True once admitted; on False, show position()/eta() and call again.
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while not ticket.admitted:
+                if self._waiting and self._waiting[0] is ticket and len(self._active) < self.max_sessions:
+                    self._waiting.popleft()
+                    ticket.started_at = time.monotonic()
+                    self._active[ticket.id] = ticket
+                    metrics.histogram("groundhog_session_queue_seconds", "Time users waited for a session").observe(ticket.started_at - ticket.enqueued_at)
+                    self._publish()
+                    # Whoever is next may also fit if several slots are free
+                    self._cond.notify_all()
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def position(self, ticket):
+        """1-based place in the queue (0 once admitted)."""
+        with self._cond:
+            try:
+                return self._waiting.index(ticket) + 1
+            except ValueError:
+                return 0
+
+    def eta(self, ticket):
+        """Rough seconds until the ticket starts, from recent session lengths."""
+        with self._cond:
+            try:
+                ahead = self._waiting.index(ticket)
+            except ValueError:
+                return 0.0
+            typical = sum(self._recent) / len(self._recent) if self._recent else self.expected_session_s
+            now = time.monotonic()
+            # Slots free up as the running sessions finish, oldest first
+            remaining = sorted(max(0.0, typical - (now - t.started_at)) for t in self._active.values())
+            remaining += [0.0] * (self.max_sessions - len(remaining))
+            rounds, slot = divmod(ahead, self.max_sessions)
+            return remaining[slot] + rounds * typical
+
+    def expired(self, ticket):
+        """True once the session has used up its wall-clock quota."""
+        return ticket.admitted and time.monotonic() - ticket.started_at > self.max_session_s
+
+    def release(self, ticket):
+        """Frees the ticket's slot (or its place in the queue). Safe to call more than once."""
+        with self._cond:
+            if ticket.admitted:
+                if self._active.pop(ticket.id, None) is not None:
+                    self._recent.append(time.monotonic() - ticket.started_at)
+            else:
+                try:
+                    self._waiting.remove(ticket)
+                except ValueError:
+                    pass
+            self._publish()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"active": len(self._active), "waiting": len(self._waiting), "max_sessions": self.max_sessions}
+
+    def _publish(self):
+        metrics.gauge("groundhog_sessions_active", "Interactive sessions running").set(len(self._active))
+        metrics.gauge("groundhog_sessions_waiting", "Interactive sessions queued").set(len(self._waiting))
@@ -0,0 +1,336 @@
+import os
+import json
+import time
+import threading
+import itertools
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default histogram buckets (seconds). Covers JS calls (ms) up to model generation (tens of s).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+# --- METRICS ---
+
+class _Metric:
+    def __init__(self, name, help_text, kind):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(sorted(labels.items()))
+
+    def _snapshot(self):
+        """(labels, value) pairs copied under the lock: scrapes run on the server thread while agents update."""
+        with self._lock:
+            return list(self._values.items())
+
+    def _fmt_labels(self, key, extra=None):
+        pairs = list(key) + (extra or [])
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Counter(_Metric):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, "counter")
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        return [f"{self.name}{self._fmt_labels(k)} {v}" for k, v in self._snapshot()]
+
+
+class Gauge(_Metric):
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text, "gauge")
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def remove(self, **labels):
+        """Drops a label set whose subject is gone (e.g. a finished session), so it stops being exported."""
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def render(self):
+        return [f"{self.name}{self._fmt_labels(k)} {v}" for k, v in self._snapshot()]
+
+
+class Histogram(_Metric):
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, "histogram")
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state["count"] if state else 0
+
+    def _snapshot(self):
+        # Copies each state too, so buckets, _sum and _count come from the same moment
+        with self._lock:
+            return [(key, {"counts": list(state["counts"]), "sum": state["sum"], "count": state["count"]})
+                    for key, state in self._values.items()]
+
+    def render(self):
+        lines = []
+        for key, state in self._snapshot():
+            for bound, n in zip(self.buckets, state["counts"]):
+                lines.append(f"{self.name}_bucket{self._fmt_labels(key, [('le', bound)])} {n}")
+            lines.append(f"{self.name}_bucket{self._fmt_labels(key, [('le', '+Inf')])} {state['count']}")
+            lines.append(f"{self.name}_sum{self._fmt_labels(key)} {state['sum']}")
+            lines.append(f"{self.name}_count{self._fmt_labels(key)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """Process-wide registry of counters, gauges and histograms, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help_text, **kwargs)
+            return metric
+
+    def counter(self, name, help_text=""):
+        return self._get(Counter, name, help_text)
+
+    def gauge(self, name, help_text=""):
+        return self._get(Gauge, name, help_text)
+
+    def histogram(self, name, help_text="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, buckets=buckets)
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            registered = list(self._metrics.values())
+        for metric in registered:
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+# --- TRACING ---
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "thread_id", "attrs")
+
+    def __init__(self, name, span_id, parent_id, attrs):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.attrs = attrs
+        self.thread_id = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+
+    def set(self, key, value):
+        """Attaches an attribute (token counts, element counts...) to the span."""
+        self.attrs[key] = value
+
+    @property
+    def duration_s(self):
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e9
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "thread_id": self.thread_id,
+            "start_ns": self.start_ns,
+            "duration_s": self.duration_s,
+            "attrs": self.attrs,
+        }
+
+
+class JsonlExporter:
+    """Appends one JSON line per finished span."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a")
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class ChromeTraceExporter:
+    """
+    Collects spans as Chrome trace "complete" events.
+    Open the written file in chrome://tracing or https://ui.perfetto.dev.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._events = []
+
+    def export(self, span):
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": span.start_ns / 1000,
+            "dur": (span.end_ns - span.start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": span.thread_id,
+            "args": {k: v if isinstance(v, (int, float, str, bool)) else str(v) for k, v in span.attrs.items()},
+        }
+        with self._lock:
+            self._events.append(event)
+
+    def flush(self):
+        with self._lock:
+            events = list(self._events)
+        with open(self.path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def close(self):
+        self.flush()
+
+
+class Tracer:
+    """
+    Lightweight span tracer.
+    Every span's duration feeds the groundhog_stage_seconds histogram; spans are additionally
+    handed to exporters when any are registered.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.exporters = []
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def span(self, name, **attrs):
+        stack = self._stack()
+        parent_id = stack[-1].span_id if stack else None
+        span = Span(name, next(self._ids), parent_id, attrs)
+        stack.append(span)
+        try:
+            yield span
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            stack.pop()
+            self.registry.histogram(
+                "groundhog_stage_seconds", "Wall time spent in each pipeline stage"
+            ).observe(span.duration_s, stage=name)
+            for exporter in self.exporters:
+                exporter.export(span)
+
+    def shutdown(self):
+        for exporter in self.exporters:
+            exporter.close()
+        self.exporters = []
+
+
+metrics = MetricsRegistry()
+tracer = Tracer(metrics)
+
+
+def count(event, amount=1):
+    """Shortcut for the agent event counter (retries, hallucinations, scrolls...)."""
+    metrics.counter("groundhog_agent_events_total", "Agent loop events by type").inc(amount, event=event)
+
+
+# --- EXPORT ENDPOINT ---
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("", "/metrics"):
+            self.send_response(404)
+            self.end_headers()
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrape requests out of the agent log
+
+
+def start_metrics_server(port=9108, host="0.0.0.0"):
+    """Serves /metrics in Prometheus text format from a daemon thread. Returns the server."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    print(f"[Telemetry] Metrics endpoint at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def configure(trace_path=None, chrome_trace_path=None, metrics_port=None):
+    """
+    One-call setup used by the entry points.
+
+    Args:
+        trace_path (str, optional): Write spans as JSON lines here.
+        chrome_trace_path (str, optional): Write spans in Chrome trace format here on shutdown.
+        metrics_port (int, optional): Serve Prometheus metrics on this port.
+    """
+    if trace_path:
+        tracer.add_exporter(JsonlExporter(trace_path))
+    if chrome_trace_path:
+        tracer.add_exporter(ChromeTraceExporter(chrome_trace_path))
+    if metrics_port is not None:
+        return start_metrics_server(metrics_port)
+    return None
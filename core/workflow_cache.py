@@ -0,0 +1,258 @@
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qsl
+from core.telemetry import metrics
+
+# [123] <button> Search (type='submit', aria='Search')
+LINE_PATTERN = re.compile(r"^\[(\d+|-)\]\s+<(\w+)>\s*(.*)$")
+ATTR_KEY_PATTERN = re.compile(r"(\w+)='")
+
+# Values that usually change between otherwise identical goals
+QUOTED_PATTERN = re.compile(r"\"([^\"]+)\"|'([^']+)'")
+NUMBER_PATTERN = re.compile(r"\$?\d[\d,]*(?:\.\d+)?%?")
+PROPER_NOUN_PATTERN = re.compile(r"\b([A-Z][\w&'-]*(?:\s+[A-Z][\w&'-]*)*)")
+SENTENCE_START = re.compile(r"(?:^|[.!?:]\s+)$")
+
+# Stands in for a previous step that could not be recorded (see make_step). States after it are
+# keyed apart from the task start, and neither looked up nor committed until a recordable step follows.
+UNKNOWN_STEP = {"action": "?", "descriptor": "?"}
+
+# Path segments that are ids rather than structure: numbers, hashes, long slugs
+VOLATILE_SEGMENT = re.compile(r"^(?:\d+|[0-9a-f]{8,}|[\w-]{32,})$", re.IGNORECASE)
+
+
+def normalize_goal(goal):
+    """
+    Splits a goal into a reusable template and its slot values (in order of appearance).
+    "Find flights from New York to Boston under $300" ->
+        ("find flights from {0} to {1} under {2}", ["New York", "Boston", "$300"])
+    """
+    goal = goal.strip()
+    spans = []
+
+    def claim(pattern, value_of, skip=None):
+        for m in pattern.finditer(goal):
+            if any(m.start() < end and start < m.end() for start, end, _ in spans):
+                continue
+            if skip and skip(m):
+                continue
+            spans.append((m.start(), m.end(), value_of(m)))
+
+    claim(QUOTED_PATTERN, lambda m: m.group(1) or m.group(2))
+    claim(NUMBER_PATTERN, lambda m: m.group(0))
+    # A capitalized first word is just the start of a sentence
+    claim(PROPER_NOUN_PATTERN, lambda m: m.group(1), skip=lambda m: SENTENCE_START.search(goal[:m.start()]))
+
+    pieces, slots, pos = [], [], 0
+    for start, end, value in sorted(spans):
+        pieces.append(goal[pos:start].lower())
+        pieces.append("{%d}" % len(slots))
+        slots.append(value)
+        pos = end
+    pieces.append(goal[pos:].lower())
+
+    return " ".join("".join(pieces).split()), slots
+
+
+def url_pattern(url):
+    """Host plus path with id-like segments wildcarded; query keys kept, values dropped."""
+    parts = urlsplit(url or "")
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    segments = ["*" if VOLATILE_SEGMENT.match(seg) else seg.lower() for seg in parts.path.split("/") if seg]
+    query_keys = sorted({k for k, _ in parse_qsl(parts.query, keep_blank_values=True)})
+    pattern = host + "/" + "/".join(segments)
+    if query_keys:
+        pattern += "?" + "&".join(query_keys)
+    return pattern
+
+
+def parse_elements(distilled_dom):
+    """Returns [(element_id, tag, descriptor)] for every actionable line of a distilled DOM."""
+    elements = []
+    for line in distilled_dom.split("\n"):
+        m = LINE_PATTERN.match(line)
+        if m and m.group(1) != "-":
+            elements.append((m.group(1), m.group(2), f"<{m.group(2)}> {m.group(3)}".strip()))
+    return elements
+
+
+def dom_signature(distilled_dom, max_elements=60):
+    """
+    Structural fingerprint of a page: the sequence of element tags and attribute names,
+    ignoring ids and text so the same template with different content still matches.
+    """
+    parts = []
+    for line in distilled_dom.split("\n")[:max_elements]:
+        m = LINE_PATTERN.match(line)
+        if not m:
+            continue
+        keys = ",".join(ATTR_KEY_PATTERN.findall(m.group(3)))
+        parts.append(f"{m.group(2)}:{keys}")
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class WorkflowCache:
+    def __init__(self, max_entries=5000, min_successes=1, path=None):
+        """
+        Remembers actions from successful trajectories and proposes them again on matching states,
+        so recurring goals skip the model.
+
+        Args:
+            max_entries (int): LRU capacity (one entry per goal template / URL pattern / page structure).
+            min_successes (int): How many successful trajectories must agree before an entry is served.
+            path (str, optional): JSON file to load from and save() to.
+        """
+        self.max_entries = max_entries
+        self.min_successes = min_successes
+        self.path = path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"lookups": 0, "hits": 0, "misses": 0, "stale": 0, "evictions": 0, "rejected": 0}
+
+        if path:
+            self.load(path)
+
+    def _key(self, template, url, distilled_dom, previous):
+        # The previous step tells apart states where the page looks the same before and after an action
+        prev = f"{previous['action']}:{previous['descriptor']}" if previous else "-"
+        return f"{template}\n{url_pattern(url)}\n{dom_signature(distilled_dom)}\n{prev}"
+
+    def _count(self, result):
+        # Caller holds self._lock
+        self.stats[result] += 1
+        metrics.counter("groundhog_workflow_cache_total", "Workflow cache lookups by result").inc(result=result)
+
+    def lookup(self, goal, url, distilled_dom, previous=None):
+        """
+        Returns a model-style action dict for this state, or None.
+        The cached element is re-resolved against the live element list by its descriptor,
+        so the returned element_id is always one that is on the page right now.
+        `previous` is the make_step() record of the step before this one (None at the start).
+        """
+        template, slots = normalize_goal(goal)
+        key = self._key(template, url, distilled_dom, previous)
+
+        with self._lock:
+            self.stats["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry is None or entry["successes"] < self.min_successes:
+                self._count("misses")
+                return None
+            self._entries.move_to_end(key)
+
+        action = self._resolve(entry, slots, distilled_dom)
+        with self._lock:
+            self._count("stale" if action is None else "hits")
+        if action is None:
+            return None
+
+        action["_cache_key"] = key
+        return action
+
+    def _resolve(self, entry, slots, distilled_dom):
+        element_id = "0"
+        if entry["descriptor"] is not None:
+            matches = [eid for eid, _, desc in parse_elements(distilled_dom) if desc == entry["descriptor"]]
+            if len(matches) != 1:
+                # Gone, or ambiguous: let the model decide
+                return None
+            element_id = matches[0]
+
+        value = entry["value"]
+        if isinstance(value, dict) and "slot" in value:
+            if value["slot"] >= len(slots):
+                return None
+            value = slots[value["slot"]]
+
+        return {"action": entry["action"], "element_id": element_id, "value": value, "is_finished": entry["is_finished"]}
+
+    def make_step(self, goal, url, distilled_dom, action_dict, previous=None):
+        """
+        Converts one taken step into a cache record (call commit() with the list once the task succeeds).
+        Returns None if the step can't be expressed independently of this page's ids, finishes the task,
+        or carries a value that isn't one of the goal's slots. The page structure in the key says nothing
+        about its content, so answers and literal values must come from the model every time.
+        """
+        if action_dict.get("is_finished", False):
+            return None
+        template, slots = normalize_goal(goal)
+        element_id = str(action_dict.get("element_id", "0"))
+
+        descriptor = None
+        if element_id != "0":
+            found = [desc for eid, _, desc in parse_elements(distilled_dom) if eid == element_id]
+            if not found:
+                return None
+            descriptor = found[0]
+
+        value = action_dict.get("value", "")
+        if value:
+            if value not in slots:
+                return None
+            # Store the goal slot, not the literal, so "{0}" is typed for a different city next time
+            value = {"slot": slots.index(value)}
+
+        return {
+            "key": self._key(template, url, distilled_dom, previous),
+            "action": str(action_dict.get("action", "")).lower(),
+            "descriptor": descriptor,
+            "value": value,
+            "is_finished": False,
+        }
+
+    def commit(self, steps):
+        """Stores the steps of a successful trajectory."""
+        with self._lock:
+            for step in steps:
+                if step is None:
+                    continue
+                key = step["key"]
+                entry = self._entries.get(key)
+                if entry and (entry["action"], entry["descriptor"], entry["value"]) == (step["action"], step["descriptor"], step["value"]):
+                    entry["successes"] += 1
+                else:
+                    # New state, or a later success disagrees with the old one: the latest wins
+                    self._entries[key] = {k: step[k] for k in ("action", "descriptor", "value", "is_finished")}
+                    self._entries[key]["successes"] = 1
+                self._entries.move_to_end(key)
+
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats["evictions"] += 1
+
+    def invalidate(self, key):
+        """Drops an entry whose action failed when replayed."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.stats["rejected"] += 1
+                metrics.counter("groundhog_workflow_cache_total", "Workflow cache lookups by result").inc(result="rejected")
+
+    def __len__(self):
+        return len(self._entries)
+
+    def report(self):
+        lookups = max(self.stats["lookups"], 1)
+        return dict(self.stats, entries=len(self._entries), hit_rate=round(self.stats["hits"] / lookups, 4),
+                    model_calls_saved=self.stats["hits"] - self.stats["rejected"])
+
+    def save(self, path=None):
+        path = path or self.path
+        with self._lock:
+            data = list(self._entries.items())
+        with open(path, "w") as f:
+            json.dump(data, f)
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            for key, entry in data[-self.max_entries:]:
+                self._entries[key] = entry
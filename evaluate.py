@@ -0,0 +1,52 @@
+import argparse
+import sys
+import os
+import json
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.processor import Processor
+from core.evaluation import Evaluator, load_records
+
+def main():
+    parser = argparse.ArgumentParser(description="Groundhog: offline step-accuracy evaluation on processed Mind2Web JSONL")
+    parser.add_argument("--data", type=str, required=True, help="Processed JSONL (annotation_id, action_uid, prompt, label)")
+    parser.add_argument("--images", type=str, required=True, help="Directory of screenshots named <annotation_id>.jpeg")
+    parser.add_argument("--model-id", type=str, default="shivamg05/groundhog-v1", help="Model ID or path")
+    parser.add_argument("--adapter", type=str, default=None, help="Optional LoRA adapter path")
+    parser.add_argument("--attention", choices=["auto", "flash_attention_2", "sdpa", "eager"], default="auto", help="Attention kernel")
+    parser.add_argument("--kv-cache", choices=["full", "quantized"], default="full", help="KV cache layout for generation")
+    parser.add_argument("--memory-budget-mb", type=float, default=None, help="GPU memory budget; batches that would exceed it are split")
+    parser.add_argument("--memo-dir", type=str, default=None, help="Reuse outputs for examples already evaluated with the same model (on-disk memo)")
+    parser.add_argument("--limit", type=int, default=None, help="Only evaluate the first N records")
+    parser.add_argument("--batch-size", type=int, default=4, help="Examples per generate() call")
+    parser.add_argument("--workers", type=int, default=4, help="Image loading threads")
+    parser.add_argument("--prefetch", type=int, default=2, help="Batches staged ahead of the model")
+    parser.add_argument("--output", type=str, default=None, help="Write per-example predictions to this JSONL")
+    parser.add_argument("--summary", type=str, default=None, help="Write the summary metrics to this JSON file")
+    args = parser.parse_args()
+
+    records = load_records(args.data, args.limit)
+    print(f"\n📏 Evaluating {len(records)} examples from {args.data}")
+
+    from core.model import ModelEngine
+    model = ModelEngine(model_id=args.model_id, adapter_path=args.adapter, attention=args.attention,
+                        kv_cache=args.kv_cache, memory_budget_mb=args.memory_budget_mb)
+    if args.memo_dir:
+        from core.memo import InferenceMemo, MemoizedModel
+        model = MemoizedModel(model, InferenceMemo(disk_dir=args.memo_dir, disk_mb=1024))
+
+    evaluator = Evaluator(model, Processor(), batch_size=args.batch_size, workers=args.workers, prefetch_batches=args.prefetch)
+    summary = evaluator.evaluate(records, args.images, output_path=args.output)
+
+    print("\n" + "="*40)
+    for key, value in summary.items():
+        print(f"   {key:<24} {value}")
+
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
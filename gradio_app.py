@@ -3,6 +3,9 @@ import sys
 import os
 import signal
 import gc
+import time
+import hashlib
+import threading
 import torch
 
 # Ensure core modules are found
@@ -11,14 +14,101 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from core.browser import Browser
 from core.processor import Processor
 from core.controller import AgentController
+from core.sessions import SessionScheduler, SessionRejected, GatedModel
+from core.profiles import ProfileManager
+from core.memo import InferenceMemo, MemoizedModel
+from core.prefetch import Prefetcher
+from core.resources import ResourceManager
+
+# Live view transport: frames are sent only when the page changed, at most FRAME_FPS per second,
+# downscaled to FRAME_WIDTH and compressed as FRAME_FORMAT
+FRAME_FORMAT = os.environ.get("GROUNDHOG_FRAME_FORMAT", "webp")
+FRAME_FPS = float(os.environ.get("GROUNDHOG_FRAME_FPS", "2"))
+FRAME_WIDTH = int(os.environ.get("GROUNDHOG_FRAME_WIDTH", "768"))
+
+# Admission control: live browsers, concurrent generate() calls, queue length and per-session quotas
+MAX_SESSIONS = int(os.environ.get("GROUNDHOG_MAX_SESSIONS", "2"))
+MAX_MODEL_CALLS = int(os.environ.get("GROUNDHOG_MAX_MODEL_CALLS", "1"))
+MAX_QUEUE = int(os.environ.get("GROUNDHOG_MAX_QUEUE", "20"))
+SESSION_STEPS = int(os.environ.get("GROUNDHOG_SESSION_STEPS", "15"))
+SESSION_SECONDS = float(os.environ.get("GROUNDHOG_SESSION_SECONDS", "600"))
+
+# Model memory mode: attention kernel, KV cache layout and a GPU budget that admits calls by estimated size.
+# With a budget set, GROUNDHOG_MAX_MODEL_CALLS can be raised and memory decides how many calls overlap
+# (calls on the same adapter overlap; sessions on different adapters take turns).
+ATTENTION = os.environ.get("GROUNDHOG_ATTENTION", "auto")
+KV_CACHE = os.environ.get("GROUNDHOG_KV_CACHE", "full")
+MEMORY_BUDGET_MB = float(os.environ["GROUNDHOG_MEMORY_BUDGET_MB"]) if os.environ.get("GROUNDHOG_MEMORY_BUDGET_MB") else None
+
+# Exact-match memo of model outputs (in memory, plus on disk if a directory is given); hits skip the model gate
+MEMO = os.environ.get("GROUNDHOG_MEMO", "0") == "1"
+MEMO_DIR = os.environ.get("GROUNDHOG_MEMO_DIR")
+inference_memo = InferenceMemo(disk_dir=MEMO_DIR) if MEMO or MEMO_DIR else None
+
+# Links prefetched per step while the model thinks (0 = off), capped at GROUNDHOG_PREFETCH_MB per session
+PREFETCH_LINKS = int(os.environ.get("GROUNDHOG_PREFETCH", "0"))
+prefetcher = Prefetcher(max_links=PREFETCH_LINKS, max_mb=float(os.environ.get("GROUNDHOG_PREFETCH_MB", "8"))) if PREFETCH_LINKS > 0 else None
+
+# LoRA adapters served on top of the shared model, "name=path,name=path"; picked per session in the UI
+ADAPTERS = dict(spec.split("=", 1) for spec in os.environ.get("GROUNDHOG_ADAPTERS", "").split(",") if "=" in spec)
+
+# Persistent Chrome profiles: sessions reuse a warm HTTP cache, but never each other's cookies
+PROFILE_DIR = os.environ.get("GROUNDHOG_PROFILE_DIR")
+profiles = ProfileManager(PROFILE_DIR, template=os.environ.get("GROUNDHOG_PROFILE_TEMPLATE")) if PROFILE_DIR else None
+
+# Memory budgets, checked after every step. Each session's browser is quit when the session ends, so there is
+# no task count to recycle on; a browser over GROUNDHOG_MAX_BROWSER_MB ends its session early instead.
+resources = ResourceManager(
+    max_tasks_per_browser=None,
+    max_browser_mb=float(os.environ.get("GROUNDHOG_MAX_BROWSER_MB", "2048")),
+    max_python_mb=float(os.environ["GROUNDHOG_MAX_AGENT_MB"]) if os.environ.get("GROUNDHOG_MAX_AGENT_MB") else None
+)
+
+scheduler = SessionScheduler(
+    max_sessions=MAX_SESSIONS, max_queue=MAX_QUEUE, max_steps=SESSION_STEPS, max_session_s=SESSION_SECONDS
+)
+model_lock = threading.Lock()
+
+class FrameThrottle:
+    """Decides which screenshots are worth shipping to the browser."""
+    def __init__(self, fps=FRAME_FPS, width=FRAME_WIDTH):
+        self.min_interval = 1.0 / fps if fps > 0 else 0.0
+        self.width = width
+        self.last_sent = 0.0
+        self.last_digest = None
+        self.pending = None
+
+    def offer(self, image):
+        """Queues a frame unless it looks identical to the last one sent."""
+        if image is None:
+            return
+        # A 32x32 thumbnail is enough to tell "same page" from "page changed"
+        digest = hashlib.md5(image.resize((32, 32)).tobytes()).digest()
+        if digest != self.last_digest:
+            self.pending = (image, digest)
+
+    def take(self, force=False):
+        """Returns the frame to send now, or None if nothing changed or it is too soon."""
+        if self.pending is None:
+            return None
+        now = time.monotonic()
+        if not force and now - self.last_sent < self.min_interval:
+            return None
+        image, self.last_digest = self.pending
+        self.pending = None
+        self.last_sent = now
+        if self.width and image.size[0] > self.width:
+            image = image.resize((self.width, round(image.size[1] * self.width / image.size[0])))
+        return image
 
 def shutdown_system():
     """
     Unloads model, clears cache, and kills the Colab/Python process.
     """
     print("Shutting down...")
-    if 'model_engine' in globals():
-        del globals()['model_engine']
+    for name in ('shared_model', 'model_engine'):
+        if name in globals():
+            del globals()[name]
     if torch.cuda.is_available():
         torch.cuda.empty_cache()
     gc.collect()
@@ -36,68 +126,97 @@ def stop_task_action():
         gr.update(interactive=False)                    # Disable Stop
     )
 
-def run_agent_interactive(goal, url):
+def get_model():
+    """
+    Loads the shared model once, however many sessions ask for it at the same time.
+    Every session gets the same gated wrapper, so GROUNDHOG_MAX_MODEL_CALLS holds across sessions.
+    """
+    global model_engine, shared_model
+    with model_lock:
+        if 'model_engine' not in globals():
+            from core.model import ModelEngine
+            model_engine = ModelEngine(model_id="shivamg05/groundhog-v1", adapter_path=None, adapters=ADAPTERS,
+                                       attention=ATTENTION, kv_cache=KV_CACHE, memory_budget_mb=MEMORY_BUDGET_MB)
+        if 'shared_model' not in globals():
+            gated = GatedModel(model_engine, max_concurrent=MAX_MODEL_CALLS)
+            shared_model = MemoizedModel(gated, inference_memo) if inference_memo is not None else gated
+        return shared_model
+
+def run_agent_interactive(goal, url, adapter=None):
     """
     This function drives the Gradio UI.
     Yields: (Image, Log, Run_Button_Update, Stop_Button_Update)
+    Everything here is per call, so sessions share only the model and the scheduler.
     """
-    # LOADING
-    yield (
-        None, 
-        "Initializing System...", 
-        gr.update(value="Model Loading...", interactive=False), 
-        gr.update(interactive=True) 
-    )
+    idle = (gr.update(value="Run Agent", interactive=True), gr.update(interactive=False))
+    busy = (gr.update(value="Task Running...", interactive=False), gr.update(interactive=True))
 
-    # Init Model
     try:
-        from core.model import ModelEngine
-        if 'model_engine' not in globals():
-            global model_engine
-            model_engine = ModelEngine(model_id="shivamg05/groundhog-v1", adapter_path=None)
-    except Exception as e:
-        yield (
-            None, 
-            f"❌ Error loading model: {e}", 
-            gr.update(value="Run Agent", interactive=True), 
-            gr.update(interactive=False)
-        )
+        ticket = scheduler.enqueue()
+    except SessionRejected:
+        yield (None, "🚦 Server is at capacity, please try again in a few minutes.", *idle)
         return
 
-    # RUNNING
-    yield (
-        None, 
-        "Model Loaded. Launching Browser...", 
-        gr.update(value="Task Running...", interactive=False), 
-        gr.update(interactive=True)
-    )
-
     browser = None
-    
+    # Stop and disconnects close this generator, which runs the finally block below
     try:
-        browser = Browser(headless=True)
-        processor = Processor()
-        agent = AgentController(browser, processor, model_engine)
-
-        # Loop through generator
-        for update in agent.run_task_generator(goal, url):
+        while not scheduler.wait(ticket, timeout=1.0):
             yield (
-                update["screenshot"], 
-                update["log"], 
-                gr.update(value="Task Running...", interactive=False), 
+                gr.skip(),
+                f"⏳ Waiting for a free agent: position {scheduler.position(ticket)}, ETA ~{scheduler.eta(ticket):.0f}s",
+                gr.update(value="Queued...", interactive=False),
                 gr.update(interactive=True)
             )
+
+        # LOADING
+        yield (None, "Initializing System...", gr.update(value="Model Loading...", interactive=False), gr.update(interactive=True))
+
+        # Init Model
+        try:
+            model = get_model()
+        except Exception as e:
+            yield (None, f"❌ Error loading model: {e}", *idle)
+            return
+
+        # RUNNING
+        yield (None, "Model Loaded. Launching Browser...", *busy)
+
+        browser = Browser(headless=True, profiles=profiles)
+        processor = Processor()
+        agent = AgentController(browser, processor, model, adapter=adapter, prefetcher=prefetcher)
+
+        # Events carry only new lines and new frames. The log is appended to one growing
+        # string (Gradio streams the diff), and the image is left untouched unless a frame is due.
+        frames = FrameThrottle()
+        log_text = ""
+        for event in agent.run_task_events(goal, url, max_steps=scheduler.max_steps):
+            if event["lines"]:
+                log_text += ("\n" if log_text else "") + "\n".join(event["lines"])
+            frames.offer(event["screenshot"])
+            frame = frames.take(force=event["done"])
+
+            if not event["done"] and scheduler.expired(ticket):
+                log_text += f"\n⌛ Session time limit ({scheduler.max_session_s:.0f}s) reached."
+                frame = frames.take(force=True)
+                yield (frame if frame is not None else gr.skip(), log_text, *idle)
+                return
+
+            # Once per step: with no psutil every sample walks /proc
+            if event["type"] == "observation" and resources.check(browser, worker=f"session-{ticket.id}"):
+                log_text += f"\n🧯 The browser went over its memory budget ({resources.max_browser_mb:.0f} MB), session ended."
+                frame = frames.take(force=True)
+                yield (frame if frame is not None else gr.skip(), log_text, *idle)
+                return
+
+            yield (frame if frame is not None else gr.skip(), log_text, *(idle if event["done"] else busy))
             
     except Exception as e:
-        yield (
-            None, 
-            f"💥 Error: {e}", 
-            gr.update(value="Run Agent", interactive=True), 
-            gr.update(interactive=False)
-        )
+        yield (None, f"💥 Error: {e}", *idle)
     finally:
         if browser:
             browser.quit()
+            resources.forget(browser, worker=f"session-{ticket.id}")
+        scheduler.release(ticket)
         
 # --- BUILD UI ---
 with gr.Blocks(title="🦫 Groundhog Agent") as demo:
@@ -106,6 +225,7 @@ with gr.Blocks(title="🦫 Groundhog Agent") as demo:
     with gr.Row():
         goal_input = gr.Textbox(label="Goal", placeholder="Find the cheapest laptop and add it to cart", scale=2)
         url_input = gr.Textbox(label="Starting URL", placeholder="https://www.bestbuy.com/home", scale=1)
+        adapter_input = gr.Dropdown(label="Adapter", choices=["base"] + list(ADAPTERS), value="base", visible=bool(ADAPTERS), scale=1)
     
     with gr.Row():
         run_btn = gr.Button("Run Agent", variant="primary", scale=2)
@@ -113,7 +233,7 @@ with gr.Blocks(title="🦫 Groundhog Agent") as demo:
         stop_btn = gr.Button("⏹️ Stop Task", variant="stop", scale=1, interactive=False)
     
     with gr.Row():
-        browser_view = gr.Image(label="Live Browser View", type="pil")
+        browser_view = gr.Image(label="Live Browser View", type="pil", format=FRAME_FORMAT)
         log_output = gr.Textbox(label="Agent Thought Process", lines=20, autoscroll=True)
 
     with gr.Row():
@@ -122,10 +242,12 @@ with gr.Blocks(title="🦫 Groundhog Agent") as demo:
     # EVENTS
     
     # Run Event
+    # Gradio's own per-event limit would hide our queue, so let every waiter in and let the scheduler admit them
     run_event = run_btn.click(
         fn=run_agent_interactive,
-        inputs=[goal_input, url_input],
-        outputs=[browser_view, log_output, run_btn, stop_btn]
+        inputs=[goal_input, url_input, adapter_input],
+        outputs=[browser_view, log_output, run_btn, stop_btn],
+        concurrency_limit=MAX_SESSIONS + MAX_QUEUE
     )
 
     # Stop Task Event
@@ -0,0 +1,57 @@
+import argparse
+import sys
+import os
+import random
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.evaluation import load_records
+from core.lengths import build_length_index, save_length_index, LengthGroupedSampler, padding_stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Groundhog: exact token lengths for training data + padding report")
+    parser.add_argument("--data", type=str, required=True, help="Processed JSONL (prompt, label, annotation_id / image)")
+    parser.add_argument("--images", type=str, required=True, help="Directory the screenshots are resolved against")
+    parser.add_argument("--model-id", type=str, default="Qwen/Qwen2.5-VL-7B-Instruct", help="Processor to count tokens with")
+    parser.add_argument("--output", type=str, default=None, help="Index path (default: <data>.lengths.json)")
+    parser.add_argument("--tokenize-batch", type=int, default=256, help="Prompts per fast-tokenizer call")
+    parser.add_argument("--batch-size", type=int, default=4, help="Training batch size to report padding for")
+    parser.add_argument("--max-tokens", type=int, default=8192, help="Report examples longer than this")
+    args = parser.parse_args()
+
+    records = load_records(args.data)
+    print(f"\n📐 Counting tokens for {len(records)} examples from {args.data}")
+
+    from transformers import AutoProcessor
+    processor = AutoProcessor.from_pretrained(args.model_id, trust_remote_code=True)
+
+    index = build_length_index(records, args.images, processor, batch_size=args.tokenize_batch)
+    output = args.output or args.data + ".lengths.json"
+    save_length_index(index, output, data=os.path.abspath(args.data), model_id=args.model_id)
+
+    lengths = index["total_tokens"]
+    over = sum(1 for n in lengths if n > args.max_tokens)
+
+    # Padding if batches were drawn at random vs grouped by length
+    order = list(range(len(lengths)))
+    random.Random(0).shuffle(order)
+    shuffled = [order[i:i + args.batch_size] for i in range(0, len(order), args.batch_size)]
+    grouped = LengthGroupedSampler(lengths, args.batch_size).batches()
+
+    report = {
+        "examples": len(lengths),
+        "max_tokens": max(lengths, default=0),
+        "mean_tokens": round(sum(lengths) / len(lengths), 1) if lengths else 0,
+        f"over_{args.max_tokens}": over,
+        "padding_waste_random": padding_stats(shuffled, lengths)["padding_waste"],
+        "padding_waste_grouped": padding_stats(grouped, lengths)["padding_waste"],
+    }
+
+    print("\n" + "="*40)
+    for key, value in report.items():
+        print(f"   {key:<24} {value}")
+    print(f"\nIndex written to {output}")
+
+if __name__ == "__main__":
+    main()
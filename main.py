@@ -9,18 +9,87 @@ sys.path.append(current_dir)
 from core.browser import Browser
 from core.processor import Processor
 from core.controller import AgentController
+from core import telemetry
+from core.recorder import TrajectoryRecorder, ReplayBrowser, ReplayModel
+from core.workflow_cache import WorkflowCache
 
 def main():
     # 1. Parse Arguments
     parser = argparse.ArgumentParser(description="Groundhog: Autonomous Web Agent")
-    parser.add_argument("--goal", type=str, required=True, help="The natural language task you want to achieve")
-    parser.add_argument("--url", type=str, required=True, help="The starting URL")
+    parser.add_argument("--goal", type=str, help="The natural language task you want to achieve")
+    parser.add_argument("--url", type=str, help="The starting URL")
     parser.add_argument("--steps", type=int, default=15, help="Max steps to execute")
+    parser.add_argument("--jump-scroll", action="store_true", help="When the target is off screen, jump to the element that best matches the goal instead of scrolling one page")
+    parser.add_argument("--candidates", type=int, default=1, help="Candidate actions per step from one beam search; invalid ones fall through to the next")
     parser.add_argument("--headless", action="store_true", help="Run browser in headless mode (no visible window)")
     parser.add_argument("--auto-close", action="store_true", help="Close browser immediately after task ends")
+    parser.add_argument("--observation", choices=["viewport", "layout"], default="viewport",
+                        help="'layout' captures each page once and serves scroll steps from memory until the DOM changes")
+
+    # Browser profile / HTTP cache
+    parser.add_argument("--profile-dir", type=str, help="Keep Chrome profiles (and their HTTP cache) under this directory across tasks and runs")
+    parser.add_argument("--profile-template", type=str, help="Warmed Chrome user-data-dir to seed new profiles from (with --profile-dir)")
+    parser.add_argument("--cache-mb", type=int, default=512, help="Disk cache size per profile in MB (with --profile-dir)")
+    parser.add_argument("--prefetch", type=int, default=0, help="Prefetch this many goal-matching links per step while the model thinks (0 = off)")
+    parser.add_argument("--prefetch-mb", type=float, default=8, help="Cap on prefetched bytes per task in MB (with --prefetch)")
+    parser.add_argument("--share-storage", action="store_true", help="Keep cookies and site storage between tasks too (default: only the cache is kept)")
+
+    # Model
+    parser.add_argument("--model-id", type=str, default="Qwen/Qwen2.5-VL-7B-Instruct", help="Base model ID or path")
+    parser.add_argument("--adapter", action="append", default=[], metavar="NAME=PATH",
+                        help="Register a LoRA adapter on the shared base model (repeatable)")
+    parser.add_argument("--use-adapter", type=str, help="Adapter to predict with (default: the base model); batch tasks may override it with an 'adapter' field")
+    parser.add_argument("--attention", choices=["auto", "flash_attention_2", "sdpa", "eager"], default="auto",
+                        help="Attention kernel (auto: FlashAttention-2 if installed, else SDPA)")
+    parser.add_argument("--kv-cache", choices=["full", "quantized"], default="full", help="Quantize the KV cache of greedy calls (needs optimum-quanto or hqq)")
+    parser.add_argument("--kv-bits", type=int, choices=[2, 4], default=4, help="Bits per element of the quantized KV cache")
+    parser.add_argument("--memo", action="store_true", help="Answer repeated (screenshot, prompt) pairs from memory instead of the model")
+    parser.add_argument("--memo-dir", type=str, help="Also keep memoized outputs on disk here, shared across runs (implies --memo)")
+    parser.add_argument("--memo-mb", type=float, default=256, help="Size cap of the on-disk memo in MB")
+    parser.add_argument("--memory-budget-mb", type=float, help="GPU memory the model may use, weights included; oversized requests are downsized or rejected instead of running out of memory")
+
+    # Batch mode
+    parser.add_argument("--tasks", type=str, help="JSONL file of tasks ({goal, url[, id, max_steps, timeout, adapter]}) to run in batch mode")
+    parser.add_argument("--results", type=str, default="results.jsonl", help="JSONL file to append batch results to (also used to resume)")
+    parser.add_argument("--workers", type=int, default=4, help="Number of parallel browser workers in batch mode")
+    parser.add_argument("--task-timeout", type=float, default=300, help="Per-task wall-clock limit in seconds (batch mode)")
+    parser.add_argument("--recycle-after", type=int, default=50, help="Restart a worker's Chrome after this many tasks (batch mode, 0 = never)")
+    parser.add_argument("--recycle-browser-mb", type=float, default=2048, help="Restart a worker's Chrome once it uses more memory than this (batch mode, 0 = never)")
+    parser.add_argument("--max-agent-mb", type=float, help="Force garbage collection when the agent process grows past this (batch mode)")
+
+    # Recording / replay
+    parser.add_argument("--record", type=str, help="Save every step (HTML, screenshot, prompt, output, action) under this directory")
+    parser.add_argument("--replay", type=str, help="Replay a recorded trajectory directory offline instead of using a live browser")
+    parser.add_argument("--replay-outputs", action="store_true", help="With --replay, also reuse the recorded model outputs (no GPU needed)")
+
+    # Workflow cache
+    parser.add_argument("--workflow-cache", type=str, help="JSON file of learned action sequences to replay for recurring goals (created if missing)")
+
+    # Telemetry
+    parser.add_argument("--trace", type=str, help="Write per-stage trace spans as JSON lines to this file")
+    parser.add_argument("--chrome-trace", type=str, help="Write a Chrome trace (chrome://tracing, Perfetto) to this file on exit")
+    parser.add_argument("--metrics-port", type=int, help="Serve Prometheus metrics on this port")
 
     args = parser.parse_args()
 
+    if not args.tasks and not args.replay and (not args.goal or not args.url):
+        parser.error("--goal and --url are required unless --tasks or --replay is given")
+    if any("=" not in spec for spec in args.adapter):
+        parser.error("--adapter takes NAME=PATH")
+
+    telemetry.configure(args.trace, args.chrome_trace, args.metrics_port)
+    try:
+        if args.tasks:
+            run_batch(args)
+        elif args.replay:
+            run_replay(args)
+        else:
+            run_single(args)
+    finally:
+        telemetry.tracer.shutdown()
+
+def run_single(args):
+    """Runs one --goal/--url task interactively."""
     print(f"\n🐹 Initializing Groundhog Agent...")
     print(f"   Goal: {args.goal}")
     print(f"   URL:  {args.url}")
@@ -30,7 +99,7 @@ def main():
     try:
         # 2. Init Body (Browser)
         print("   [1/3] Launching Browser...")
-        browser = Browser(headless=args.headless)
+        browser = Browser(headless=args.headless, observation=args.observation, profiles=make_profiles(args))
 
         # 3. Init Eyes (Processor)
         print("   [2/3] Initializing Processor...")
@@ -40,8 +109,7 @@ def main():
         # NOTE: This requires CUDA/NVIDIA GPU for the 4-bit config in core/model.py
         print("   [3/3] Loading Model (this will take a moment)...")
         try:
-            from core.model import ModelEngine
-            model = ModelEngine() 
+            model = load_model(args)
         except Exception as e:
             print(f"\n❌ CRITICAL MODEL ERROR: {e}")
             print("   -> If you are on a Mac, 4-bit quantization (BitsAndBytes) is not supported.")
@@ -49,14 +117,24 @@ def main():
             return
 
         # 5. Init Controller
-        agent = AgentController(browser, processor, model)
+        recorder = TrajectoryRecorder(args.record) if args.record else None
+        workflow_cache = WorkflowCache(path=args.workflow_cache) if args.workflow_cache else None
+        prefetcher = make_prefetcher(args)
+        agent = AgentController(browser, processor, model, recorder=recorder, workflow_cache=workflow_cache,
+                                num_candidates=args.candidates, jump_scroll=args.jump_scroll, prefetcher=prefetcher)
 
         # 6. Run the Loop
         start_time = time.time()
         success = agent.run_task(args.goal, args.url, args.steps)
         duration = time.time() - start_time
+        if workflow_cache is not None:
+            workflow_cache.save()
 
         print("\n" + "="*40)
+        if prefetcher is not None:
+            report = prefetcher.report()
+            print(f"🔮 Prefetch: {report['hits']}/{report['navigations']} navigations hit a prefetched page "
+                  f"(~{report['saved_s']}s of fetching saved, {report['bytes'] / 2**20:.1f} MB fetched)")
         if success:
             final_url = browser.driver.current_url
             print(f"✨ TASK COMPLETED in {duration:.2f}s")
@@ -87,5 +165,104 @@ def main():
             print("🔒 Closing browser...")
             browser.quit()
 
+def make_profiles(args):
+    """Persistent Chrome profiles if --profile-dir is set, else None (fresh profile per browser)."""
+    if not args.profile_dir:
+        return None
+    from core.profiles import ProfileManager
+    return ProfileManager(args.profile_dir, template=args.profile_template, cache_mb=args.cache_mb,
+                          isolate_storage=not args.share_storage)
+
+def make_prefetcher(args):
+    """Link prefetcher if --prefetch is set, else None."""
+    if args.prefetch <= 0:
+        return None
+    from core.prefetch import Prefetcher
+    return Prefetcher(max_links=args.prefetch, max_mb=args.prefetch_mb)
+
+def load_model(args):
+    """One quantized base model with every --adapter registered on it, memoized with --memo/--memo-dir."""
+    from core.model import ModelEngine
+    adapters = dict(spec.split("=", 1) for spec in args.adapter)
+    model = ModelEngine(model_id=args.model_id, adapters=adapters, default_adapter=args.use_adapter,
+                        attention=args.attention, kv_cache=args.kv_cache, kv_bits=args.kv_bits,
+                        memory_budget_mb=args.memory_budget_mb)
+    if args.memo or args.memo_dir:
+        from core.memo import InferenceMemo, MemoizedModel
+        model = MemoizedModel(model, InferenceMemo(disk_dir=args.memo_dir, disk_mb=args.memo_mb))
+    return model
+
+def run_replay(args):
+    """Re-runs a recorded trajectory with no browser or network, for deterministic benchmarking."""
+    browser = ReplayBrowser(args.replay)
+    goal = args.goal or browser.meta["goal"]
+    url = args.url or browser.meta["start_url"]
+
+    print(f"\n🐹 Replaying trajectory {args.replay}...")
+    print(f"   Goal: {goal}")
+    print(f"   Recorded outcome: {browser.meta.get('status')} after {len(browser.steps)} steps")
+
+    if args.replay_outputs:
+        model = ReplayModel(args.replay)
+    else:
+        try:
+            model = load_model(args)
+        except Exception as e:
+            print(f"\n❌ CRITICAL MODEL ERROR: {e}")
+            print("   -> Use --replay-outputs to replay the recorded model outputs instead.")
+            return
+
+    agent = AgentController(browser, Processor(), model)
+
+    start_time = time.time()
+    success = agent.run_task(goal, url, args.steps)
+    duration = time.time() - start_time
+
+    print("\n" + "="*40)
+    print(f"🔁 Replay {'succeeded' if success else 'did not finish'} in {duration:.2f}s")
+    print(f"   Actions diverging from the recording: {browser.divergences}")
+    if isinstance(model, ReplayModel):
+        print(f"   Prompts differing from the recording: {model.prompt_mismatches}/{model.calls}")
+
+def run_batch(args):
+    """Runs every task in args.tasks across parallel headless browsers sharing one model."""
+    from core.batch import BatchRunner
+    from core.resources import ResourceManager
+
+    print(f"\n🐹 Initializing Groundhog Batch Runner...")
+    print(f"   Tasks:   {args.tasks}")
+    print(f"   Results: {args.results}")
+    print(f"   Workers: {args.workers}")
+
+    try:
+        model = load_model(args)
+    except Exception as e:
+        print(f"\n❌ CRITICAL MODEL ERROR: {e}")
+        return
+
+    profiles = make_profiles(args)
+    runner = BatchRunner(
+        browser_factory=lambda: Browser(headless=True, observation=args.observation, profiles=profiles),
+        processor=Processor(),
+        model=model,
+        workers=args.workers,
+        max_steps=args.steps,
+        task_timeout=args.task_timeout,
+        record_dir=args.record,
+        workflow_cache=WorkflowCache(path=args.workflow_cache) if args.workflow_cache else None,
+        num_candidates=args.candidates,
+        jump_scroll=args.jump_scroll,
+        prefetcher=make_prefetcher(args),
+        resources=ResourceManager(args.recycle_after, args.recycle_browser_mb, args.max_agent_mb),
+    )
+
+    try:
+        runner.run(args.tasks, args.results)
+    except KeyboardInterrupt:
+        print("\n\n🛑 User stopped execution. Rerun the same command to resume.")
+    finally:
+        if runner.workflow_cache is not None:
+            runner.workflow_cache.save()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
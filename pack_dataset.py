@@ -0,0 +1,32 @@
+import argparse
+import sys
+import os
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.evaluation import load_records
+from core.packed import pack_records
+
+def main():
+    parser = argparse.ArgumentParser(description="Groundhog: pack processed JSONL + screenshots into memory-mapped shards")
+    parser.add_argument("--data", type=str, required=True, help="Processed JSONL (annotation_id, action_uid, prompt, label[, image])")
+    parser.add_argument("--images", type=str, required=True, help="Directory the screenshots are resolved against")
+    parser.add_argument("--output", type=str, required=True, help="Pack directory to write")
+    parser.add_argument("--shard-mb", type=int, default=1024, help="Maximum shard size in MB")
+    parser.add_argument("--jpeg-quality", type=int, help="Transcode non-JPEG screenshots to JPEG at this quality (1-95); default keeps the original bytes")
+    args = parser.parse_args()
+
+    records = load_records(args.data)
+    print(f"\n📦 Packing {len(records)} examples from {args.data}")
+    meta = pack_records(records, args.images, args.output, shard_bytes=args.shard_mb * 1024 * 1024,
+                        jpeg_quality=args.jpeg_quality)
+
+    print("\n" + "="*40)
+    for key, value in meta.items():
+        if key != "shards":
+            print(f"   {key:<24} {value}")
+    print(f"   {'shards':<24} {len(meta['shards'])}")
+
+if __name__ == "__main__":
+    main()
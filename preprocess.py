@@ -0,0 +1,40 @@
+import argparse
+import sys
+import os
+import json
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(current_dir)
+
+from core.dataset import preprocess
+
+def main():
+    parser = argparse.ArgumentParser(description="Groundhog: turn raw Mind2Web rows into training JSONL + screenshots")
+    parser.add_argument("--input", type=str, required=True, help="Multimodal-Mind2Web .parquet file (needs pyarrow) or JSONL with the same fields")
+    parser.add_argument("--output", type=str, required=True, help="Output directory for shard-*.jsonl and images/")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--shard-size", type=int, default=500, help="Examples per shard / unit of resumable work")
+    parser.add_argument("--keep-negatives", type=float, default=0.3, help="Fraction of 'target cut off' (ID 0) examples to keep")
+    parser.add_argument("--max-elements", type=int, default=200, help="Element cap per prompt (same as inference)")
+    parser.add_argument("--limit", type=int, default=None, help="Only process the first N rows")
+    args = parser.parse_args()
+
+    print(f"\n🧹 Preprocessing {args.input} -> {args.output}")
+    summary = preprocess(
+        args.input, args.output,
+        workers=args.workers,
+        shard_size=args.shard_size,
+        keep_negatives=args.keep_negatives,
+        max_elements=args.max_elements,
+        limit=args.limit,
+    )
+
+    print("\n" + "="*40)
+    for key, value in summary.items():
+        print(f"   {key:<24} {value}")
+
+    with open(os.path.join(args.output, "summary.json"), "w") as f:
+        json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
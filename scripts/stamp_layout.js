@@ -0,0 +1,61 @@
+// Layout-mode variant of stamp_page.js.
+// Stamps the same IDs and viewport visibility, and also records each element's page geometry
+// so Python can recompute visibility for any scroll position without coming back to the browser:
+//   data-m2w-y      top edge in page coordinates (px)
+//   data-m2w-h      height (px)
+//   data-m2w-shown  1 if the element is laid out, CSS-visible and horizontally in view
+// The four attributes are always set in this order, so they serialize next to each other.
+var idCounter = 1;
+var buffer = 200; // same slack as stamp_page.js
+
+var scrollY = window.scrollY || window.pageYOffset || 0;
+var windowHeight = (window.innerHeight || document.documentElement.clientHeight);
+var windowWidth = (window.innerWidth || document.documentElement.clientWidth);
+
+function isShown(el, rect) {
+    if (rect.width <= 0 || rect.height <= 0) return false;
+
+    var style = window.getComputedStyle(el);
+    if (style.visibility === 'hidden' || style.display === 'none' || style.opacity === '0') return false;
+
+    return (rect.left <= windowWidth + buffer) && ((rect.left + rect.width) >= -buffer);
+}
+
+document.querySelectorAll('*').forEach(function(el) {
+    el.setAttribute('data-m2w-id', idCounter++);
+
+    var rect = el.getBoundingClientRect();
+    var shown = isShown(el, rect);
+    var vertInView = (rect.top <= windowHeight + buffer) && ((rect.top + rect.height) >= -buffer);
+
+    el.setAttribute('data-m2w-visible', (shown && vertInView) ? 'true' : 'false');
+    el.setAttribute('data-m2w-y', Math.round(rect.top + scrollY));
+    el.setAttribute('data-m2w-h', Math.round(rect.height));
+    el.setAttribute('data-m2w-shown', shown ? '1' : '0');
+});
+
+// Count real DOM changes (not our own stamping or prefetch links) so Python can tell whether the layout is still current
+if (!window.__m2wObserver) {
+    window.__m2wMutations = 0;
+    var isPrefetchLink = function(node) {
+        return node.nodeType === 1 && node.hasAttribute('data-m2w-prefetch');
+    };
+    window.__m2wObserver = new MutationObserver(function(records) {
+        records.forEach(function(r) {
+            if (r.type === 'attributes' && r.attributeName && r.attributeName.indexOf('data-m2w-') === 0) return;
+            if (r.type === 'childList' && Array.prototype.every.call(r.addedNodes, isPrefetchLink)
+                && Array.prototype.every.call(r.removedNodes, isPrefetchLink)) return;
+            window.__m2wMutations++;
+        });
+    });
+    window.__m2wObserver.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+}
+
+return {
+    maxId: idCounter,
+    scrollY: Math.round(scrollY),
+    viewportWidth: windowWidth,
+    viewportHeight: windowHeight,
+    pageHeight: Math.max(document.documentElement.scrollHeight, document.body ? document.body.scrollHeight : 0),
+    mutations: window.__m2wMutations
+};
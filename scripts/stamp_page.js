@@ -23,6 +23,10 @@ function isElementInViewport(el) {
     return (vertInView && horInView);
 }
 
+// Same tags/roles Processor.distill_dom keeps
+var INTERACTIVE_SELECTOR = 'a, button, input, select, textarea, option, label, li, summary, [role]';
+var scrollY = window.scrollY || window.pageYOffset || 0;
+
 var allElements = document.querySelectorAll('*');
 
 allElements.forEach(function(el) {
@@ -35,6 +39,14 @@ allElements.forEach(function(el) {
         el.setAttribute('data-m2w-visible', 'true');
     } else {
         el.setAttribute('data-m2w-visible', 'false');
+
+        // 3. Remember where off-screen controls are, so the agent can jump to them instead of scrolling blindly
+        var rect = el.matches(INTERACTIVE_SELECTOR) ? el.getBoundingClientRect() : null;
+        if (rect && rect.width > 0 && rect.height > 0) {
+            el.setAttribute('data-m2w-y', Math.round(rect.top + scrollY));
+        } else if (el.hasAttribute('data-m2w-y')) {
+            el.removeAttribute('data-m2w-y'); // stale position from an earlier stamping
+        }
     }
 });
 
@@ -0,0 +1,81 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import json
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.batch import BatchRunner, load_tasks, load_completed_ids
+
+class TestBatchRunner(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.tasks_path = os.path.join(self.tmp.name, "tasks.jsonl")
+        self.results_path = os.path.join(self.tmp.name, "results.jsonl")
+
+        with open(self.tasks_path, "w") as f:
+            f.write(json.dumps({"id": "a", "goal": "Find a laptop", "url": "http://a.test"}) + "\n")
+            f.write(json.dumps({"goal": "Find a phone", "url": "http://b.test"}) + "\n")
+            f.write(json.dumps({"id": "c", "goal": "Find a tablet", "url": "http://c.test"}) + "\n")
+
+        self.processor = MagicMock()
+        self.processor.distill_dom.return_value = "[1] <button>Submit</button>"
+        self.processor.format_prompt.return_value = "Mock Prompt"
+
+        self.model = MagicMock()
+        self.model.predict.return_value = json.dumps({
+            "action": "click", "element_id": "0", "value": "Done", "is_finished": True
+        })
+
+        self.browsers = []
+
+    def browser_factory(self):
+        browser = MagicMock()
+        browser.capture_state.return_value = (MagicMock(), "<html>Mock</html>")
+        self.browsers.append(browser)
+        return browser
+
+    def test_task_ids_are_stable(self):
+        print("--- Test generated task ids ---\n")
+        first = load_tasks(self.tasks_path)
+        second = load_tasks(self.tasks_path)
+        self.assertEqual([t["id"] for t in first], [t["id"] for t in second])
+        self.assertEqual(first[0]["id"], "a")
+
+    def test_runs_all_tasks_and_writes_results(self):
+        print("--- Test batch run ---\n")
+        runner = BatchRunner(self.browser_factory, self.processor, self.model, workers=2)
+        summary = runner.run(self.tasks_path, self.results_path)
+
+        with open(self.results_path) as f:
+            results = [json.loads(line) for line in f]
+
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(r["success"] for r in results))
+        self.assertTrue(all(r["steps"] == 1 for r in results))
+        self.assertEqual(summary["succeeded"], 3)
+        self.assertLessEqual(len(self.browsers), 2, "Workers should reuse their browser across tasks")
+        self.assertTrue(os.path.exists(self.results_path + ".summary.json"))
+
+    def test_resume_skips_completed(self):
+        print("--- Test batch resume ---\n")
+        with open(self.results_path, "w") as f:
+            f.write(json.dumps({"id": "a", "status": "success"}) + "\n")
+            f.write(json.dumps({"id": "c", "status": "error"}) + "\n")
+            f.write('{"id": "trunc')  # crash mid-write
+
+        self.assertEqual(load_completed_ids(self.results_path), {"a"})
+
+        runner = BatchRunner(self.browser_factory, self.processor, self.model, workers=2)
+        summary = runner.run(self.tasks_path, self.results_path)
+
+        self.assertEqual(summary["tasks"], 2)
+        self.assertEqual(self.model.predict.call_count, 2)
+
+if __name__ == "__main__":
+    unittest.main()
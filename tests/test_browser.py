@@ -154,5 +154,32 @@ class TestBrowserIntegration(unittest.TestCase):
         result = self.browser.execute_action("click", ghost_id)
         self.assertFalse(result, "Should catch NoSuchElementException")
 
+class TestLayoutPrefetch(unittest.TestCase):
+
+    def setUp(self):
+        from benchmarks import mock_sites
+        self.server, self.base_url = mock_sites.serve()
+        self.browser = Browser(headless=True, observation="layout")
+
+    def tearDown(self):
+        self.browser.quit()
+        self.server.shutdown()
+
+    def test_prefetch_keeps_layout_current(self):
+        print("\n--- Test: Prefetch Links In Layout Mode ---")
+        self.browser.navigate(self.base_url + "/listing/")
+        _, html = self.browser.capture_state()
+        soup = BeautifulSoup(html, "html.parser")
+        link_ids = [a["data-m2w-id"] for a in soup.select("a[data-m2w-id]")[:2]]
+
+        urls = self.browser.prefetch(link_ids)
+        self.assertEqual(len(urls), 2)
+        # Our own <link rel=prefetch> elements are not page changes, so the cached layout is still used
+        self.assertTrue(self.browser._layout_is_current())
+
+        # A real change still invalidates it
+        self.browser.driver.execute_script("document.body.appendChild(document.createElement('p'));")
+        self.assertFalse(self.browser._layout_is_current())
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
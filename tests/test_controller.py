@@ -1,14 +1,17 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, AsyncMock, patch
 import sys
 import os
 import json
+import time
+import asyncio
 
 # Add project root to sys.path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from core.controller import AgentController
+from core.controller import AgentController, AsyncAgentController
 from core.browser import Browser
+from core.offscreen import OffscreenIndex
 
 class TestAgentController(unittest.TestCase):
     
@@ -76,6 +79,27 @@ class TestAgentController(unittest.TestCase):
         self.mock_browser.execute_action.assert_not_called()
         self.mock_browser.scroll.assert_called_with("down")
 
+    def test_target_not_found_jump_scroll(self):
+        """
+        Scenario: Model predicts ID "0" and the goal matches an off-screen element.
+        Result: JUMP to it instead of scrolling one page.
+        """
+        print("--- Test jump scroll ---\n")
+        self.controller.jump_scroll = True
+        self.mock_processor.distill_dom_with_index.return_value = (
+            "[1] <button> Submit",
+            OffscreenIndex([("7", "a", "Checkout", "", 2400)]),
+        )
+        self.mock_model.predict.return_value = json.dumps({
+            "action": "click", "element_id": "0", "value": "", "is_finished": False
+        })
+
+        self.controller.run_task("Go to checkout", "http://test.com", max_steps=2)
+
+        # First ID 0 jumps to the match; the second has nothing new to jump to
+        self.mock_browser.scroll_to.assert_called_once_with(2250)
+        self.mock_browser.scroll.assert_called_once_with("down")
+
     def test_action_scroll_explicit(self):
         """
         Scenario: Model predicts action "scroll".
@@ -119,5 +143,129 @@ class TestAgentController(unittest.TestCase):
         self.assertTrue(success)
         self.assertEqual(self.mock_model.predict.call_count, 1)
 
+    def test_event_stream_deltas(self):
+        """
+        Scenario: One step that finishes the task.
+        Result: Each log line is sent once, and only the observation carries a frame.
+        """
+        print("--- Test step event stream ---\n")
+        self.mock_model.predict.return_value = json.dumps({
+            "action": "finish", "element_id": "0", "value": "Done", "is_finished": True
+        })
+
+        events = list(self.controller.run_task_events("Goal", "http://test.com", max_steps=2))
+
+        self.assertEqual([e["type"] for e in events], ["observation", "thinking", "result"])
+        self.assertIsNotNone(events[0]["screenshot"])
+        self.assertTrue(all(e["screenshot"] is None for e in events[1:]))
+        lines = [line for e in events for line in e["lines"]]
+        self.assertEqual(len(lines), len(set(lines)))
+        self.assertEqual(events[-1]["status"], "success")
+
+    # --- N-BEST CANDIDATES ---
+
+    def test_candidates_skip_hallucination(self):
+        """
+        Scenario: Best beam targets missing ID [99], runner-up targets visible [1].
+        Result: EXECUTE the runner-up without another model call.
+        """
+        print("--- Test candidate fall-through ---\n")
+        self.controller.num_candidates = 3
+        self.mock_model.predict_candidates.return_value = [
+            ('{"action": "click", "element_id": "99", "value": ""}', -0.1),
+            ('not json', -0.4),
+            ('{"action": "click", "element_id": "1", "value": ""}', -0.9),
+        ]
+
+        self.controller.run_task("Goal", "http://test.com", max_steps=1)
+
+        self.mock_model.predict.assert_not_called()
+        self.mock_browser.execute_action.assert_called_once_with("click", "1", "")
+
+    def test_candidates_fallback_on_failed_action(self):
+        """
+        Scenario: The chosen click fails in the browser.
+        Result: The next valid candidate is executed in the same step.
+        """
+        print("--- Test candidate fallback after failed action ---\n")
+        self.controller.num_candidates = 2
+        self.mock_processor.distill_dom.return_value = "[1] <button> Submit\n[2] <a> Next"
+        self.mock_model.predict_candidates.return_value = [
+            ('{"action": "click", "element_id": "1", "value": ""}', -0.1),
+            ('{"action": "click", "element_id": "2", "value": ""}', -0.3),
+        ]
+        self.mock_browser.execute_action.side_effect = [False, True]
+
+        self.controller.run_task("Goal", "http://test.com", max_steps=1)
+
+        self.assertEqual(self.mock_browser.execute_action.call_args_list[-1].args, ("click", "2", ""))
+        self.assertEqual(self.mock_model.predict_candidates.call_count, 1)
+
+class TestAsyncAgentController(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.mock_browser = MagicMock()
+        self.mock_processor = MagicMock()
+        self.mock_model = MagicMock()
+
+        self.mock_browser.capture_state.return_value = (MagicMock(), "<html>Mock</html>")
+        self.mock_processor.process_image.return_value = MagicMock()
+        self.mock_processor.distill_dom.return_value = "[1] <button>Submit</button>"
+        self.mock_processor.format_prompt.return_value = "Mock Prompt"
+
+        self.controller = AsyncAgentController(
+            self.mock_browser,
+            self.mock_processor,
+            self.mock_model
+        )
+
+        # Don't actually wait out the settle delays
+        sleep_patch = patch("core.controller.asyncio.sleep", new=AsyncMock())
+        sleep_patch.start()
+        self.addCleanup(sleep_patch.stop)
+        self.addCleanup(self.controller.close)
+
+    async def test_async_task_completion(self):
+        print("--- Test async goal completion ---\n")
+        self.mock_model.predict.return_value = json.dumps({
+            "action": "click", "element_id": "0", "value": "Done", "is_finished": True
+        })
+
+        success = await self.controller.run_task("Goal", "http://test.com", max_steps=5)
+        self.assertTrue(success)
+        self.assertEqual(self.mock_model.predict.call_count, 1)
+
+    async def test_async_happy_path_execution(self):
+        print("--- Test async happy path ---\n")
+        self.mock_processor.distill_dom.return_value = "[50] <input> Search"
+        self.mock_model.predict.return_value = json.dumps({
+            "action": "type", "element_id": "50", "value": "Groundhog", "is_finished": False
+        })
+
+        updates = [u async for u in self.controller.run_task_generator("Goal", "http://test.com", max_steps=1)]
+
+        self.mock_browser.execute_action.assert_called_with("type", "50", "Groundhog")
+        self.assertTrue(updates[-1]["done"])
+        self.assertFalse(updates[-1]["success"])
+
+    async def test_async_timeout(self):
+        print("--- Test async per-task timeout ---\n")
+        self.mock_model.predict.side_effect = lambda *args: time.sleep(0.5)
+
+        updates = [u async for u in self.controller.run_task_generator("Goal", "http://test.com", max_steps=5, timeout=0.1)]
+
+        self.assertTrue(updates[-1]["done"])
+        self.assertIn("timed out", updates[-1]["log"])
+
+    async def test_async_cancellation(self):
+        print("--- Test async cooperative cancel ---\n")
+        cancel_event = asyncio.Event()
+        cancel_event.set()
+
+        success = await self.controller.run_task("Goal", "http://test.com", max_steps=5, cancel_event=cancel_event)
+
+        self.assertFalse(success)
+        self.mock_model.predict.assert_not_called()
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,100 @@
+import unittest
+import sys
+import os
+import io
+import json
+import base64
+import tempfile
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.dataset import preprocess, process_example, shard_path, _stable_fraction
+from core.processor import Processor
+
+HTML = """
+<html><body>
+  <h1>Flights</h1>
+  <input backend_node_id="12" type="text" placeholder="From">
+  <button backend_node_id="13">Search</button>
+</body></html>
+"""
+
+def make_example(i, target_uid, screenshot):
+    return {
+        "annotation_id": f"task{i}",
+        "action_uid": f"a{i}",
+        "confirmed_task": f"Find flights number {i}",
+        "target_action_index": "1",
+        "action_reprs": ["[textbox] From -> TYPE: NYC", "[button] Search -> CLICK"],
+        "operation": json.dumps({"op": "CLICK", "value": ""}),
+        "pos_candidates": [json.dumps({"backend_node_id": target_uid})],
+        "cleaned_html": HTML,
+        "screenshot": screenshot,
+    }
+
+class TestDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.out_dir = os.path.join(self.tmp.name, "out")
+
+        Image.new("RGB", (1280, 2000), "white").save(os.path.join(self.tmp.name, "shot.png"))
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), "white").save(buffer, "PNG")
+        encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
+
+        self.input_path = os.path.join(self.tmp.name, "raw.jsonl")
+        with open(self.input_path, "w") as f:
+            for i in range(5):
+                f.write(json.dumps(make_example(i, "13", "shot.png" if i % 2 else encoded)) + "\n")
+
+    def test_example_matches_inference_prompt(self):
+        print("--- Test preprocessing uses the inference prompt ---\n")
+        os.makedirs(os.path.join(self.out_dir, "images"))
+        processor = Processor(id_attribute="backend_node_id", visibility_attribute=None)
+
+        record, skipped = process_example(processor, make_example(0, "13", "shot.png"), self.tmp.name, self.out_dir)
+
+        self.assertIsNone(skipped)
+        self.assertIn("[12] <input> (ph='From')", record["prompt"])
+        self.assertIn("[13] <button> Search", record["prompt"])
+        self.assertEqual(json.loads(record["label"]), {"action": "click", "element_id": "13", "value": "", "is_finished": True})
+        with Image.open(os.path.join(self.out_dir, record["image"])) as image:
+            self.assertEqual(image.size, (1024, 1280))
+
+    def test_missing_target_downsampled(self):
+        print("--- Test deterministic negative downsampling ---\n")
+        os.makedirs(os.path.join(self.out_dir, "images"))
+        processor = Processor(id_attribute="backend_node_id", visibility_attribute=None)
+        example = make_example(0, "99", "shot.png")
+
+        _, skipped = process_example(processor, example, self.tmp.name, self.out_dir, keep_negatives=0.0)
+        record, _ = process_example(processor, example, self.tmp.name, self.out_dir, keep_negatives=1.0)
+
+        self.assertEqual(skipped, "negative_dropped")
+        self.assertEqual(json.loads(record["label"])["element_id"], "0")
+        self.assertEqual(_stable_fraction("goal"), _stable_fraction("goal"))
+
+    def test_parallel_run_and_resume(self):
+        print("--- Test sharded, resumable preprocessing ---\n")
+        summary = preprocess(self.input_path, self.out_dir, workers=2, shard_size=2)
+
+        self.assertEqual(summary["shards"], 3)
+        self.assertEqual(summary["written"], 5)
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(len(os.listdir(os.path.join(self.out_dir, "images"))), 5)
+
+        # A finished shard is not redone; a lost one is
+        os.remove(shard_path(self.out_dir, 1))
+        first = os.path.getmtime(shard_path(self.out_dir, 0))
+        summary = preprocess(self.input_path, self.out_dir, workers=1, shard_size=2)
+
+        self.assertEqual(summary["written"], 5)
+        self.assertTrue(os.path.exists(shard_path(self.out_dir, 1)))
+        self.assertEqual(os.path.getmtime(shard_path(self.out_dir, 0)), first)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import json
+import tempfile
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.processor import Processor
+from core.evaluation import Evaluator, load_records
+
+class TestEvaluator(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.image_dir = os.path.join(self.tmp.name, "images")
+        os.makedirs(self.image_dir)
+
+        labels = [
+            {"action": "click", "element_id": "12", "value": "", "is_finished": False},
+            {"action": "type", "element_id": "7", "value": "New York", "is_finished": False},
+            {"action": "click", "element_id": "3", "value": "", "is_finished": True},
+            {"action": "click", "element_id": "0", "value": "", "is_finished": False},
+        ]
+        self.data_path = os.path.join(self.tmp.name, "data.jsonl")
+        with open(self.data_path, "w") as f:
+            for i, label in enumerate(labels):
+                f.write(json.dumps({"annotation_id": f"task{i}", "action_uid": f"a{i}", "prompt": f"prompt {i}", "label": json.dumps(label)}) + "\n")
+                if i != 3:  # last example has no screenshot
+                    Image.new("RGB", (1024, 768), "white").save(os.path.join(self.image_dir, f"task{i}.jpeg"))
+
+        outputs = {
+            "prompt 0": '{"action": "click", "element_id": "12", "value": "", "is_finished": false}',
+            "prompt 1": '```json\n{"action": "type", "element_id": "9", "value": "new york", "is_finished": false}\n```',
+            "prompt 2": 'I am not sure',
+        }
+        self.model = MagicMock()
+        self.model.predict_batch.side_effect = lambda images, prompts: [outputs[p] for p in prompts]
+
+    def test_metrics(self):
+        print("\n--- Testing Offline Evaluation ---")
+        records = load_records(self.data_path)
+        evaluator = Evaluator(self.model, Processor(), batch_size=2, workers=2)
+        output_path = os.path.join(self.tmp.name, "preds.jsonl")
+
+        summary = evaluator.evaluate(records, self.image_dir, output_path=output_path)
+
+        self.assertEqual(summary["examples"], 3)
+        self.assertEqual(summary["missing_images"], 1)
+        self.assertAlmostEqual(summary["element_accuracy"], 1 / 3, places=3)
+        self.assertAlmostEqual(summary["action_accuracy"], 2 / 3, places=3)
+        self.assertAlmostEqual(summary["parse_failure_rate"], 1 / 3, places=3)
+
+        # Batches are formed in record order, whatever order the loaders finish in
+        batches = [call.args[1] for call in self.model.predict_batch.call_args_list]
+        self.assertEqual(batches, [["prompt 0", "prompt 1"], ["prompt 2"]])
+
+        with open(output_path) as f:
+            preds = [json.loads(line) for line in f]
+        self.assertEqual([p["annotation_id"] for p in preds], ["task0", "task1", "task2"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import threading
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import gradio_app
+from core.sessions import GatedModel
+
+class TestGetModel(unittest.TestCase):
+
+    def setUp(self):
+        for name in ("shared_model", "model_engine"):
+            gradio_app.__dict__.pop(name, None)
+            self.addCleanup(gradio_app.__dict__.pop, name, None)
+
+    def test_sessions_share_one_gate(self):
+        print("--- Test one model gate across sessions ---\n")
+        models = []
+        with patch("core.model.ModelEngine", MagicMock()) as engine_cls:
+            callers = [threading.Thread(target=lambda: models.append(gradio_app.get_model())) for _ in range(2)]
+            for t in callers:
+                t.start()
+            for t in callers:
+                t.join()
+
+        self.assertEqual(engine_cls.call_count, 1)
+        self.assertIs(models[0], models[1])
+        gated = models[0].model if not isinstance(models[0], GatedModel) else models[0]
+        self.assertIsInstance(gated, GatedModel)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.layout import PageLayout
+from core.processor import Processor
+
+def element(uid, tag, text, y, h=40, shown=1):
+    # Attributes as stamp_layout.js serializes them (visibility as seen from the top of the page)
+    visible = "true" if shown and y <= 1000 + 200 else "false"
+    return (f'<{tag} data-m2w-id="{uid}" data-m2w-visible="{visible}" data-m2w-y="{y}" '
+            f'data-m2w-h="{h}" data-m2w-shown="{shown}">{text}</{tag}>')
+
+class TestPageLayout(unittest.TestCase):
+
+    def setUp(self):
+        html = "<html><body>" + "".join([
+            element(1, "button", "Top", 100),
+            element(2, "a", "Middle", 2000),
+            element(3, "a", "Bottom", 3600),
+            element(4, "button", "Hidden", 2000, shown=0),
+        ]) + "</body></html>"
+
+        # 2x device pixel ratio: 1000 CSS px wide viewport -> 2000 px screenshot
+        screenshot = Image.new("RGB", (2000, 8000), "white")
+        screenshot.paste((255, 0, 0), (0, 4000, 2000, 6000))  # page y 2000..3000 is red
+        self.layout = PageLayout(screenshot, html, 1000, 1000, 4000)
+        self.processor = Processor()
+
+    def test_tiles(self):
+        print("\n--- Testing Cached Layout Tiles ---")
+        shot, html = self.layout.tile(0)
+        self.assertEqual(shot.size, (2000, 2000))
+        dom = self.processor.distill_dom(html)
+        self.assertIn("[1] <button> Top", dom)
+        self.assertNotIn("Middle", dom)
+
+        shot, html = self.layout.tile(2000)
+        self.assertEqual(shot.getpixel((10, 10)), (255, 0, 0))
+        dom = self.processor.distill_dom(html)
+        self.assertIn("[2] <a> Middle", dom)
+        self.assertNotIn("Top", dom)
+        self.assertNotIn("Hidden", dom)
+
+    def test_bounds(self):
+        self.assertEqual(self.layout.clamp(10_000), 3000)
+        self.assertTrue(self.layout.covers(3000))
+        self.assertFalse(PageLayout(Image.new("RGB", (1000, 2000)), "", 1000, 1000, 4000).covers(1500))
+
+if __name__ == "__main__":
+    unittest.main()
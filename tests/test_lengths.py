@@ -0,0 +1,73 @@
+import unittest
+import sys
+import os
+import random
+import tempfile
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.lengths import image_token_count, build_length_index, LengthGroupedSampler, padding_stats, IMAGE_PAD
+
+class FakeProcessor:
+    """Whitespace 'tokenizer' with a Qwen-like chat template."""
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=False):
+        user, assistant = messages
+        return f"<user> {user['content'][0]['text']} {IMAGE_PAD} <assistant> {assistant['content'][0]['text']}"
+
+    def tokenizer(self, texts, add_special_tokens=False):
+        self.calls = getattr(self, "calls", 0) + 1
+        return {"input_ids": [text.split() for text in texts]}
+
+class TestLengths(unittest.TestCase):
+
+    def test_image_token_count(self):
+        print("--- Test Qwen2.5-VL image token count ---\n")
+        # 1024x1280 snaps to 1036x1288 -> 74x92 patches -> /4 merged
+        self.assertEqual(image_token_count(1024, 1280), 1702)
+        # Over the pixel budget: scaled down, never up
+        self.assertLessEqual(image_token_count(4000, 4000, max_pixels=1024 * 1024), 1024 * 1024 // (28 * 28))
+
+    def test_build_index_batched(self):
+        print("--- Test length index ---\n")
+        with tempfile.TemporaryDirectory() as tmp:
+            Image.new("RGB", (1024, 1280)).save(os.path.join(tmp, "task0.jpeg"))
+            records = [
+                {"annotation_id": "task0", "prompt": "one two three", "label": "{}"},
+                {"annotation_id": "missing", "prompt": "one", "label": "{}"},
+                {"annotation_id": "missing", "prompt": "one two", "label": "{}"},
+            ]
+            processor = FakeProcessor()
+
+            index = build_length_index(records, tmp, processor, batch_size=2)
+
+        # <user> + prompt + <assistant> + label, with the image placeholder swapped for its tokens
+        self.assertEqual(index["text_tokens"], [6, 4, 5])
+        self.assertEqual(index["image_tokens"], [1702, 0, 0])
+        self.assertEqual(index["total_tokens"], [1708, 4, 5])
+        self.assertEqual(processor.calls, 2)
+
+    def test_grouped_sampler_reduces_padding(self):
+        print("--- Test length-grouped batching ---\n")
+        rng = random.Random(0)
+        lengths = [rng.randint(1500, 8000) for _ in range(1000)]
+        sampler = LengthGroupedSampler(lengths, batch_size=4, mega_batch_mult=25)
+
+        batches = sampler.batches()
+        self.assertEqual(sorted(i for b in batches for i in b), list(range(1000)))
+        self.assertEqual(len(batches), len(sampler))
+        self.assertEqual(max(lengths[i] for i in batches[0]), max(lengths))
+
+        order = list(range(1000))
+        rng.shuffle(order)
+        shuffled = [order[i:i + 4] for i in range(0, 1000, 4)]
+        self.assertLess(padding_stats(batches, lengths)["padding_waste"], padding_stats(shuffled, lengths)["padding_waste"] / 4)
+
+        # Deterministic per epoch, different across epochs
+        self.assertEqual(batches, sampler.batches())
+        sampler.set_epoch(1)
+        self.assertNotEqual(batches, sampler.batches())
+
+if __name__ == "__main__":
+    unittest.main()
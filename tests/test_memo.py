@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import tempfile
+import threading
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.memo import InferenceMemo, MemoizedModel
+
+def fake_model():
+    model = MagicMock()
+    model.identity.side_effect = lambda adapter=None: f"qwen|{adapter or 'default'}"
+    model.predict.side_effect = lambda image, prompt, **kwargs: f"out:{prompt}"
+    model.predict_batch.side_effect = lambda images, prompts, **kwargs: [f"out:{p}" for p in prompts]
+    return model
+
+class TestInferenceMemo(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.white = Image.new("RGB", (64, 48), "white")
+        self.black = Image.new("RGB", (64, 48), "black")
+
+    def test_repeat_skips_model(self):
+        print("--- Test memoized predict ---\n")
+        model = fake_model()
+        memo = MemoizedModel(model, InferenceMemo())
+
+        self.assertEqual(memo.predict(self.white, "p"), "out:p")
+        self.assertEqual(memo.predict(self.white.copy(), "p"), "out:p")
+        self.assertEqual(model.predict.call_count, 1)
+
+        # Different pixels, prompt or adapter are different requests
+        memo.predict(self.black, "p")
+        memo.predict(self.white, "q")
+        memo.predict(self.white, "p", adapter="shop")
+        self.assertEqual(model.predict.call_count, 4)
+        self.assertEqual(memo.memo.report()["memory_hits"], 1)
+
+    def test_disk_tier_survives_restart(self):
+        print("--- Test on-disk memo ---\n")
+        model = fake_model()
+        MemoizedModel(model, InferenceMemo(disk_dir=self.tmp.name)).predict(self.white, "p")
+
+        # A new process: empty memory tier, same directory
+        memo = InferenceMemo(disk_dir=self.tmp.name)
+        self.assertEqual(MemoizedModel(model, memo).predict(self.white, "p"), "out:p")
+        self.assertEqual(model.predict.call_count, 1)
+        self.assertEqual(memo.stats["disk_hits"], 1)
+
+    def test_disk_eviction(self):
+        print("--- Test size-bounded disk tier ---\n")
+        memo = InferenceMemo(disk_dir=self.tmp.name, disk_mb=1000 / 2**20)
+        for i in range(20):
+            memo.put(f"key{i}", "x" * 100)
+
+        files = os.listdir(self.tmp.name)
+        self.assertLessEqual(sum(os.path.getsize(os.path.join(self.tmp.name, f)) for f in files), 1000)
+        # Oldest entries went first
+        self.assertIn("key19.json", files)
+        self.assertNotIn("key0.json", files)
+
+    def test_concurrent_writers_same_key(self):
+        print("--- Test concurrent disk writes ---\n")
+        # Sessions sharing one memo (or runs sharing the directory) store the same output at once
+        memos = [InferenceMemo(disk_dir=self.tmp.name) for _ in range(4)]
+        errors = []
+
+        def write(memo):
+            for i in range(30):
+                try:
+                    memo.put(f"key{i % 3}", "x" * 1000)
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(m,)) for m in memos]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["key0.json", "key1.json", "key2.json"])
+
+    def test_batch_sends_only_misses(self):
+        print("--- Test memoized batch ---\n")
+        model = fake_model()
+        memo = MemoizedModel(model, InferenceMemo())
+        memo.predict_batch([self.white] * 2, ["b", "d"])
+
+        outputs = memo.predict_batch([self.white] * 3, ["a", "b", "c"])
+
+        self.assertEqual(outputs, ["out:a", "out:b", "out:c"])
+        self.assertEqual(model.predict_batch.call_args[0][1], ["a", "c"])
+
+    def test_batch_keyed_apart_from_predict(self):
+        print("--- Test memoized batch vs predict ---\n")
+        model = fake_model()
+        memo = MemoizedModel(model, InferenceMemo())
+        memo.predict(self.white, "a")
+
+        # Left-padded batch entries may decode differently, so they don't reuse (or feed) predict() results
+        memo.predict_batch([self.white] * 2, ["a", "b"])
+        self.assertEqual(model.predict_batch.call_args[0][1], ["a", "b"])
+        memo.predict(self.white, "b")
+        self.assertEqual(model.predict.call_count, 2)
+
+        # A batch of one has no padding: the same call as predict()
+        self.assertEqual(memo.predict_batch([self.white], ["a"]), ["out:a"])
+        self.assertEqual(model.predict_batch.call_count, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import contextlib
+import threading
+import time
+import tempfile
+from types import SimpleNamespace
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.model import ModelEngine, BASE_ADAPTER, MemoryBudget, MemoryBudgetExceeded, estimate_request_bytes, quantized_cache_backend, adapter_digest
+
+# Qwen2.5-VL-7B language model shape
+TEXT_CONFIG = SimpleNamespace(num_hidden_layers=28, num_attention_heads=28, num_key_value_heads=4,
+                              hidden_size=3584, intermediate_size=18944, vocab_size=152064)
+
+class FakePeftModel:
+    """Tracks which adapter is active, like PeftModel does."""
+    def __init__(self):
+        self.active_adapter = "default"
+        self.disabled = False
+
+    def set_adapter(self, name):
+        self.active_adapter = name
+
+    @contextlib.contextmanager
+    def disable_adapter(self):
+        self.disabled = True
+        yield
+        self.disabled = False
+
+class TestModelAdapters(unittest.TestCase):
+
+    def setUp(self):
+        # Skip __init__: no weights are loaded, only the adapter bookkeeping is exercised
+        self.engine = ModelEngine.__new__(ModelEngine)
+        self.engine.model = FakePeftModel()
+        self.engine.adapter_bytes = {"default": 40 << 20, "shop": 40 << 20}
+        self.engine.default_adapter = "default"
+        self.engine._init_adapter_state()
+
+    def test_use_adapter_switches(self):
+        print("--- Test per-call adapter selection ---\n")
+        with self.engine._use_adapter("shop") as name:
+            self.assertEqual((name, self.engine.model.active_adapter), ("shop", "shop"))
+
+        with self.engine._use_adapter(None) as name:
+            self.assertEqual((name, self.engine.model.active_adapter), ("default", "default"))
+
+        with self.engine._use_adapter(BASE_ADAPTER):
+            self.assertTrue(self.engine.model.disabled)
+        self.assertFalse(self.engine.model.disabled)
+
+        with self.assertRaises(ValueError):
+            with self.engine._use_adapter("missing"):
+                pass
+
+    def test_same_adapter_calls_overlap(self):
+        print("--- Test concurrent calls per adapter ---\n")
+        order = []
+        first_in = threading.Event()
+
+        def call(name, label, hold):
+            with self.engine._use_adapter(name):
+                order.append((label, "in", self.engine.model.active_adapter))
+                first_in.set()
+                time.sleep(hold)
+                order.append((label, "out", self.engine.model.active_adapter))
+
+        a = threading.Thread(target=call, args=("shop", "a", 0.3))
+        a.start()
+        first_in.wait()
+        b = threading.Thread(target=call, args=("shop", "b", 0.1))
+        b.start()
+        time.sleep(0.05)
+        # Needs a switch: waits for both shop calls, and a later shop call queues behind it
+        c = threading.Thread(target=call, args=("default", "c", 0))
+        c.start()
+        time.sleep(0.05)
+        d = threading.Thread(target=call, args=("shop", "d", 0))
+        d.start()
+        for t in (a, b, c, d):
+            t.join()
+
+        labels = [(label, step) for label, step, _ in order]
+        # b ran inside a, not after it
+        self.assertLess(labels.index(("b", "in")), labels.index(("a", "out")))
+        # c only after both shop calls; d after c
+        self.assertGreater(labels.index(("c", "in")), labels.index(("a", "out")))
+        self.assertGreater(labels.index(("d", "in")), labels.index(("c", "out")))
+        # Every call saw its own adapter the whole time
+        for label, _, active in order:
+            self.assertEqual(active, "default" if label == "c" else "shop")
+
+    def test_batch_grouped_by_adapter(self):
+        print("--- Test batched requests grouped by adapter ---\n")
+        calls = []
+        def fake_group(images, prompts, max_new_tokens, adapter):
+            calls.append((adapter, prompts))
+            return [f"{adapter}:{p}" for p in prompts]
+        self.engine._predict_group = MagicMock(side_effect=fake_group)
+
+        outputs = self.engine.predict_batch(["i"] * 4, ["a", "b", "c", "d"], adapters=["shop", None, "shop", BASE_ADAPTER])
+
+        self.assertEqual(outputs, ["shop:a", "default:b", "shop:c", "base:d"])
+        self.assertEqual(calls, [("shop", ["a", "c"]), ("default", ["b"]), ("base", ["d"])])
+
+    def test_identity_names_revision_attention_and_adapter_weights(self):
+        print("--- Test model identity ---\n")
+        with tempfile.TemporaryDirectory() as path:
+            weights = os.path.join(path, "adapter_model.safetensors")
+            with open(weights, "wb") as f:
+                f.write(b"v1")
+            self.engine.model_id, self.engine.revision, self.engine.attention, self.engine.kv_bits = "qwen", "abc123", "sdpa", 16
+            self.engine.adapter_paths = {"default": path}
+            self.engine.adapter_digests = {"default": adapter_digest(path)}
+            first = self.engine.identity()
+
+            # Retrained into the same directory
+            with open(weights, "wb") as f:
+                f.write(b"v2")
+            self.engine.adapter_digests["default"] = adapter_digest(path)
+            retrained = self.engine.identity()
+
+        self.assertNotEqual(first, retrained)
+        self.engine.attention = "flash_attention_2"
+        self.assertNotEqual(self.engine.identity(), retrained)
+        self.engine.revision = "def456"
+        self.assertIn("qwen@def456|flash_attention_2|", self.engine.identity())
+        self.assertEqual(adapter_digest("/no/such/adapter"), "")
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def test_estimate(self):
+        print("--- Test request memory estimate ---\n")
+        # 28 layers x 4 KV heads x 128 dims x K and V x bf16 = 56 KB per position
+        kv_only = estimate_request_bytes(TEXT_CONFIG, 1000, 0) - estimate_request_bytes(TEXT_CONFIG, 0, 0)
+        self.assertEqual(kv_only, 1000 * 57344 + 1000 * 18944 * 6)
+
+        full = estimate_request_bytes(TEXT_CONFIG, 4000, 512)
+        # Three beams hold three of everything
+        self.assertAlmostEqual(estimate_request_bytes(TEXT_CONFIG, 4000, 512, sequences=3) / full, 3, places=2)
+        # A 4-bit cache saves most of the bf16 cache's 56 KB per position
+        saved = estimate_request_bytes(TEXT_CONFIG, 8000, 512) - estimate_request_bytes(TEXT_CONFIG, 8000, 512, kv_bits=4)
+        self.assertGreater(saved, 0.7 * 8512 * 57344)
+
+    def test_oversized_request_rejected(self):
+        print("--- Test rejection instead of OOM ---\n")
+        budget = MemoryBudget(6 << 30, base_bytes=5 << 30)
+        with self.assertRaises(MemoryBudgetExceeded):
+            with budget.reserve(2 << 30):
+                pass
+        self.assertEqual(budget.in_flight, 0)
+
+    def test_requests_wait_for_memory(self):
+        print("--- Test admission by estimated memory ---\n")
+        budget = MemoryBudget(8 << 30, base_bytes=5 << 30)
+        order = []
+
+        def request(name, need, hold):
+            with budget.reserve(need):
+                order.append(name)
+                time.sleep(hold)
+
+        # Two 1 GB calls fit side by side; the 2 GB call waits until both have finished
+        first = threading.Thread(target=request, args=("a", 1 << 30, 0.2))
+        second = threading.Thread(target=request, args=("b", 1 << 30, 0.2))
+        first.start(); second.start()
+        time.sleep(0.05)
+        third = threading.Thread(target=request, args=("c", 2 << 30, 0))
+        third.start()
+        time.sleep(0.05)
+        self.assertEqual(sorted(order), ["a", "b"])
+        for t in (first, second, third):
+            t.join()
+        self.assertEqual(order[-1], "c")
+        self.assertEqual(budget.in_flight, 0)
+
+    def test_quantized_cache_only_for_greedy(self):
+        engine = ModelEngine.__new__(ModelEngine)
+        engine.kv_backend, engine.kv_bits = "quanto", 4
+        self.assertEqual(engine._cache_kwargs()["cache_config"], {"backend": "quanto", "nbits": 4})
+        self.assertEqual(engine._cache_kwargs(beams=3), {})
+
+    def test_backend_names_accepted_by_quantized_cache(self):
+        print("--- Test quantized cache backend names ---\n")
+        from transformers import LlamaConfig, QuantizedCache
+        config = LlamaConfig(num_hidden_layers=2, hidden_size=64, intermediate_size=128, num_attention_heads=4, num_key_value_heads=2)
+
+        for installed in ("optimum.quanto", "hqq"):
+            with patch("core.model._has_module", side_effect=lambda name: name == installed):
+                engine = ModelEngine.__new__(ModelEngine)
+                engine.kv_backend, engine.kv_bits = quantized_cache_backend(), 4
+
+            # What generate() does with cache_config (transformers.generation.utils, cache_implementation="quantized")
+            cache_config = dict(engine._cache_kwargs()["cache_config"], config=config)
+            try:
+                QuantizedCache(**cache_config)
+            except ImportError:
+                # Name accepted; the backend package itself is not installed here
+                pass
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import sys
+import os
+import json
+import pickle
+import tempfile
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.packed import pack_records, PackedDataset
+from core.evaluation import find_image
+
+class TestPackedDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        Image.new("RGB", (64, 48), "red").save(os.path.join(self.tmp.name, "task0.png"))
+        Image.new("RGB", (64, 48), "blue").save(os.path.join(self.tmp.name, "task1.jpeg"))
+        # Same pixels, different file: should still be stored once
+        Image.new("RGB", (64, 48), "red").save(os.path.join(self.tmp.name, "copy.png"))
+
+        self.records = [
+            {"annotation_id": "task0", "action_uid": "a0", "prompt": "first ünïcode", "label": '{"action": "click"}'},
+            {"annotation_id": "task0", "action_uid": "a1", "prompt": "second", "label": "{}"},
+            {"annotation_id": "task1", "action_uid": "a2", "prompt": "third", "label": "{}"},
+            {"annotation_id": "gone", "action_uid": "a3", "prompt": "fourth", "label": "{}"},
+            {"annotation_id": "task2", "action_uid": "a4", "prompt": "fifth", "label": "{}", "image": "copy.png"},
+        ]
+        self.pack_dir = os.path.join(self.tmp.name, "pack")
+
+    def test_round_trip_and_dedup(self):
+        print("--- Test packed dataset round trip ---\n")
+        # Tiny shards so records span several files
+        meta = pack_records(self.records, self.tmp.name, self.pack_dir, shard_bytes=200)
+        dataset = PackedDataset(self.pack_dir)
+
+        self.assertEqual(len(dataset), 5)
+        self.assertGreater(len(meta["shards"]), 1)
+        self.assertEqual(meta["unique_images"], 2)
+        self.assertEqual(meta["duplicate_images"], 2)
+        self.assertEqual(meta["missing_images"], 1)
+
+        item = dataset[0]
+        self.assertEqual((item["action_uid"], item["prompt"], json.loads(item["label"])), ("a0", "first ünïcode", {"action": "click"}))
+        self.assertEqual(item["image"].getpixel((0, 0)), (255, 0, 0))
+        self.assertEqual(dataset[4]["image"].getpixel((0, 0)), (255, 0, 0))
+        self.assertIsNone(dataset[3]["image"])
+        with self.assertRaises(IndexError):
+            dataset[5]
+
+        # Records resolve to the same screenshot as the JSONL they came from (e.g. for build_length_index)
+        for i, record in enumerate(self.records):
+            self.assertEqual(find_image(dataset.record(i), self.tmp.name), find_image(record, self.tmp.name))
+
+    def test_transcode_and_pickle(self):
+        print("--- Test JPEG transcoding and worker pickling ---\n")
+        pack_records(self.records, self.tmp.name, self.pack_dir, jpeg_quality=90)
+        dataset = PackedDataset(self.pack_dir, decode_images=False)
+        dataset[0]  # open the maps in this process
+
+        # DataLoader workers get a pickled copy; the mmaps are reopened there
+        worker_copy = pickle.loads(pickle.dumps(dataset))
+
+        self.assertEqual(worker_copy.image_bytes(0)[:3], b"\xff\xd8\xff")
+        self.assertEqual(worker_copy[2]["prompt"], "third")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import json
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.prefetch import Prefetcher, PREFETCH_JS, PREFETCH_MARKER
+from core.controller import AgentController
+
+DOM = "\n".join([
+    "[0] <option> Target element is not in this list",
+    "[3] <a> Home",
+    "[4] <a> Dell XPS 13 laptop",
+    "[5] <a> Lenovo laptop",
+    "[6] <button> Dell XPS 13 deals",
+    "[7] <a> Contact",
+])
+
+class TestPrefetcher(unittest.TestCase):
+
+    def test_candidates_rank_links_against_goal(self):
+        print("--- Test prefetch candidates ---\n")
+        prefetcher = Prefetcher(max_links=2)
+        # Only links, best goal match first; buttons and unrelated links are not fetched
+        self.assertEqual(prefetcher.candidates("Buy the Dell XPS 13 laptop", DOM), ["4", "5"])
+        self.assertEqual(prefetcher.candidates("Read the privacy policy", DOM), [])
+
+    def test_links_marked_for_layout_observer(self):
+        print("--- Test prefetch links skipped by the layout observer ---\n")
+        # Layout mode reuses its capture while no DOM mutation is counted; our own links must not count
+        # (checked end to end in tests/test_browser.py)
+        with open(os.path.join(os.path.dirname(__file__), "..", "scripts", "stamp_layout.js")) as f:
+            stamp_layout = f.read()
+        self.assertIn(PREFETCH_MARKER, PREFETCH_JS)
+        self.assertIn(f"hasAttribute('{PREFETCH_MARKER}')", stamp_layout)
+
+    def test_hits_and_bandwidth_cap(self):
+        print("--- Test prefetch hits and cap ---\n")
+        prefetcher = Prefetcher(max_links=2, max_mb=1, page_kb=300)
+        browser = MagicMock()
+        browser.prefetch.side_effect = lambda ids: ["http://shop/xps", "http://shop/lenovo"][:len(ids)]
+        # Lenovo is cross-origin in spirit: finished, but no size reported
+        browser.prefetch_timings.return_value = [{"url": "http://shop/xps", "bytes": 100 << 10, "duration_s": 0.8},
+                                                 {"url": "http://shop/lenovo", "bytes": 0, "duration_s": 0.5}]
+
+        task = prefetcher.task()
+        self.assertEqual(len(task.issue(browser, "Dell XPS laptop", DOM)), 2)
+        # Charged on issue, before anything finished
+        self.assertEqual(task.bytes, 600 << 10)
+        task.collect(browser)
+        # XPS measured at 100 KB; Lenovo keeps its 300 KB estimate
+        self.assertEqual(task.bytes, 400 << 10)
+        self.assertTrue(task.navigated("http://shop/", "http://shop/xps#reviews"))
+
+        # 624 KB left: room for two more estimated pages
+        self.assertEqual(len(task.issue(browser, "Dell XPS laptop", DOM)), 2)
+        self.assertFalse(task.navigated("http://shop/xps", "http://shop/cart"))
+
+        # Still in flight when the page changed: charged at the estimate, leaving room for none
+        self.assertEqual(task.issue(browser, "Dell XPS laptop", DOM), [])
+        self.assertEqual(browser.prefetch.call_count, 2)
+
+        report = prefetcher.report()
+        self.assertEqual((report["issued"], report["hits"], report["navigations"], report["capped"]), (4, 1, 2, 1))
+        self.assertAlmostEqual(report["saved_s"], 0.8)
+
+        # A new task starts with a fresh allowance
+        self.assertEqual(len(prefetcher.task().issue(browser, "Dell XPS laptop", DOM)), 2)
+
+    def test_estimate_limits_links_per_step(self):
+        print("--- Test prefetch estimate caps links ---\n")
+        browser = MagicMock()
+        browser.prefetch.side_effect = lambda ids: [f"http://shop/{i}" for i in ids]
+        # Room for one 600 KB estimate in 1 MB, so only the best link is requested
+        task = Prefetcher(max_links=2, max_mb=1, page_kb=600).task()
+        self.assertEqual(task.issue(browser, "Dell XPS laptop", DOM), ["http://shop/4"])
+
+    @patch("time.sleep", return_value=None)
+    def test_controller_prefetches_before_the_model(self, _sleep):
+        print("--- Test controller prefetch ---\n")
+        browser, processor, model = MagicMock(), MagicMock(), MagicMock()
+        browser.capture_state.return_value = (MagicMock(), "<html></html>")
+        processor.distill_dom.return_value = DOM
+        browser.prefetch.return_value = ["http://shop/xps"]
+        browser.prefetch_timings.return_value = []
+        browser.current_url = "http://shop/"
+
+        order = []
+        browser.prefetch.side_effect = lambda ids: order.append("prefetch") or ["http://shop/xps"]
+        model.predict.side_effect = lambda *a, **k: order.append("model") or json.dumps(
+            {"action": "click", "element_id": "4", "value": "", "is_finished": False})
+        def click(*args):
+            browser.current_url = "http://shop/xps"
+            return True
+        browser.execute_action.side_effect = click
+
+        prefetcher = Prefetcher()
+        AgentController(browser, processor, model, prefetcher=prefetcher).run_task("Dell XPS laptop", "http://shop/", max_steps=1)
+
+        self.assertEqual(order, ["prefetch", "model"])
+        self.assertEqual(prefetcher.report()["hits"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -57,5 +57,29 @@ class TestProcessor(unittest.TestCase):
         
         print("Prompt successfully formatted.")
 
+    def test_offscreen_index(self):
+        """
+        Verifies that off-screen controls are indexed (not listed) and ranked against the goal.
+        """
+        print("\n--- Testing Off-screen Index ---")
+        html = (
+            '<html><body>'
+            '<button data-m2w-id="1" data-m2w-visible="true">Menu</button>'
+            '<a data-m2w-id="2" data-m2w-visible="false" data-m2w-y="3400">Dell XPS 13 laptop</a>'
+            '<a data-m2w-id="3" data-m2w-visible="false" data-m2w-y="1800">Gaming mouse</a>'
+            '<a data-m2w-id="4" data-m2w-visible="false">No position</a>'
+            '</body></html>'
+        )
+        distilled, index = self.processor.distill_dom_with_index(html)
+
+        self.assertEqual(distilled, self.processor.distill_dom(html))
+        self.assertNotIn("laptop", distilled)
+        self.assertEqual([e[0] for e in index.entries], ["2", "3"])
+
+        best = index.best("Add the Dell laptop to the cart")
+        self.assertEqual(best[0], "2")
+        self.assertEqual(index.jump_position(best), 3250)
+        self.assertIsNone(index.best("Add the Dell laptop to the cart", exclude={index.key(best)}))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,59 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.profiles import ProfileManager
+
+def touch(path, data="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(data)
+
+class TestProfileManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.root = os.path.join(self.tmp.name, "profiles")
+
+        # A warmed profile: cached responses plus a logged-in session and a stale lock
+        self.template = os.path.join(self.tmp.name, "template")
+        touch(os.path.join(self.template, "Default", "Cache", "Cache_Data", "data_1"), "bundle.js")
+        touch(os.path.join(self.template, "Default", "Network", "Cookies"))
+        touch(os.path.join(self.template, "Default", "Local Storage", "leveldb", "000003.log"))
+        touch(os.path.join(self.template, "SingletonLock"))
+
+    def test_slots_are_exclusive_and_reused(self):
+        print("--- Test profile slots ---\n")
+        profiles = ProfileManager(self.root)
+
+        first, second = profiles.acquire(), profiles.acquire()
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(profiles), 2)
+
+        # The cache written by the first browser is still there for the next one
+        touch(os.path.join(first, "Default", "Cache", "Cache_Data", "data_1"))
+        profiles.release(first)
+        self.assertEqual(profiles.acquire(), first)
+        self.assertTrue(os.path.exists(os.path.join(first, "Default", "Cache", "Cache_Data", "data_1")))
+
+    def test_template_seeds_cache_not_storage(self):
+        print("--- Test warmed template, isolated storage ---\n")
+        slot = ProfileManager(self.root, template=self.template).acquire()
+
+        self.assertTrue(os.path.exists(os.path.join(slot, "Default", "Cache", "Cache_Data", "data_1")))
+        self.assertFalse(os.path.exists(os.path.join(slot, "Default", "Network", "Cookies")))
+        self.assertFalse(os.path.exists(os.path.join(slot, "Default", "Local Storage")))
+        self.assertFalse(os.path.exists(os.path.join(slot, "SingletonLock")))
+
+    def test_shared_storage_keeps_cookies(self):
+        print("--- Test opt-out of storage isolation ---\n")
+        slot = ProfileManager(self.root, template=self.template, isolate_storage=False).acquire()
+        self.assertTrue(os.path.exists(os.path.join(slot, "Default", "Network", "Cookies")))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import json
+import tempfile
+import threading
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.controller import AgentController
+from core.processor import Processor
+from core.recorder import TrajectoryRecorder, ReplayBrowser, ReplayModel, load_trajectory
+
+MOCK_HTML = (
+    '<html><body>'
+    '<h1>Shop</h1>'
+    '<button data-m2w-id="5" data-m2w-visible="true">Search</button>'
+    '</body></html>'
+)
+
+class TestRecordAndReplay(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        # Skip the 2s settle delays between steps
+        settle_patch = patch.object(AgentController, "_settle")
+        settle_patch.start()
+        self.addCleanup(settle_patch.stop)
+
+        self.mock_browser = MagicMock()
+        self.mock_browser.max_id = 6
+        self.mock_browser.capture_state.return_value = (Image.new("RGB", (1920, 1080), "white"), MOCK_HTML)
+        self.mock_browser.execute_action.return_value = True
+
+        self.mock_model = MagicMock()
+        self.mock_model.predict.side_effect = [
+            json.dumps({"action": "click", "element_id": "5", "value": "", "is_finished": False}),
+            json.dumps({"action": "click", "element_id": "0", "value": "Done", "is_finished": True}),
+        ]
+
+    def record(self):
+        recorder = TrajectoryRecorder(self.tmp.name)
+        agent = AgentController(self.mock_browser, Processor(), self.mock_model, recorder=recorder)
+        self.assertTrue(agent.run_task("Search the shop", "http://shop.test", max_steps=5))
+        return recorder.trajectory_dir
+
+    def test_recording_format(self):
+        print("\n--- Testing Trajectory Recording ---")
+        trajectory_dir = self.record()
+
+        meta, steps = load_trajectory(trajectory_dir)
+        self.assertEqual(meta["status"], "success")
+        self.assertEqual(len(steps), 2)
+        self.assertEqual(steps[0]["action"]["element_id"], "5")
+        self.assertIn("[5] <button> Search", steps[0]["distilled_dom"])
+
+        # Both steps saw the same frame, so it is stored once
+        self.assertEqual(steps[0]["screenshot"], steps[1]["screenshot"])
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, "screenshots"))), 1)
+
+    def test_offline_replay(self):
+        print("\n--- Testing Offline Replay ---")
+        trajectory_dir = self.record()
+
+        browser = ReplayBrowser(trajectory_dir)
+        model = ReplayModel(trajectory_dir)
+        agent = AgentController(browser, Processor(), model)
+
+        success = agent.run_task(browser.meta["goal"], browser.meta["start_url"], max_steps=5)
+
+        self.assertTrue(success)
+        self.assertEqual(browser.actions, [{"action": "click", "element_id": "5", "value": ""}])
+        self.assertEqual(browser.divergences, 0)
+        self.assertEqual(model.prompt_mismatches, 0)
+
+    def test_concurrent_screenshot_saves(self):
+        print("\n--- Testing Concurrent Screenshot Saves ---")
+        # Batch workers each have a recorder over one shared screenshot store, and often save the same start page
+        recorders = [TrajectoryRecorder(self.tmp.name) for _ in range(4)]
+        image = Image.new("RGB", (640, 480), "white")
+        errors, digests = [], []
+
+        def save(recorder):
+            for _ in range(30):
+                try:
+                    digests.append(recorder.save_screenshot(image))
+                except Exception as e:
+                    errors.append(e)
+                    return
+                # Saved again next time round, racing the others (temp files are theirs to clean up)
+                for name in os.listdir(recorder.screenshot_dir):
+                    if not name.endswith(".png"):
+                        continue
+                    try:
+                        os.remove(os.path.join(recorder.screenshot_dir, name))
+                    except OSError:
+                        pass
+
+        threads = [threading.Thread(target=save, args=(r,)) for r in recorders]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(digests)), 1)
+        self.assertEqual(len(digests), 120)
+
+if __name__ == "__main__":
+    unittest.main()
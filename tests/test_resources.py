@@ -0,0 +1,54 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.resources import ResourceManager, python_rss, browser_rss
+from core.telemetry import metrics
+
+class TestResourceManager(unittest.TestCase):
+
+    def setUp(self):
+        # Stand in for Chrome with this test process, so the RSS lookups have something real to read
+        self.browser = MagicMock()
+        self.browser.process_ids.return_value = [os.getpid()]
+
+    def test_measurements(self):
+        print("\n--- Testing Memory Sampling ---")
+        self.assertGreater(python_rss(), 0)
+        self.assertGreaterEqual(browser_rss(self.browser), python_rss() // 2)
+
+    def test_recycle_after_tasks(self):
+        print("\n--- Testing Browser Recycling ---")
+        resources = ResourceManager(max_tasks_per_browser=3, max_browser_mb=None)
+        reasons = [resources.task_done(self.browser) for _ in range(3)]
+        self.assertEqual(reasons, [None, None, "tasks"])
+
+        # A fresh browser starts counting again
+        resources.forget(self.browser)
+        self.assertIsNone(resources.task_done(self.browser))
+
+    def test_recycle_on_memory(self):
+        resources = ResourceManager(max_tasks_per_browser=None, max_browser_mb=1)
+        self.assertEqual(resources.task_done(self.browser), "browser_memory")
+
+    def test_check_mid_task(self):
+        print("\n--- Testing Mid-Task Memory Check ---")
+        self.assertIsNone(ResourceManager(max_browser_mb=None).check(self.browser))
+        resources = ResourceManager(max_tasks_per_browser=1, max_browser_mb=1)
+        self.assertEqual(resources.check(self.browser), "browser_memory")
+        # Checks don't count as tasks
+        resources.max_browser_mb = None
+        self.assertIsNone(resources.check(self.browser, worker="session-7"))
+
+        # A finished session's gauge is no longer exported
+        gauge = metrics.gauge("groundhog_browser_rss_bytes")
+        self.assertGreater(gauge.value(worker="session-7"), 0)
+        resources.forget(self.browser, worker="session-7")
+        self.assertNotIn("session-7", "\n".join(gauge.render()))
+
+if __name__ == "__main__":
+    unittest.main()
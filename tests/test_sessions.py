@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+import time
+import threading
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.sessions import SessionScheduler, SessionRejected, GatedModel
+
+class TestSessionScheduler(unittest.TestCase):
+
+    def test_admission_and_queue(self):
+        print("\n--- Testing Session Admission ---")
+        scheduler = SessionScheduler(max_sessions=1, max_queue=1, expected_session_s=60)
+
+        first = scheduler.enqueue()
+        self.assertTrue(scheduler.wait(first, timeout=0.1))
+
+        second = scheduler.enqueue()
+        self.assertFalse(scheduler.wait(second, timeout=0.05))
+        self.assertEqual(scheduler.position(second), 1)
+        self.assertGreater(scheduler.eta(second), 0)
+
+        # Queue is full
+        with self.assertRaises(SessionRejected):
+            scheduler.enqueue()
+
+        # Finishing the first session lets the second one in
+        scheduler.release(first)
+        self.assertTrue(scheduler.wait(second, timeout=0.1))
+        self.assertEqual(scheduler.stats(), {"active": 1, "waiting": 0, "max_sessions": 1})
+
+        scheduler.release(second)
+        scheduler.release(second)  # idempotent
+        self.assertEqual(scheduler.stats()["active"], 0)
+
+    def test_leaving_the_queue(self):
+        print("\n--- Testing Queue Abandonment ---")
+        scheduler = SessionScheduler(max_sessions=1)
+        running = scheduler.enqueue()
+        scheduler.wait(running, timeout=0.1)
+
+        gone = scheduler.enqueue()
+        waiting = scheduler.enqueue()
+        scheduler.release(gone)  # user closed the tab while queued
+        self.assertEqual(scheduler.position(waiting), 1)
+
+    def test_model_gate(self):
+        print("\n--- Testing Model Concurrency Gate ---")
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def predict(image, prompt):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return "{}"
+
+        model = MagicMock()
+        model.predict.side_effect = predict
+        gated = GatedModel(model, max_concurrent=1)
+
+        threads = [threading.Thread(target=gated.predict, args=(None, "p")) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(model.predict.call_count, 4)
+        self.assertEqual(peak[0], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import json
+import tempfile
+import threading
+import urllib.request
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.telemetry import MetricsRegistry, Tracer, ChromeTraceExporter, JsonlExporter, metrics, start_metrics_server
+
+class TestTelemetry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.tracer = Tracer(self.registry)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_prometheus_rendering(self):
+        print("\n--- Testing Prometheus Rendering ---")
+        self.registry.counter("groundhog_test_total", "A test counter").inc(3, event="scroll")
+        self.registry.histogram("groundhog_test_seconds", buckets=(0.1, 1.0)).observe(0.5)
+
+        text = self.registry.render_prometheus()
+        self.assertIn('groundhog_test_total{event="scroll"} 3', text)
+        self.assertIn('groundhog_test_seconds_bucket{le="0.1"} 0', text)
+        self.assertIn('groundhog_test_seconds_bucket{le="1.0"} 1', text)
+        self.assertIn('groundhog_test_seconds_count 1', text)
+
+    def test_render_while_updating(self):
+        print("\n--- Testing Scrapes During Updates ---")
+        counter = self.registry.counter("groundhog_test_total")
+        histogram = self.registry.histogram("groundhog_test_seconds", buckets=(0.1, 1.0))
+        done = threading.Event()
+
+        def agent():
+            # New label sets keep appearing, like new workers or stages
+            for i in range(20000):
+                counter.inc(worker=str(i))
+                histogram.observe(0.5, worker=str(i % 50))
+            done.set()
+
+        thread = threading.Thread(target=agent)
+        thread.start()
+        try:
+            while not done.is_set():
+                lines = self.registry.render_prometheus().split("\n")
+                # Every histogram series is internally consistent: +Inf bucket == count
+                inf = [l.split()[-1] for l in lines if 'le="+Inf"' in l]
+                counts = [l.split()[-1] for l in lines if l.startswith("groundhog_test_seconds_count")]
+                self.assertEqual(inf, counts)
+        finally:
+            thread.join()
+
+    def test_span_nesting_and_stage_histogram(self):
+        print("\n--- Testing Span Nesting ---")
+        jsonl_path = os.path.join(self.tmp.name, "trace.jsonl")
+        self.tracer.add_exporter(JsonlExporter(jsonl_path))
+
+        with self.tracer.span("agent.step") as outer:
+            with self.tracer.span("browser.stamp") as inner:
+                inner.set("elements", 12)
+        self.tracer.shutdown()
+
+        with open(jsonl_path) as f:
+            spans = [json.loads(line) for line in f]
+
+        # Inner span finishes (and is exported) first
+        self.assertEqual(spans[0]["name"], "browser.stamp")
+        self.assertEqual(spans[0]["parent_id"], outer.span_id)
+        self.assertEqual(spans[0]["attrs"]["elements"], 12)
+        self.assertIsNone(spans[1]["parent_id"])
+
+        hist = self.registry.histogram("groundhog_stage_seconds")
+        self.assertEqual(hist.count(stage="browser.stamp"), 1)
+
+    def test_chrome_trace_export(self):
+        print("\n--- Testing Chrome Trace Export ---")
+        path = os.path.join(self.tmp.name, "trace.json")
+        self.tracer.add_exporter(ChromeTraceExporter(path))
+
+        with self.tracer.span("processor.distill", html_bytes=100):
+            pass
+        self.tracer.shutdown()
+
+        with open(path) as f:
+            trace = json.load(f)
+        event = trace["traceEvents"][0]
+        self.assertEqual(event["name"], "processor.distill")
+        self.assertEqual(event["ph"], "X")
+        self.assertEqual(event["args"]["html_bytes"], 100)
+
+    def test_metrics_endpoint(self):
+        print("\n--- Testing Metrics Endpoint ---")
+        metrics.counter("groundhog_endpoint_test_total").inc()
+        server = start_metrics_server(port=0, host="127.0.0.1")
+        self.addCleanup(server.shutdown)
+
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode()
+        self.assertIn("groundhog_endpoint_test_total 1", body)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+from unittest.mock import MagicMock, patch
+import sys
+import os
+import json
+import tempfile
+from PIL import Image
+
+# Add project root to sys.path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.controller import AgentController
+from core.processor import Processor
+from core.workflow_cache import WorkflowCache, normalize_goal, url_pattern
+
+def search_page(input_id, button_id):
+    # Same structure every visit, but the stamped ids differ
+    return (
+        '<html><body>'
+        f'<input data-m2w-id="{input_id}" data-m2w-visible="true" placeholder="City">'
+        f'<button data-m2w-id="{button_id}" data-m2w-visible="true">Search</button>'
+        '</body></html>'
+    )
+
+class TestWorkflowCache(unittest.TestCase):
+
+    def setUp(self):
+        settle_patch = patch.object(AgentController, "_settle")
+        settle_patch.start()
+        self.addCleanup(settle_patch.stop)
+
+        self.cache = WorkflowCache()
+
+    def make_browser(self, html):
+        browser = MagicMock()
+        browser.max_id = 100
+        browser.current_url = "https://www.flights.test/search/12345"
+        browser.capture_state.return_value = (Image.new("RGB", (1920, 1080), "white"), html)
+        browser.execute_action.return_value = True
+        return browser
+
+    def test_normalization(self):
+        print("\n--- Testing Goal / URL Normalization ---")
+        self.assertEqual(
+            normalize_goal("Find flights from New York to Boston under $300"),
+            ("find flights from {0} to {1} under {2}", ["New York", "Boston", "$300"]),
+        )
+        self.assertEqual(url_pattern("https://www.flights.test/search/12345?q=x"), "flights.test/search/*?q")
+
+    def test_learn_then_replay(self):
+        print("\n--- Testing Workflow Cache Replay ---")
+        model = MagicMock()
+        model.predict.side_effect = [
+            json.dumps({"action": "type", "element_id": "3", "value": "Boston", "is_finished": False}),
+            json.dumps({"action": "click", "element_id": "0", "value": "Done", "is_finished": True}),
+        ]
+        agent = AgentController(self.make_browser(search_page(3, 4)), Processor(), model, workflow_cache=self.cache)
+        self.assertTrue(agent.run_task("Search flights to Boston", "https://flights.test", max_steps=5))
+        # The finishing step is left to the model next time
+        self.assertEqual(len(self.cache), 1)
+
+        # Same goal template, different city and different ids: no model calls needed
+        fresh_model = MagicMock()
+        browser = self.make_browser(search_page(40, 41))
+        agent = AgentController(browser, Processor(), fresh_model, workflow_cache=self.cache)
+        agent.run_task("Search flights to Denver", "https://flights.test", max_steps=1)
+
+        fresh_model.predict.assert_not_called()
+        browser.execute_action.assert_called_once_with("type", "40", "Denver")
+        self.assertEqual(self.cache.stats["hits"], 1)
+
+    def test_failed_replay_invalidates(self):
+        print("\n--- Testing Workflow Cache Invalidation ---")
+        dom = Processor().distill_dom(search_page(3, 4))
+        step = self.cache.make_step("Search flights to Boston", "https://flights.test/search/1", dom,
+                                    {"action": "click", "element_id": "4", "value": ""})
+        self.cache.commit([step])
+
+        browser = self.make_browser(search_page(3, 4))
+        browser.current_url = "https://flights.test/search/1"
+        browser.execute_action.return_value = False
+        model = MagicMock()
+        model.predict.return_value = json.dumps({"action": "click", "element_id": "0", "value": "Done", "is_finished": True})
+
+        agent = AgentController(browser, Processor(), model, workflow_cache=self.cache)
+        self.assertTrue(agent.run_task("Search flights to Boston", "https://flights.test/search/1", max_steps=3))
+
+        self.assertEqual(self.cache.stats["rejected"], 1)
+        model.predict.assert_called_once()
+
+    def test_answers_and_literals_not_cached(self):
+        print("\n--- Testing Workflow Cache Skips Answers ---")
+        dom = Processor().distill_dom(search_page(3, 4))
+        url = "https://flights.test/search/1"
+        finish = {"action": "click", "element_id": "0", "value": "$120", "is_finished": True}
+        literal = {"action": "type", "element_id": "3", "value": "one way"}
+        slot = {"action": "type", "element_id": "3", "value": "Boston"}
+
+        self.assertIsNone(self.cache.make_step("Find the price of flights to Boston", url, dom, finish))
+        self.assertIsNone(self.cache.make_step("Search flights to Boston", url, dom, literal))
+        self.assertEqual(self.cache.make_step("Search flights to Boston", url, dom, slot)["value"], {"slot": 0})
+
+    def test_unknown_previous_step(self):
+        print("\n--- Testing Workflow Cache After Unrecordable Step ---")
+        model = MagicMock()
+        model.predict.side_effect = [
+            # A literal value can't be cached, so the state after it has no known predecessor
+            json.dumps({"action": "type", "element_id": "3", "value": "one way", "is_finished": False}),
+            json.dumps({"action": "click", "element_id": "4", "value": "", "is_finished": False}),
+            json.dumps({"action": "click", "element_id": "0", "value": "", "is_finished": True}),
+        ]
+        agent = AgentController(self.make_browser(search_page(3, 4)), Processor(), model, workflow_cache=self.cache)
+        self.assertTrue(agent.run_task("Search flights to Boston", "https://flights.test", max_steps=5))
+
+        # Neither looked up nor committed under the task-start key
+        self.assertEqual(self.cache.stats["lookups"], 2)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_persistence(self):
+        print("\n--- Testing Workflow Cache Persistence ---")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache.json")
+            self.cache.commit([{"key": "k", "action": "click", "descriptor": "<button> Go", "value": "", "is_finished": False}])
+            self.cache.save(path)
+            self.assertEqual(len(WorkflowCache(path=path)), 1)
+
+if __name__ == "__main__":
+    unittest.main()